@@ -1,7 +1,10 @@
 import sys
 import os
+import re
+import hashlib
+import threading
 from pathlib import Path
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response
 import json
 
 # --- CONFIGURATION DES CHEMINS ---
@@ -18,14 +21,98 @@ except ImportError:
 TEMPLATE_DIR = CURRENT_DIR / 'templates'
 SCAN_DATA_DIR = PROJECT_ROOT / 'scan'
 
+# Fichiers lus par le dashboard (partagés entre la lecture et le calcul de l'ETag)
+LDEEP_FILES = ("users.json", "trusts.json", "delegations.json", "pkis.json", "ldap_results.json", "machines-ip.json")
+MANSPIDER_FILES = ("enum_file.json", "grepcreds.json")
+
 app = Flask(__name__, template_folder=str(TEMPLATE_DIR))
 
+# --- CACHE DES FICHIERS JSON ---
+# chemin -> ((mtime_ns, taille), données parsées). Un fichier n'est re-parsé que si sa signature change.
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+# Dernier agrégat /api/data sérialisé, identifié par son ETag
+_aggregate_cache = {"etag": None, "body": None}
+_aggregate_lock = threading.Lock()
+
+# Hôtes Nmap à plat (annotés avec leur subnet) pour /api/nmap, reconstruits seulement si un full_scan.json change
+_nmap_hosts_cache = {"signature": None, "subnets": [], "hosts": {}}
+_nmap_hosts_lock = threading.Lock()
+
 # --- FONCTIONS UTILITAIRES ---
+def _file_signature(filepath):
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 def read_json_file(filepath):
-    if not os.path.exists(filepath): return None
+    key = str(filepath)
+    sig = _file_signature(filepath)
+    if sig is None:
+        with _json_cache_lock: _json_cache.pop(key, None)
+        return None
+
+    with _json_cache_lock:
+        cached = _json_cache.get(key)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+
     try:
-        with open(filepath, 'r', encoding='utf-8') as f: return json.load(f)
-    except: return None
+        with open(filepath, 'r', encoding='utf-8') as f: data = json.load(f)
+    except: data = None
+
+    with _json_cache_lock: _json_cache[key] = (sig, data)
+    return data
+
+def collect_data_signature():
+    """
+    Liste (chemin, mtime, taille) de tous les fichiers consommés par /api/data.
+    Ne fait que des stat() : sert à calculer l'ETag sans rien parser.
+    """
+    if not SCAN_DATA_DIR.exists(): return []
+    paths = nmap_json_paths()
+
+    ldeep_root = SCAN_DATA_DIR / 'ldeep'
+    certipy_root = SCAN_DATA_DIR / 'certipy'
+    if ldeep_root.is_dir():
+        for dc_folder in os.listdir(ldeep_root):
+            paths.extend(ldeep_root / dc_folder / f for f in LDEEP_FILES)
+            certipy_dc_path = certipy_root / dc_folder
+            if certipy_dc_path.is_dir():
+                paths.extend(certipy_dc_path / f for f in os.listdir(certipy_dc_path) if f.endswith("_Certipy.json"))
+
+    manspider_dir = SCAN_DATA_DIR / 'manspider'
+    if manspider_dir.is_dir():
+        for subnet_item in os.listdir(manspider_dir):
+            paths.extend(manspider_dir / subnet_item / f for f in MANSPIDER_FILES)
+
+    return files_signature(paths)
+
+def nmap_json_paths():
+    if not SCAN_DATA_DIR.exists(): return []
+    return [SCAN_DATA_DIR / item / "full_scan.json" for item in os.listdir(SCAN_DATA_DIR) if item.startswith("10_")]
+
+def files_signature(paths):
+    signature = []
+    for path in paths:
+        sig = _file_signature(path)
+        if sig is not None:
+            signature.append((str(path), sig[0], sig[1]))
+    signature.sort()
+    return signature
+
+def compute_etag(signature):
+    return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+
+def prune_json_cache(signature):
+    """Oublie les fichiers qui ne font plus partie du jeu de données (dossiers supprimés)."""
+    alive = {path for path, _, _ in signature}
+    with _json_cache_lock:
+        for key in [k for k in _json_cache if k not in alive]:
+            del _json_cache[key]
 
 def is_data_empty(data):
     if data is None: return True
@@ -48,15 +135,28 @@ def get_nmap_data():
             data = read_json_file(json_path)
             if is_data_empty(data): continue
             
-            hosts_list = []
-            if isinstance(data, list): hosts_list = data
-            elif isinstance(data, dict) and 'hosts' in data: hosts_list = data['hosts']
-            else: continue
+            hosts_list = extract_nmap_hosts(data)
+            if hosts_list is None: continue
             
-            formatted_title = item.replace("_", ".").replace(".24", "/24")
-            results.append({"id": item, "title": f"Subnet: {formatted_title}", "hosts": hosts_list})
+            results.append({"id": item, "title": format_subnet_title(item), "hosts": hosts_list})
     return results
 
+def extract_nmap_hosts(data):
+    if isinstance(data, list): return data
+    if isinstance(data, dict) and 'hosts' in data: return data['hosts']
+    return None
+
+def format_subnet_title(item):
+    formatted_title = item.replace("_", ".").replace(".24", "/24")
+    return f"Subnet: {formatted_title}"
+
+def guess_domain_from_users(users):
+    """Déduit le domaine (CORP.LOCAL) à partir du distinguishedName du premier utilisateur."""
+    if isinstance(users, list) and len(users) > 0 and isinstance(users[0], dict) and "distinguishedName" in users[0]:
+        dcs = re.findall(r'DC=([^,]+)', users[0]["distinguishedName"])
+        if dcs: return ".".join(dcs)
+    return "Unknown"
+
 def get_ad_data():
     """
     Retourne une LISTE d'objets, un par DC trouvé dans scan/ldeep.
@@ -82,20 +182,15 @@ def get_ad_data():
             }
             
             # 1. Charger les données LDEEP
-            for f in ["users.json", "trusts.json", "delegations.json", "pkis.json", "ldap_results.json", "machines-ip.json"]:
+            for f in LDEEP_FILES:
                 f_path = dc_path / f
                 data = read_json_file(f_path)
                 if not is_data_empty(data):
                     dc_obj["ldeep"].append({"file": f, "data": data})
                     
                     # Tentative de deviner le domaine via le DN du premier user ou trust
-                    if dc_obj["domain"] == "Unknown":
-                        if f == "users.json" and isinstance(data, list) and len(data) > 0 and "distinguishedName" in data[0]:
-                            match = data[0]["distinguishedName"]
-                            # Logique simple extraction DC=...
-                            import re
-                            dcs = re.findall(r'DC=([^,]+)', match)
-                            if dcs: dc_obj["domain"] = ".".join(dcs)
+                    if dc_obj["domain"] == "Unknown" and f == "users.json":
+                        dc_obj["domain"] = guess_domain_from_users(data)
 
             # 2. Chercher les données CERTIPY correspondantes
             # On cherche un dossier dans certipy/ qui a le même nom (ou IP)
@@ -125,7 +220,7 @@ def get_manspider_data():
         subnet_path = manspider_dir / subnet_item
         if not subnet_path.is_dir(): continue
         
-        subnet_result = {"subnet": subnet_item.replace("_", "."), "files": None, "creds": None}
+        subnet_result = {"id": subnet_item, "subnet": subnet_item.replace("_", "."), "files": None, "creds": None}
         has_any_data = False
         
         enum_path = subnet_path / "enum_file.json"
@@ -143,6 +238,55 @@ def get_manspider_data():
         if has_any_data: results.append(subnet_result)
     return results
 
+# --- PAGINATION / FILTRAGE (endpoints par section) ---
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+def _safe_child(root, name):
+    """Retourne root/name si c'est bien un sous-dossier direct existant de root (pas de '..')."""
+    if not root.is_dir() or name not in os.listdir(root): return None
+    path = root / name
+    return path if path.is_dir() else None
+
+def _text_of(value):
+    if value is None: return ''
+    if isinstance(value, list): return ' '.join(_text_of(v) for v in value)
+    if isinstance(value, dict): return ' '.join(_text_of(v) for v in value.values())
+    return str(value)
+
+def _fields_text(obj, fields):
+    return ' '.join(_text_of(obj.get(f)) for f in fields).lower()
+
+def paginate(items, search_fields, text_of=None):
+    """
+    Applique ?q= (filtre texte insensible à la casse), ?offset= / ?limit= (pagination)
+    et ?fields=a,b (projection) sur une liste d'objets.
+    text_of(obj) permet de surcharger le texte indexé pour la recherche.
+    """
+    term = request.args.get("q", "").strip().lower()
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = request.args.get("limit", DEFAULT_PAGE_LIMIT, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_LIMIT)
+    fields = [f for f in request.args.get("fields", "").split(",") if f]
+
+    items = [i for i in (items or []) if isinstance(i, dict)]
+    if term:
+        text_of = text_of or (lambda obj: _fields_text(obj, search_fields))
+        items = [i for i in items if term in text_of(i)]
+
+    page = items[offset:offset + limit]
+    if fields:
+        page = [{f: i[f] for f in fields if f in i} for i in page]
+
+    return {"total": len(items), "offset": offset, "limit": limit, "items": page}
+
+def _nmap_host_text(host):
+    ports = ' '.join(
+        f"{p.get('port', '')} {p.get('service') or ''} {p.get('product') or ''}"
+        for p in host.get("ports") or [] if isinstance(p, dict)
+    )
+    return f"{host.get('ip') or ''} {host.get('hostname') or ''} {ports}".lower()
+
 # --- ROUTES WEB ---
 @app.route('/')
 def index():
@@ -160,16 +304,185 @@ def machines():
 def checklist():
     return render_template('checklist.html')
 
-@app.route('/api/data')
-def get_all_data():
-    full_data_structure = {
+def build_all_data():
+    return {
         "nmap_subnets": get_nmap_data(),
         "ad_enumeration": get_ad_data(), # Retourne maintenant une liste
         "file_analysis": {
             "manspider": get_manspider_data()
         }
     }
-    return jsonify(full_data_structure)
+
+@app.route('/api/data')
+def get_all_data():
+    # 1. ETag calculé à partir des seules signatures de fichiers (stat, pas de parsing)
+    etag = compute_etag(collect_data_signature())
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # 2. Reconstruction uniquement si un fichier a changé ; seuls les fichiers modifiés sont re-parsés
+    with _aggregate_lock:
+        if _aggregate_cache["etag"] != etag:
+            signature = collect_data_signature()
+            etag = compute_etag(signature)
+            prune_json_cache(signature)
+            _aggregate_cache["body"] = app.json.dumps(build_all_data())
+            _aggregate_cache["etag"] = etag
+        body = _aggregate_cache["body"]
+        etag = _aggregate_cache["etag"]
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/nmap')
+def api_nmap():
+    """Hôtes Nmap de tous les subnets (ou ?subnet=<id>), chaque hôte annoté avec son subnet."""
+    subnet_filter = request.args.get("subnet")
+    subnets, hosts_by_subnet = get_nmap_hosts()
+    if subnet_filter:
+        subnets = [s for s in subnets if s["id"] == subnet_filter]
+        hosts = hosts_by_subnet.get(subnet_filter, [])
+    else:
+        hosts = hosts_by_subnet[None]
+
+    result = paginate(hosts, ("ip", "hostname"), text_of=_nmap_host_text)
+    result["subnets"] = subnets
+    return jsonify(result)
+
+def get_nmap_hosts():
+    """
+    (subnets, {id du subnet: hôtes annotés, None: tous les hôtes}), construits une seule fois par
+    signature des full_scan.json : une page de /api/nmap ne recopie plus tous les hôtes.
+    """
+    signature = files_signature(nmap_json_paths())
+    with _nmap_hosts_lock:
+        if _nmap_hosts_cache["signature"] != signature:
+            subnets = []
+            hosts = {None: []}
+            for subnet in get_nmap_data():
+                subnets.append({"id": subnet["id"], "title": subnet["title"], "count": len(subnet["hosts"])})
+                annotated = [dict(host, subnet=subnet["id"]) for host in subnet["hosts"] if isinstance(host, dict)]
+                hosts[subnet["id"]] = annotated
+                hosts[None].extend(annotated)
+            _nmap_hosts_cache.update(signature=signature, subnets=subnets, hosts=hosts)
+        return _nmap_hosts_cache["subnets"], _nmap_hosts_cache["hosts"]
+
+@app.route('/api/ad')
+def api_ad():
+    """Liste des DC énumérés (sans les données volumineuses)."""
+    results = []
+    ldeep_root = SCAN_DATA_DIR / 'ldeep'
+    if ldeep_root.is_dir():
+        for dc_folder in sorted(os.listdir(ldeep_root)):
+            dc_path = ldeep_root / dc_folder
+            if not dc_path.is_dir(): continue
+            users = read_json_file(dc_path / "users.json")
+            machines = read_json_file(dc_path / "machines-ip.json")
+            results.append({
+                "dc_name": dc_folder,
+                "domain": guess_domain_from_users(users),
+                "users": len(users) if isinstance(users, list) else 0,
+                "machines": len(machines) if isinstance(machines, list) else 0,
+            })
+    return jsonify(results)
+
+def _ldeep_list(dc, filename):
+    dc_path = _safe_child(SCAN_DATA_DIR / 'ldeep', dc)
+    if dc_path is None: return None
+    data = read_json_file(dc_path / filename)
+    if isinstance(data, dict): data = [data]
+    return data or []
+
+@app.route('/api/ad/<dc>/users')
+def api_ad_users(dc):
+    users = _ldeep_list(dc, "users.json")
+    if users is None: return jsonify({"error": f"DC inconnu : {dc}"}), 404
+    return jsonify(paginate(users, ("sAMAccountName", "description", "displayName")))
+
+@app.route('/api/ad/<dc>/machines')
+def api_ad_machines(dc):
+    machines = _ldeep_list(dc, "machines-ip.json")
+    if machines is None: return jsonify({"error": f"DC inconnu : {dc}"}), 404
+    return jsonify(paginate(machines, ("sAMAccountName", "dNSHostName", "name", "operatingSystem", "description")))
+
+@app.route('/api/manspider')
+def api_manspider():
+    """Liste des subnets ManSpider disponibles."""
+    return jsonify([{"id": s["id"], "subnet": s["subnet"]} for s in get_manspider_data()])
+
+@app.route('/api/manspider/<subnet>')
+def api_manspider_subnet(subnet):
+    """Hôtes ManSpider d'un subnet : ?source=files (enum_file.json, défaut) ou ?source=creds (grepcreds.json)."""
+    subnet_path = _safe_child(SCAN_DATA_DIR / 'manspider', subnet)
+    if subnet_path is None: return jsonify({"error": f"Subnet inconnu : {subnet}"}), 404
+    source = request.args.get("source", "files")
+    if source not in ("files", "creds"): return jsonify({"error": f"Source invalide : {source}"}), 400
+
+    filename = "enum_file.json" if source == "files" else "grepcreds.json"
+    data = read_json_file(subnet_path / filename)
+    hosts = data if is_valid_manspider_output(data) else []
+    return jsonify(paginate(hosts, ("ip", "files")))
+
+# --- SESSIONS (tools/session-hunter.py) ---
+def _sessions_index(domain):
+    """index.json d'un domaine (relu seulement s'il a changé), None si le domaine est inconnu."""
+    domain_path = _safe_child(SCAN_DATA_DIR / 'sessions', domain.lower())
+    if domain_path is None: return None
+    return read_json_file(domain_path / "index.json") or {}
+
+@app.route('/api/sessions')
+def api_sessions():
+    """Domaines pour lesquels des sessions ont été collectées."""
+    results = []
+    sessions_root = SCAN_DATA_DIR / 'sessions'
+    if sessions_root.is_dir():
+        for domain in sorted(os.listdir(sessions_root)):
+            index = _sessions_index(domain)
+            if not index: continue
+            results.append({
+                "domain": domain,
+                "updated": index.get("updated"),
+                "hosts": len(index.get("hosts", {})),
+                "users": len(index.get("users", {})),
+                "high_value": len(index.get("high_value", [])),
+            })
+    return jsonify(results)
+
+@app.route('/api/sessions/<domain>')
+def api_sessions_domain(domain):
+    """
+    Sessions courantes d'un domaine, via les index de SessionStore :
+    ?user=<sAMAccountName | DOMAINE\\user> (hôtes où il est connecté, avec la date de l'énumération),
+    ?host=<hôte> (sessions de l'hôte), ?high_value=1 (sessions adminCount=1) ; sans filtre, toutes les
+    sessions (paginées, ?q=). Les hôtes non confirmés au dernier balayage sont exclus, sauf ?host= et
+    ?stale=1 (sans filtre) qui les renvoient avec "stale": true.
+    """
+    index = _sessions_index(domain)
+    if index is None: return jsonify({"error": f"Domaine inconnu : {domain}"}), 404
+    hosts = index.get("hosts", {})
+
+    user = request.args.get("user")
+    if user:
+        # Même clé que SessionStore.user_key : sAMAccountName en minuscules
+        key = user.strip().split("\\")[-1].split("@")[0].lower()
+        found = index.get("users", {}).get(key, [])
+        return jsonify({"user": user, "hosts": [{"host": h, "ts": hosts.get(h, {}).get("ts")} for h in found]})
+    host = request.args.get("host")
+    if host:
+        entry = hosts.get(host)
+        if entry is None: return jsonify({"error": f"Hôte inconnu : {host}"}), 404
+        return jsonify({"host": host, **entry})
+    if request.args.get("high_value") in ("1", "true"):
+        return jsonify(paginate(index.get("high_value", []), ("host", "user", "sid")))
+
+    with_stale = request.args.get("stale") in ("1", "true")
+    sessions = [{"host": h, "ts": e["ts"], "stale": e.get("stale", False), **s}
+                for h, e in sorted(hosts.items()) if with_stale or not e.get("stale")
+                for s in e["sessions"]]
+    return jsonify(paginate(sessions, ("host", "user", "sid")))
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=WEBSERVER_PORT, use_reloader=False)
\ No newline at end of file
@@ -31,6 +31,10 @@ GOWITNESS_SCREENSHOT_PATH_ABSOLUTE = str(GOWITNESS_OUTPUT_GLOBAL)
 GOWITNESS_REPORT_PORT = 7171
 GOWITNESS_SERVER_LOG = OUTPUT_BASE_DIR / "gowitness_server.log"
 GOWITNESS_THREADS = 10
+# Alimentation incrémentale de GoWitness pendant le scan Nmap
+GOWITNESS_WEB_PORTS = {80, 443, 8080, 8443, 3000, 5000}
+GOWITNESS_BATCH_SIZE = 50        # URLs par lot passé à gowitness
+GOWITNESS_FLUSH_INTERVAL = 15    # secondes max avant d'envoyer un lot incomplet
 
 # BloodHound & Neo4j
 BLOODHOUND_UI_LOG = OUTPUT_BASE_DIR / "bloodhound_ui_log"
@@ -42,4 +46,116 @@ WEBSERVER_LOG = PROJECT_ROOT / "scan" / "webserver.log" # On met le log dans sca
 
 # Nmap
 ALL_PORTS_NMAP = "80,443,8080,8443,3000,5000,88,445,139,53,135,5985,5986,3389,1433"
-NMAP_OPTIONS = "-Pn --min-rate 1000 -T5"
\ No newline at end of file
+NMAP_OPTIONS = "-Pn --min-rate 1000 -T5 --stats-every 60s"
+# Nmap sharding : un CIDR plus large que NMAP_SHARD_PREFIX est découpé en shards scannés en parallèle
+NMAP_SHARD_PREFIX = 24      # 0 pour désactiver (un seul process nmap par subnet)
+NMAP_MAX_PROCESSES = 8      # budget global de process nmap (tous subnets confondus)
+NMAP_MERGE_INTERVAL = 30    # secondes minimum entre deux fusions partielles dans full_scan.xml/json
+
+# Nmap pipeline : "full" (-sV -sC sur tout le subnet) ou "pipeline" (découverte SYN rapide
+# puis -sV -sC uniquement sur les couples hôte:port ouverts)
+NMAP_SCAN_MODE = "full"
+NMAP_DISCOVERY_OPTIONS = "-sS -Pn -n --open --min-rate 5000 -T4 --stats-every 60s"
+
+# Collecte LDAP GrayBox : "native" (ldap3, un seul bind, scanners/ldap_collector.py) ou "ldeep" (5 process).
+# En mode natif, ldeep reste utilisé en repli si ldap3 est absent ou si la collecte échoue.
+LDAP_COLLECTOR_BACKEND = "native"
+LDAP_PAGE_SIZE = 1000           # taille des pages (limite AD par défaut : 1000)
+LDAP_RESOLVE_THREADS = 32       # résolutions DNS simultanées pour machines-ip.json
+LDAP_CONNECT_TIMEOUT = 10
+
+# Instantanés LDAP partagés (utils/ldap_snapshot.py) : GrayBox, session-hunter, find-interestings-acl
+LDAP_SNAPSHOT_DB = OUTPUT_BASE_DIR / "ldap_snapshots.sqlite3"
+LDAP_SNAPSHOT_TTL = 24 * 3600   # secondes ; 0 = pas d'expiration
+# GrayBox refait toujours le parcours LDAP et ne fait qu'écrire l'instantané ; True = réutiliser un
+# instantané de moins de LDAP_SNAPSHOT_TTL (relances rapides sur le même domaine)
+LDAP_SNAPSHOT_REUSE_GRAYBOX = False
+
+# Ldeep : dumps (trusts, pkis, delegations, users, computers) lancés en parallèle par DC
+LDEEP_MAX_PARALLEL_DUMPS = 3
+
+# Ordonnanceur global des process externes (utils/scheduler.py)
+SCHEDULER_MAX_PROCESSES = 16        # tous outils confondus
+SCHEDULER_DEFAULT_TOOL_LIMIT = 4    # outils absents de SCHEDULER_TOOL_LIMITS
+# Jobs Python (scheduler.submit) : threads par niveau d'imbrication (un job lancé depuis un job va au niveau suivant)
+SCHEDULER_MAX_JOBS = 32
+SCHEDULER_TOOL_LIMITS = {
+    "nmap": NMAP_MAX_PROCESSES,
+    "nxc": 4,
+    "gowitness": 2,
+    "certipy": 3,
+    "ldeep": 6,
+    "bloodhound-ce.py": 2,
+    "manspider": 3,
+}
+# Priorité par outil : 0 = haute (rapide, débloque la suite), 1 = normale, 2 = basse (bulk)
+SCHEDULER_TOOL_PRIORITIES = {
+    "nxc": 0,
+    "ldeep": 0,
+    "certipy": 0,
+    "nmap": 1,
+    "bloodhound-ce.py": 1,
+    "gowitness": 2,
+    "manspider": 2,
+}
+
+# Exécution des commandes (utils/command_runner.py) : logs rotatifs par job et timeouts
+CMD_LOG_DIR = OUTPUT_BASE_DIR / "logs"
+CMD_LOG_MAX_BYTES = 5 * 1024 * 1024
+CMD_LOG_BACKUPS = 3
+# (durée max en s, durée max sans sortie en s) ; None = pas de limite
+CMD_DEFAULT_TIMEOUTS = (None, None)
+CMD_TOOL_TIMEOUTS = {
+    "nmap": (None, 900),            # nmap est lancé avec --stats-every : silence prolongé = process bloqué
+    "nxc": (4 * 3600, 1800),
+    "certipy": (3600, 900),
+    "ldeep": (3 * 3600, 1800),
+    "bloodhound-ce.py": (4 * 3600, 1800),
+    "gowitness": (2 * 3600, 900),
+}
+
+# Concurrence adaptative AIMD des outils AD (utils/adaptive_limiter.py) : find-interestings-acl, session-hunter
+ADAPTIVE_INITIAL = 4            # workers au démarrage (borné par --threads)
+ADAPTIVE_WINDOW = 20            # réponses par fenêtre d'évaluation
+ADAPTIVE_MAX_ERROR_RATE = 0.05  # au-delà : recul
+ADAPTIVE_LATENCY_FACTOR = 2.0   # p95 toléré = facteur x p95 de référence (fenêtres saines)
+ADAPTIVE_BACKOFF = 0.5          # recul multiplicatif sur timeout / serveur occupé / anomalie d'authentification
+ADAPTIVE_COOLDOWN = 5           # secondes minimum entre deux reculs
+ADAPTIVE_AUTH_ABORT = 5         # échecs d'authentification consécutifs avant arrêt (risque de verrouillage)
+
+# Pré-sondes TCP (utils/tcp_probe.py) : les noms sont résolus avant la connexion, sur un pool dédié
+PROBE_RESOLVE_THREADS = 64
+PROBE_RESOLVE_TIMEOUT = 5.0     # secondes par nom
+
+# Session hunter (tools/session-hunter.py) : pré-sonde TCP 445 asyncio puis passe winreg sur les hôtes joignables
+SESSION_PROBE_CONCURRENCY = 512 # connexions TCP simultanées de la pré-sonde
+SESSION_PROBE_TIMEOUT = 1.0     # secondes par hôte (connexion TCP seule, hors résolution DNS)
+SESSION_RPC_TIMEOUT = 10        # timeout de connexion SMB/DCERPC de la passe winreg
+# Mode --watch : période de repolling normale, période des hôtes "chauds" (session à privilèges vue récemment)
+SESSION_WATCH_INTERVAL = 300    # secondes
+SESSION_WATCH_HOT_INTERVAL = 60
+SESSION_WATCH_HOT_TTL = 1800    # un hôte reste chaud tant qu'une session high value y a été vue depuis moins de TTL s
+# Sessions trouvées par tools/session-hunter.py (journal JSONL + index par domaine)
+SESSIONS_DIR = OUTPUT_BASE_DIR / "sessions"
+# ManSpider : trace ligne à ligne du parsing (scan/manspider/<subnet>/manspider_parse_debug.txt)
+MANSPIDER_PARSE_DEBUG = False
+# Loot des shares (utils/loot_store.py) : index SQLite (hôte, share, chemin, taille, mtime) -> SHA-256,
+# contenus dédupliqués sous LOOT_BLOB_DIR/<2 premiers caractères>/<sha256>, grep mis en cache par contenu
+LOOT_DB = OUTPUT_BASE_DIR / "loot.sqlite3"
+LOOT_BLOB_DIR = OUTPUT_BASE_DIR / "loot" / "blobs"
+
+# Crawler SMB natif (scanners/share_crawler.py) : hôtes explorés en parallèle, connexions SMB par hôte,
+# règles ShareQL appliquées pendant le parcours (dans cet ordre : la première règle correspondante décide)
+SHARE_CRAWLER_HOSTS = 32
+SHARE_CRAWLER_CONNECTIONS = 4
+SHARE_CRAWLER_TIMEOUT = 5          # secondes (connexion et requêtes SMB)
+SHARE_CRAWLER_PROBE_CONCURRENCY = 512
+SHARE_CRAWLER_MAX_DOWNLOAD = 10 * 1024 * 1024   # taille max d'un fichier téléchargé pour le grep
+SHARE_CRAWLER_RULES = [
+    PROJECT_ROOT / "rules" / "max_depth_2.shareql",
+    PROJECT_ROOT / "rules" / "skip_common_shares.shareql",
+    PROJECT_ROOT / "rules" / "focus_sensitive_ext.shareql",
+    PROJECT_ROOT / "rules" / "private_dirs.shareql",
+]
+# ManSpider : ne garder dans enum_file.json / grepcreds.json que les fichiers retenus par SHARE_CRAWLER_RULES
+MANSPIDER_SHAREQL_FILTER = False
@@ -0,0 +1,172 @@
+import hashlib
+import re
+
+
+class CredentialMatcher:
+    """
+    Recherche de mots-clés de credentials dans le contenu des fichiers (loot ManSpider, crawler de shares).
+    - Les mots-clés sont insensibles à la casse : une seule règle par mot, quelle que soit sa casse.
+    - Toutes les règles sont compilées en UNE expression régulière factorisée par préfixes (trie) :
+      un seul passage sur le texte, la plus longue correspondance l'emporte ("db_password" et non "db").
+      Un mot-clé doit commencer un mot : précédé d'un caractère non alphanumérique ("_", "-" compris)
+      ou d'une bosse camelCase ("DefaultPassword") ; "compass", "bypass" ou "superuser" ne comptent pas.
+      Les mots de 3 lettres ou moins ("ad", "db", "sa"...) n'acceptent que des mots entiers.
+      Les balises XML fermantes (</password>) ne sont pas comptées.
+      Le texte est mis en minuscules avant la recherche : re.IGNORECASE désactive le préfiltrage sur
+      le premier caractère de sre et rend la recherche ~3x plus lente.
+    - Chaque correspondance est notée : poids du mot (fort / moyen / faible), doublé si le mot est suivi
+      d'une valeur affectée ("password = xxx", password="xxx", <password>xxx) : un `password=` renseigné
+      l'emporte sur un `user` isolé. Une ligne compte pour sa meilleure correspondance.
+    """
+
+    STRONG, MEDIUM, WEAK = 5, 2, 1
+    ASSIGNMENT_FACTOR = 2
+    MAX_SNIPPETS = 10
+    SNIPPET_LENGTH = 200
+
+    KEYWORDS = {
+        STRONG: [
+            "password", "passwd", "passw", "pass", "pwd", "pswd", "pword",
+            "motdepasse", "mot_de_passe", "mot-de-passe", "mdp", "passe",
+            "userpassword", "user_password", "user-password",
+            "adminpassword", "admin_password", "admin-password",
+            "rootpassword", "root_password", "root-password",
+            "dbpassword", "db_password", "database_password",
+            "sqlpassword", "sql_password", "apipassword", "api_password",
+            "servicepassword", "service_password", "svc_password",
+            "ldap_password", "ad_password", "smtp_password", "ftp_password",
+            "ssh_password", "rdp_password", "vpn_password",
+            "credential", "credentials", "cred", "creds",
+            "secret", "secrets", "secret_key", "privatekey", "private_key", "private-key",
+            "apikey", "api_key", "api-key", "token", "access_token", "accesstoken", "bearer",
+            "connectionstring", "connection_string", "ntlm",
+        ],
+        MEDIUM: [
+            "auth", "authentication", "login", "logon", "username",
+            "key", "keys", "administrator", "domainadmin", "domain_admin", "sysadmin", "sudo",
+            "dsn", "certificate", "cert", "pfx", "p12", "hash", "encrypted", "cipher",
+            "account", "compte", "identifiant", "utilisateur",
+        ],
+        WEAK: [
+            "user", "admin", "root", "sa", "ldap", "ad", "smtp", "ftp", "ssh", "rdp", "vpn",
+            "sql", "mysql", "postgres", "oracle", "database", "db",
+            "config", "configuration", "settings", "backup", "bak", "old", "copy", "lm",
+        ],
+    }
+
+    # Valeur affectée juste après le mot-clé : "= x", ": x", '="x"', ">x" (XML)
+    VALUE_PATTERN = r"""(?:["']?\s*[:=>]\s*(?P<value>"[^"\n]{2,}"|'[^'\n]{2,}'|[^\s"'<>;,]{2,}))?"""
+
+    def __init__(self, keywords=None):
+        """keywords : {poids: [mots]} (défaut KEYWORDS). Un mot présent dans plusieurs niveaux garde le plus fort."""
+        self.weights = {}
+        for weight, words in (keywords or self.KEYWORDS).items():
+            for word in words:
+                word = word.lower()
+                self.weights[word] = max(weight, self.weights.get(word, 0))
+
+        short = [w for w in self.weights if len(w) <= 3]
+        long_ = [w for w in self.weights if len(w) > 3]
+        alternatives = []
+        if long_:
+            alternatives.append(self._trie_pattern(long_))
+        if short:
+            alternatives.append(r"(?<![a-z0-9])" + self._trie_pattern(short) + r"(?![a-z0-9])")
+        pattern = f"(?<!</)(?P<kw>{'|'.join(alternatives)}){self.VALUE_PATTERN}"
+        self.regex = re.compile(pattern)
+        # Identifie le jeu de règles (cache des résultats par contenu : utils/loot_store.py)
+        self.fingerprint = hashlib.sha1(f"{pattern}|{sorted(self.weights.items())}|{self.ASSIGNMENT_FACTOR}".encode()).hexdigest()[:16]
+        # Texte dont la mise en minuscules change la longueur (rares caractères Unicode) : offsets d'origine conservés
+        self.regex_ignorecase = re.compile(pattern, re.IGNORECASE)
+
+    @staticmethod
+    def _trie_pattern(words):
+        """Mots -> regex factorisée par préfixes (une seule branche possible à chaque caractère)."""
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            group = branches[0] if len(branches) == 1 and "" not in node else f"(?:{'|'.join(branches)})"
+            # Suffixe optionnel gourmand : la plus longue correspondance est tentée en premier
+            return f"(?:{group})?" if "" in node else group
+
+        return f"(?:{build(trie)})"
+
+    @staticmethod
+    def _word_start(text, start):
+        """text[start] commence-t-il un mot ? (séparateur avant, ou bosse camelCase : "dbPassword", "XMLPassword")"""
+        if start == 0:
+            return True
+        previous, first = text[start - 1], text[start]
+        if not previous.isalnum():
+            return True
+        if not first.isupper():
+            return False
+        return not previous.isupper() or text[start + 1:start + 2].islower()
+
+    def patterns(self):
+        """Mots-clés dédupliqués (minuscules), pour l'option -c de ManSpider (recherche déjà insensible à la casse)."""
+        return sorted(self.weights)
+
+    # ------ Recherche ------
+    def scan_text(self, text):
+        """
+        Retourne {"score", "matches": [{keyword, count}], "code_snippets": [...]} (même schéma que les
+        fichiers de grepcreds.json, plus le score). Score = somme des meilleures correspondances par ligne ;
+        les extraits retenus sont ceux des lignes les mieux notées.
+        """
+        weights = self.weights
+        counts = {}
+        best = {}           # début de ligne -> meilleur score
+        lowered = text.lower()
+        regex, subject = (self.regex, lowered) if len(lowered) == len(text) else (self.regex_ignorecase, text)
+        search = regex.search
+        pos = 0
+        while True:
+            m = search(subject, pos)
+            if m is None:
+                break
+            # Limite de mot testée sur le texte d'origine (la casse porte les bosses camelCase)
+            if not self._word_start(text, m.start()):
+                pos = m.start() + 1
+                continue
+            pos = m.end()
+            keyword = m.group("kw").lower()
+            counts[keyword] = counts.get(keyword, 0) + 1
+            score = weights[keyword] * (self.ASSIGNMENT_FACTOR if m.group("value") else 1)
+
+            start = text.rfind("\n", 0, m.start()) + 1
+            previous = best.get(start)
+            if previous is None or score > previous:
+                best[start] = score
+
+        top = sorted(best.items(), key=lambda item: -item[1])[:self.MAX_SNIPPETS]
+        snippets = []
+        for start, _score in sorted(top):
+            end = text.find("\n", start)
+            snippets.append(text[start:end if end != -1 else len(text)].strip()[:self.SNIPPET_LENGTH])
+
+        return {
+            "score": sum(best.values()),
+            "matches": [{"keyword": k, "count": str(n)} for k, n in sorted(counts.items(), key=lambda kv: -kv[1])],
+            "code_snippets": snippets,
+        }
+
+    def scan_bytes(self, data):
+        """Contenu brut d'un fichier : UTF-16 si BOM (scripts/configs Windows), sinon UTF-8 tolérant."""
+        if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+            text = data.decode("utf-16", errors="replace")
+        else:
+            text = data.decode("utf-8", errors="replace")
+        return self.scan_text(text)
+
+    def scan_file(self, path, max_bytes=None):
+        with open(path, "rb") as f:
+            return self.scan_bytes(f.read(max_bytes if max_bytes else -1))
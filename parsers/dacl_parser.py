@@ -0,0 +1,211 @@
+import struct
+
+
+class DaclParser:
+    """
+    Lecture binaire d'un nTSecurityDescriptor (format auto-relatif, MS-DTYP 2.4.6),
+    sans impacket : en-tête -> DACL -> ACE. Les droits sont rendus avec les noms de
+    `dacledit.py -action read` pour garder le même filtrage et le même JSON.
+    """
+
+    # Types d'ACE "simples" (masque + SID) et "objet" (masque + flags + GUIDs + SID)
+    BASIC_ACE_TYPES = {0x00, 0x01, 0x02, 0x03}
+    OBJECT_ACE_TYPES = {0x05, 0x06, 0x07, 0x08}
+    ACE_OBJECT_TYPE_PRESENT = 0x1
+    ACE_INHERITED_OBJECT_TYPE_PRESENT = 0x2
+
+    # En-tête d'ACE + masque (type, flags, taille, masque) lus en un seul appel
+    ACE_HEADER = struct.Struct("<BBHI")
+    UINT32 = struct.Struct("<I")
+
+    # Exclusion "Principal Self en lecture seule" : bits de lecture / d'écriture du masque
+    PRINCIPAL_SELF = "S-1-5-10"
+    READ_BITS = 0x80000000 | 0x00020000 | 0x00000010   # GenericRead, ReadControl, ReadProperty
+    WRITE_BITS = 0x40000000 | 0x00080000 | 0x00040000 | 0x00000020   # GenericWrite, WriteOwner, WriteDACL, WriteProperty
+
+    # Même ordre et mêmes noms que dacledit.py
+    SIMPLE_PERMISSIONS = [
+        ("FullControl", 0xF01FF),
+        ("Modify", 0x0301BF),
+        ("ReadAndExecute", 0x0200A9),
+        ("ReadAndWrite", 0x02019F),
+        ("Read", 0x20094),
+        ("Write", 0x200BC),
+    ]
+    ACCESS_MASK = [
+        ("GenericRead", 0x80000000),
+        ("GenericWrite", 0x40000000),
+        ("GenericExecute", 0x20000000),
+        ("GenericAll", 0x10000000),
+        ("MaximumAllowed", 0x02000000),
+        ("AccessSystemSecurity", 0x01000000),
+        ("Synchronize", 0x00100000),
+        ("WriteOwner", 0x00080000),
+        ("WriteDACL", 0x00040000),
+        ("ReadControl", 0x00020000),
+        ("Delete", 0x00010000),
+        ("AllExtendedRights", 0x00000100),
+        ("ListObject", 0x00000080),
+        ("DeleteTree", 0x00000040),
+        ("WriteProperties", 0x00000020),
+        ("ReadProperties", 0x00000010),
+        ("Self", 0x00000008),
+        ("ListChildObjects", 0x00000004),
+        ("DeleteChild", 0x00000002),
+        ("CreateChild", 0x00000001),
+    ]
+    OBJECT_ACE_MASK_FLAGS = [
+        ("ControlAccess", 0x100),
+        ("CreateChild", 0x1),
+        ("DeleteChild", 0x2),
+        ("ReadProperty", 0x10),
+        ("WriteProperty", 0x20),
+        ("Self", 0x8),
+    ]
+
+    @staticmethod
+    def parse_sid(data, offset=0):
+        """SID binaire -> 'S-1-5-21-...' (None si tronqué)."""
+        if len(data) < offset + 8:
+            return None
+        count = data[offset + 1]
+        end = offset + 8 + 4 * count
+        if len(data) < end:
+            return None
+        authority = int.from_bytes(data[offset + 2:offset + 8], "big")
+        subs = struct.unpack_from(f"<{count}I", data, offset + 8)
+        return f"S-{data[offset]}-{authority}" + "".join(f"-{s}" for s in subs)
+
+    @staticmethod
+    def iter_aces(sd):
+        """
+        Génère (type, flags, masque, SID du trustee) pour chaque ACE de la DACL.
+        Un descripteur sans DACL (ou tronqué) ne génère rien ; les types d'ACE inconnus
+        (callback, ...) sont ignorés comme le fait dacledit.
+        """
+        for ace_type, ace_flags, mask, sid_offset in DaclParser.walk_aces(sd):
+            sid = DaclParser.parse_sid(sd, sid_offset)
+            if sid is not None:
+                yield ace_type, ace_flags, mask, sid
+
+    @staticmethod
+    def walk_aces(sd):
+        """Comme iter_aces mais sans décoder le SID : (type, flags, masque, offset du SID)."""
+        if not sd or len(sd) < 20:
+            return
+        size = len(sd)
+        dacl_offset = DaclParser.UINT32.unpack_from(sd, 16)[0]
+        if not dacl_offset or size < dacl_offset + 8:
+            return
+        ace_count = struct.unpack_from("<H", sd, dacl_offset + 4)[0]
+        offset = dacl_offset + 8
+        read_header = DaclParser.ACE_HEADER.unpack_from
+        basic_types, object_types = DaclParser.BASIC_ACE_TYPES, DaclParser.OBJECT_ACE_TYPES
+
+        for _ in range(ace_count):
+            if size < offset + 8:
+                return
+            ace_type, ace_flags, ace_size, mask = read_header(sd, offset)
+            if ace_size < 8:
+                return
+
+            if ace_type in basic_types:
+                yield ace_type, ace_flags, mask, offset + 8
+            elif ace_type in object_types and size >= offset + 12:
+                object_flags = DaclParser.UINT32.unpack_from(sd, offset + 8)[0]
+                sid_offset = offset + 12
+                if object_flags & DaclParser.ACE_OBJECT_TYPE_PRESENT:
+                    sid_offset += 16
+                if object_flags & DaclParser.ACE_INHERITED_OBJECT_TYPE_PRESENT:
+                    sid_offset += 16
+                yield ace_type, ace_flags, mask, sid_offset
+            offset += ace_size
+
+    @staticmethod
+    def format_rights(ace_type, mask):
+        """
+        Droits lisibles, avec les noms de la ligne 'Access mask' de dacledit :
+        - ACE simple : première permission composée incluse, puis les bits restants de ACCESS_MASK
+          (dacledit remet tout le masque à zéro après une permission composée et masque ainsi
+          p. ex. le WriteDACL d'un 'Read' : ici seuls les bits de la permission composée sont retirés) ;
+        - ACE objet : uniquement les droits DS (ControlAccess, WriteProperty, ...).
+        """
+        names = []
+        if ace_type in DaclParser.OBJECT_ACE_TYPES:
+            for name, value in DaclParser.OBJECT_ACE_MASK_FLAGS:
+                if mask & value == value:
+                    names.append(name)
+            return ", ".join(names)
+
+        for name, value in DaclParser.SIMPLE_PERMISSIONS:
+            if mask & value == value:
+                names.append(name)
+                mask &= ~value
+                break
+        for name, value in DaclParser.ACCESS_MASK:
+            if mask & value:
+                names.append(name)
+        return ", ".join(names)
+
+    # ------ Filtrage par masques entiers (workers du scan bulk) ------
+    @staticmethod
+    def compile_rights(interesting):
+        """
+        Noms de droits intéressants (INTERESTING_MASKS) -> (bits, composites).
+        Un nom retient chaque droit connu dont le nom le contient (même logique de sous-chaîne
+        que le filtre texte de dacledit) : les droits à un bit sont regroupés dans `bits`
+        (test par un seul ET), les permissions composées (FullControl, ...) restent dans
+        `composites` sauf si un de leurs bits est déjà dans `bits`.
+        """
+        known = DaclParser.SIMPLE_PERMISSIONS + DaclParser.ACCESS_MASK + DaclParser.OBJECT_ACE_MASK_FLAGS
+        bits = 0
+        composites = set()
+        for interest in interesting:
+            for name, value in known:
+                if interest.lower() not in name.lower():
+                    continue
+                if value & (value - 1) == 0:
+                    bits |= value
+                else:
+                    composites.add(value)
+        return bits, tuple(sorted(c for c in composites if not c & bits))
+
+    @staticmethod
+    def analyse_chunk(chunk, bits, composites, trustees=None):
+        """
+        Travail d'un worker : chunk = [(dn, descripteur brut), ...].
+        trustees : ensemble de SID à retenir (filtre -f précalculé), None = tous.
+        Retourne (nombre d'ACE lues, [(dn, SID du trustee, droits), ...]) pour les seules ACE
+        intéressantes. Le SID n'est décodé qu'après le test du masque ; SID et rendu des droits
+        sont mis en cache (beaucoup d'ACE héritées identiques d'un objet à l'autre).
+        """
+        ace_count = 0
+        findings = []
+        sids = {}
+        rendered = {}
+        object_types = DaclParser.OBJECT_ACE_TYPES
+        principal_self = DaclParser.PRINCIPAL_SELF
+        read_bits, write_bits = DaclParser.READ_BITS, DaclParser.WRITE_BITS
+
+        for dn, sd in chunk:
+            for ace_type, _flags, mask, sid_offset in DaclParser.walk_aces(sd):
+                ace_count += 1
+                if not mask & bits and not any(mask & c == c for c in composites):
+                    continue
+
+                raw_sid = sd[sid_offset:sid_offset + 8 + 4 * sd[sid_offset + 1]] if len(sd) > sid_offset + 1 else b""
+                sid = sids.get(raw_sid)
+                if sid is None:
+                    sid = sids[raw_sid] = DaclParser.parse_sid(raw_sid)
+                if sid is None or (trustees is not None and sid not in trustees):
+                    continue
+                if sid == principal_self and mask & read_bits and not mask & write_bits:
+                    continue
+
+                key = (ace_type in object_types, mask)
+                rights = rendered.get(key)
+                if rights is None:
+                    rights = rendered[key] = DaclParser.format_rights(ace_type, mask)
+                findings.append((dn, sid, rights))
+
+        return ace_count, findings
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+
+
+class ManSpiderOutputParser:
+    """
+    Parsing ligne à ligne de la sortie ManSpider, alimenté pendant l'exécution (run_cmd(on_line=...)).
+    Chaque fichier trouvé est écrit aussitôt dans un journal JSON Lines (findings_path) :
+    - format classique "IP: SHARE\\fichier (taille)" -> {"ip", "path", "size"} ;
+    - format grep "IP\\SHARE\\fichier: matched "mot" N times" -> {"ip", "path", "matches", "code_snippets"},
+      complété par les extraits de code qui suivent. Seul le dernier fichier grep est gardé en mémoire
+      (référence directe) ; il est écrit dès qu'un autre fichier prend sa place.
+    build() regroupe ensuite le journal par hôte, au format des enum_file.json / grepcreds.json.
+    rules (optionnel, ShareQLRules) : seuls les fichiers que ces règles retiennent sont regroupés.
+    debug_path (optionnel) trace la décision prise pour chaque ligne.
+    """
+
+    ANSI_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+    KEYWORD_RE = re.compile(r'"([^"]+)"\s+(\d+)\s+times?')
+    MAX_SNIPPETS = 10
+
+    def __init__(self, findings_path, debug_path=None, rules=None):
+        self.findings_path = findings_path
+        self.rules = rules
+        self._out = open(findings_path, "w", encoding="utf-8")
+        self._dbg = open(debug_path, "w", encoding="utf-8") if debug_path else None
+        self.logged_in = {}      # IP -> None, dans l'ordre des connexions réussies
+        self.lines = 0
+        self.files = 0
+        self._current_key = None
+        self._current = None     # dernier fichier grep (extraits de code en attente)
+
+    def _debug(self, message):
+        if self._dbg is not None:
+            self._dbg.write(f"[LINE {self.lines}] {message}\n")
+
+    def _write(self, record):
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _flush_current(self):
+        if self._current is not None:
+            self._write(self._current)
+            self._current = None
+            self._current_key = None
+
+    # ------ Alimentation ------
+    def feed(self, raw_line):
+        self.lines += 1
+        line = (self.ANSI_RE.sub("", raw_line) if "\x1b" in raw_line else raw_line).strip()
+        if self._dbg is not None:
+            self._debug(f"CLEAN : {line!r}")
+
+        if not line.startswith("[+]") or len(line) < 4:
+            return
+        content = line[4:].strip()
+
+        # 1. Connexion réussie : "IP: Successful login as "user""
+        if 'Successful login as "' in content and ": " in content:
+            ip = content.split(": ", 1)[0].strip()
+            self.logged_in.setdefault(ip, None)
+            self._debug(f"LOGIN {ip}")
+            return
+
+        # 2. Format grep : "10.3.10.11\NETLOGON\script.ps1: matched "keyword" N times"
+        if ": matched " in content:
+            self._feed_match(content)
+            return
+
+        # 3. Extraits de code (lignes qui suivent un match)
+        if ":" not in content or content.startswith(("$", "#", "//")) or "=" in content:
+            current = self._current
+            if current is not None and len(current["code_snippets"]) < self.MAX_SNIPPETS:
+                current["code_snippets"].append(content)
+                self._debug("CODE SNIPPET")
+            return
+
+        # 4. Format classique : "IP: SHARE\file.ext (SIZE)"
+        ip, rest = content.split(": ", 1) if ": " in content else (content, "")
+        ip, rest = ip.strip(), rest.strip()
+        if ip in self.logged_in and " (" in rest and rest.endswith(")"):
+            path_part, size_part = rest.rsplit(" (", 1)
+            self._write({"ip": ip, "path": path_part.strip(), "size": size_part[:-1].strip()})
+            self.files += 1
+            self._debug(f"FILE {path_part.strip()!r}")
+        else:
+            self._debug("SKIP : format non reconnu ou IP non connectée")
+
+    def _feed_match(self, content):
+        full_path, match_info = content.split(": matched ", 1)
+        keyword_match = self.KEYWORD_RE.search(match_info)
+        if keyword_match:
+            keyword, match_count = keyword_match.group(1), keyword_match.group(2)
+        else:
+            keyword, match_count = "unknown", match_info.split()[0] if match_info else "unknown"
+
+        # Séparer l'IP du chemin
+        parts = full_path.replace("\\\\", "\\").split("\\", 1)
+        ip = parts[0].strip()
+        file_path = parts[1].strip() if len(parts) == 2 else full_path.strip()
+        if ip not in self.logged_in:
+            self._debug(f"SKIP : IP {ip} non connectée")
+            return
+
+        key = (ip, file_path)
+        if key != self._current_key:
+            self._flush_current()
+            self._current_key = key
+            self._current = {"ip": ip, "path": file_path, "matches": [], "code_snippets": []}
+            self.files += 1
+        self._current["matches"].append({"keyword": keyword, "count": match_count})
+        self._debug(f"MATCH {file_path!r} {keyword!r} x{match_count}")
+
+    def close(self):
+        self._flush_current()
+        self._out.close()
+        if self._dbg is not None:
+            self._dbg.close()
+
+    # ------ Résultat final ------
+    def build(self):
+        return self.group_findings(self.findings_path, self.logged_in, self.rules)
+
+    def write_json(self, json_path):
+        return self.write_grouped(self.findings_path, self.logged_in, json_path, self.rules)
+
+    @classmethod
+    def group_findings(cls, findings_path, hosts, rules=None):
+        """
+        Relit un journal de fichiers trouvés et regroupe par hôte (`hosts` : IP dans l'ordre d'affichage,
+        les autres sont ajoutées à la suite) : fichiers classiques dans l'ordre, puis fichiers grep
+        (un même fichier revu plus tard est fusionné, extraits limités à MAX_SNIPPETS).
+        rules : ShareQLRules, les fichiers écartés par rules.keeps() sont ignorés.
+        """
+        grouped = {ip: {"ip": ip, "files": []} for ip in hosts}
+        matched = {}
+        with open(findings_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ip = record.pop("ip")
+                if rules is not None and not rules.keeps(record["path"]):
+                    continue
+                if "matches" not in record:
+                    grouped.setdefault(ip, {"ip": ip, "files": []})["files"].append(record)
+                    continue
+                entry = matched.get((ip, record["path"]))
+                if entry is None:
+                    matched[(ip, record["path"])] = record
+                else:
+                    entry["matches"].extend(record["matches"])
+                    room = cls.MAX_SNIPPETS - len(entry["code_snippets"])
+                    entry["code_snippets"].extend(record["code_snippets"][:max(room, 0)])
+
+        for (ip, _path), record in matched.items():
+            grouped.setdefault(ip, {"ip": ip, "files": []})["files"].append(record)
+        return list(grouped.values())
+
+    @classmethod
+    def write_grouped(cls, findings_path, hosts, json_path, rules=None):
+        """group_findings() écrit dans json_path (fichier temporaire puis remplacement : le dashboard ne lit jamais un JSON partiel)."""
+        grouped = cls.group_findings(findings_path, hosts, rules)
+        tmp = json_path.with_name(json_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(grouped, f, indent=2)
+        os.replace(tmp, json_path)
+        return grouped
@@ -1,10 +1,153 @@
 import json
-from libnmap.parser import NmapParser
+import os
+import xml.etree.ElementTree as ET
+
+
+class NmapParseError(Exception):
+    """Échec côté lecture du XML (fichier absent, XML invalide, élément inattendu) ; cause dans __cause__."""
 
 
 class NmapJsonBuilder:
-    """Construit un JSON structuré à partir d'un fichier XML Nmap."""
-    
+    """Construit un JSON structuré à partir d'un fichier XML Nmap (parsing en streaming)."""
+
+    # Attributs <service> non repris dans la bannière (même logique que libnmap)
+    BANNER_IGNORED = ("name", "method", "conf", "servicefp", "tunnel")
+    BANNER_RELEVANT = ("product", "version", "extrainfo")
+
+    @staticmethod
+    def iter_hosts(xml_file):
+        """
+        Parcourt le XML Nmap avec iterparse et génère un dict par hôte 'up'
+        ayant au moins un port 'open'. Chaque élément <host> est libéré dès
+        qu'il a été traité : la mémoire reste bornée à un hôte à la fois.
+        Lève FileNotFoundError / ET.ParseError comme ET.parse.
+        """
+        context = ET.iterparse(xml_file, events=("start", "end"))
+        root = None
+
+        for event, elem in context:
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != "host":
+                continue
+
+            host_info = NmapJsonBuilder._host_from_element(elem)
+            # On libère l'hôte et on le détache de la racine
+            elem.clear()
+            root.clear()
+
+            if host_info is not None:
+                yield host_info
+
+    @staticmethod
+    def _host_from_element(host):
+        status = host.find("status")
+        status_state = status.get("state") if status is not None else ""
+        if status_state != "up":
+            return None
+
+        # Adresse principale : IPv4, sinon IPv6, sinon MAC (comme libnmap)
+        addresses = {a.get("addrtype"): a.get("addr") for a in host.findall("address")}
+        address = addresses.get("ipv4") or addresses.get("ipv6") or addresses.get("mac") or ""
+
+        hostname_elem = host.find("hostnames/hostname")
+
+        host_info = {
+            "ip": address,
+            "hostname": hostname_elem.get("name") if hostname_elem is not None else None,
+            "status": status_state,
+            "ports": []
+        }
+
+        for port in host.iterfind("ports/port"):
+            state = port.find("state")
+            # Ne garder que les ports ouverts
+            if state is None or state.get("state") != "open":
+                continue
+
+            service = port.find("service")
+            service_dict = dict(service.attrib) if service is not None else {}
+
+            host_info["ports"].append({
+                "port": int(port.get("portid")),
+                "protocol": port.get("protocol"),
+                "state": "open",
+                "service": service_dict.get("name", ""),
+                "product": service_dict.get("product", ""),
+                "version": service_dict.get("version", ""),
+                "extrainfo": service_dict.get("extrainfo", ""),
+                "banner": NmapJsonBuilder._banner(service_dict)
+            })
+
+        # Si aucun port ouvert, on skippe l'hôte
+        return host_info if host_info["ports"] else None
+
+    @staticmethod
+    def _banner(service_dict):
+        if service_dict.get("method") != "probed":
+            return ""
+        parts = [f"{k}: {service_dict[k]}" for k in NmapJsonBuilder.BANNER_RELEVANT if k in service_dict]
+        parts += [
+            f"{k}: {v}" for k, v in service_dict.items()
+            if k not in NmapJsonBuilder.BANNER_IGNORED and k not in NmapJsonBuilder.BANNER_RELEVANT
+        ]
+        return " ".join(parts)
+
+    @staticmethod
+    def write_json(hosts, json_file):
+        """
+        Écrit un itérable d'hôtes sous forme de tableau JSON, hôte par hôte,
+        dans un fichier temporaire renommé à la fin (le dashboard ne voit jamais
+        un fichier à moitié écrit). Retourne le nombre d'hôtes écrits.
+        """
+        tmp_file = f"{json_file}.tmp"
+        count = 0
+        try:
+            with open(tmp_file, 'w') as f:
+                f.write("[")
+                for host_info in hosts:
+                    f.write(NmapJsonBuilder.host_fragment(host_info, first=not count))
+                    count += 1
+                f.write("\n]" if count else "]")
+            os.replace(tmp_file, json_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        return count
+
+    @staticmethod
+    def host_fragment(host_info, first):
+        """Un hôte tel qu'écrit dans le tableau JSON (séparateur compris) : write_json et fusions incrémentales."""
+        return ("\n    " if first else ",\n    ") + json.dumps(host_info, indent=4).replace("\n", "\n    ")
+
+    @staticmethod
+    def iter_json_hosts(json_files):
+        """Enchaîne les hôtes de plusieurs JSON produits par build_json (ex: un par shard)."""
+        for json_file in json_files:
+            try:
+                with open(json_file, 'r') as f:
+                    hosts = json.load(f)
+            except (FileNotFoundError, ValueError) as e:
+                print(f" ⚠️ JSON ignoré lors de la fusion ({json_file}) : {e}")
+                continue
+            yield from hosts if isinstance(hosts, list) else []
+
+    @staticmethod
+    def merge_json(json_files, json_file):
+        """Fusionne plusieurs JSON Nmap (même schéma) en un seul. Retourne le nombre d'hôtes."""
+        return NmapJsonBuilder.write_json(NmapJsonBuilder.iter_json_hosts(json_files), json_file)
+
+    @staticmethod
+    def _parsing(xml_file):
+        """iter_hosts dont toute erreur est levée en NmapParseError (distincte des erreurs d'écriture)."""
+        try:
+            yield from NmapJsonBuilder.iter_hosts(xml_file)
+        except Exception as e:
+            raise NmapParseError(str(e)) from e
+
     @staticmethod
     def build_json(xml_file, json_file):
         """
@@ -12,51 +155,18 @@ class NmapJsonBuilder:
         en ne gardant que les ports en état 'open'.
         """
         try:
-            nmap_report = NmapParser.parse_fromfile(xml_file)
-        except FileNotFoundError:
-            print(f" ⚠️ Fichier XML {xml_file} non trouvé.")
+            count = NmapJsonBuilder.write_json(NmapJsonBuilder._parsing(xml_file), json_file)
+        except NmapParseError as e:
+            if isinstance(e.__cause__, FileNotFoundError):
+                print(f" ⚠️ Fichier XML {xml_file} non trouvé.")
+            else:
+                print(f" ⚠️ Erreur lors du parsing de {xml_file}: {e.__cause__!r}")
             return
-        except Exception as e:
-            print(f" ⚠️ Erreur lors du parsing de {xml_file}: {e}")
+        except OSError as e:
+            print(f" ❌ Erreur lors de l'écriture du fichier JSON {json_file}: {e}")
             return
-        
-        hosts_data = []
-        
-        for host in nmap_report.hosts:
-            if not host.is_up():
-                continue
-            
-            host_info = {
-                "ip": host.address,
-                "hostname": host.hostnames[0] if host.hostnames else None,
-                "status": host.status,
-                "ports": []
-            }
-            
-            for service in host.services:
-                # Ne garder que les ports ouverts
-                if service.state != "open":
-                    continue
-                
-                port_info = {
-                    "port": service.port,
-                    "protocol": service.protocol,
-                    "state": service.state,  # sera toujours "open" ici
-                    "service": service.service,
-                    "product": getattr(service, 'service_dict', {}).get('product', ''),
-                    "version": getattr(service, 'service_dict', {}).get('version', ''),
-                    "extrainfo": getattr(service, 'service_dict', {}).get('extrainfo', ''),
-                    "banner": service.banner
-                }
-                host_info["ports"].append(port_info)
-            
-            # Si aucun port ouvert, tu peux choisir de garder ou de skipper l’hôte
-            if host_info["ports"]:
-                hosts_data.append(host_info)
-        
-        try:
-            with open(json_file, 'w') as f:
-                json.dump(hosts_data, f, indent=4)
-            print(f" ✅ Fichier JSON généré (ports open uniquement) : {json_file}")
         except Exception as e:
-            print(f" ❌ Erreur lors de l'écriture du fichier JSON {json_file}: {e}")
+            print(f" ❌ Erreur inattendue lors de la génération de {json_file}: {e!r}")
+            return
+
+        print(f" ✅ Fichier JSON généré (ports open uniquement, {count} hôte(s)) : {json_file}")
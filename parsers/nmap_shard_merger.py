@@ -0,0 +1,69 @@
+import os
+import shutil
+from pathlib import Path
+
+from parsers.nmap_json_builder import NmapJsonBuilder
+from parsers.xml_parser import XmlParser
+
+
+class NmapShardMerger:
+    """
+    Fusion incrémentale des shards Nmap d'un subnet dans full_scan.xml / full_scan.json.
+    Chaque shard n'est parsé qu'une fois : ses <host> et ses hôtes JSON sérialisés sont ajoutés à deux
+    fichiers de travail (work_dir/merged_hosts.*.part), et une fusion ne fait que recopier ces octets
+    entre l'en-tête et la fin du document (fichier temporaire puis remplacement).
+    """
+
+    def __init__(self, xml_file, json_file, work_dir):
+        self.xml_file = Path(xml_file)
+        self.json_file = Path(json_file)
+        self.xml_part = Path(work_dir) / "merged_hosts.xml.part"
+        self.json_part = Path(work_dir) / "merged_hosts.json.part"
+        self._xml_out = open(self.xml_part, "w", encoding="utf-8")
+        self._json_out = open(self.json_part, "w", encoding="utf-8")
+        self.header = None
+        self.merged = 0         # nombre de shards de `completed` déjà ajoutés
+        self.xml_hosts = 0
+        self.json_hosts = 0
+
+    def _on_root(self, attrib):
+        if self.header is None:
+            self.header = XmlParser.nmaprun_header(attrib)
+
+    def merge(self, completed):
+        """completed : [(shard_xml, shard_json)] dans l'ordre d'arrivée. Retourne (hôtes XML, hôtes JSON)."""
+        for shard_xml, shard_json in completed[self.merged:]:
+            for fragment in XmlParser.iter_host_fragments(str(shard_xml), self._on_root):
+                self._xml_out.write(fragment)
+                self.xml_hosts += 1
+            if Path(shard_json).exists():
+                for host_info in NmapJsonBuilder.iter_json_hosts([str(shard_json)]):
+                    self._json_out.write(NmapJsonBuilder.host_fragment(host_info, first=not self.json_hosts))
+                    self.json_hosts += 1
+        self.merged = len(completed)
+        self._xml_out.flush()
+        self._json_out.flush()
+
+        self._publish(self.xml_file, self.header or XmlParser.nmaprun_header(None), self.xml_part, "</nmaprun>\n")
+        self._publish(self.json_file, "[", self.json_part, "\n]" if self.json_hosts else "]")
+        return self.xml_hosts, self.json_hosts
+
+    @staticmethod
+    def _publish(target, head, part, tail):
+        tmp_file = f"{target}.tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as out, open(part, "r", encoding="utf-8") as body:
+                out.write(head)
+                shutil.copyfileobj(body, out)
+                out.write(tail)
+            os.replace(tmp_file, target)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    def close(self):
+        self._xml_out.close()
+        self._json_out.close()
+        for part in (self.xml_part, self.json_part):
+            part.unlink(missing_ok=True)
@@ -0,0 +1,248 @@
+import re
+
+
+class ShareQLRules:
+    """
+    Règles ShareQL (fichiers rules/*.shareql, syntaxe ShareHound), une règle par ligne :
+        ALLOW|DENY EXPLORATION|PROCESSING [IF <CHAMP> <OPÉRATEUR> <VALEUR>]
+    - EXPLORATION : descendre dans un share / dossier ; PROCESSING : traiter (lister, télécharger) un fichier.
+    - Une règle sans condition fixe le comportement par défaut de l'action (ALLOW si aucune) ;
+      les règles conditionnelles sont évaluées dans l'ordre des fichiers : la première qui correspond décide.
+    - Champs : DEPTH, SHARE.NAME, DIRECTORY.NAME, DIRECTORY.PATH, FILE.NAME, FILE.PATH, FILE.SIZE.
+      Un champ absent du contexte évalué (FILE.NAME pour un dossier...) ne correspond jamais.
+    - Opérateurs : == != < <= > >= MATCHES (regex) CONTAINS STARTSWITH ENDSWITH.
+      Les noms SMB (shares, dossiers, fichiers) ne sont pas sensibles à la casse : valeurs des règles et
+      champs texte évalués sont comparés après casefold(), et les regex MATCHES sont en IGNORECASE.
+    Les lignes vides et les commentaires (#) sont ignorés ; une ligne invalide lève ValueError (fichier:ligne).
+
+    Chaque action est compilée en une seule fonction Python (decider()) : les règles consécutives de même
+    verdict forment un bloc dont l'ordre interne est indifférent, et dans un bloc les tests d'un même champ
+    et d'un même opérateur sont fusionnés (ensemble pour ==, ensemble d'extensions ou tuple pour ENDSWITH,
+    regex combinée pour MATCHES / CONTAINS, seuil unique pour < >). interpret() garde l'évaluation
+    règle par règle comme référence.
+    """
+
+    ACTIONS = ("EXPLORATION", "PROCESSING")
+    FIELDS = ("DEPTH", "SHARE.NAME", "DIRECTORY.NAME", "DIRECTORY.PATH", "FILE.NAME", "FILE.PATH", "FILE.SIZE")
+    NUMERIC_FIELDS = ("DEPTH", "FILE.SIZE")
+    OPERATORS = ("==", "!=", "<=", ">=", "<", ">", "MATCHES", "CONTAINS", "STARTSWITH", "ENDSWITH")
+
+    RULE_RE = re.compile(
+        r'^(?P<verdict>ALLOW|DENY)\s+(?P<action>EXPLORATION|PROCESSING)'
+        r'(?:\s+IF\s+(?P<field>[A-Z.]+)\s*(?P<op>==|!=|<=|>=|<|>|MATCHES|CONTAINS|STARTSWITH|ENDSWITH)\s*'
+        r'(?P<value>"(?:[^"\\]|\\.)*"|-?\d+))?\s*$',
+        re.IGNORECASE,
+    )
+
+    def __init__(self):
+        self.defaults = {action: True for action in self.ACTIONS}
+        self.rules = {action: [] for action in self.ACTIONS}   # [(allow, field, op, value, source)]
+        self.sources = {}       # action -> code Python généré (débogage)
+        self._compiled = {}
+
+    @classmethod
+    def load(cls, paths):
+        """Charge plusieurs fichiers, dans l'ordre donné (l'ordre compte : première règle correspondante)."""
+        rules = cls()
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for number, line in enumerate(f, start=1):
+                    rules.add(line, source=f"{path}:{number}")
+        return rules
+
+    @staticmethod
+    def unquote(value):
+        """Chaîne ShareQL -> texte ("\\\\" -> "\\", '\\"' -> '"')."""
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+
+    def add(self, line, source="<rule>"):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return
+        m = self.RULE_RE.match(line)
+        if m is None:
+            raise ValueError(f"{source} : règle ShareQL invalide : {line}")
+
+        allow = m.group("verdict").upper() == "ALLOW"
+        action = m.group("action").upper()
+        self._compiled.pop(action, None)
+        if m.group("field") is None:
+            self.defaults[action] = allow
+            return
+
+        field, op, raw = m.group("field").upper(), m.group("op").upper(), m.group("value")
+        if field not in self.FIELDS:
+            raise ValueError(f"{source} : champ ShareQL inconnu : {field}")
+        value = self.unquote(raw) if raw.startswith('"') else int(raw)
+        if field in self.NUMERIC_FIELDS and not isinstance(value, int):
+            raise ValueError(f"{source} : {field} attend un nombre")
+        if field not in self.NUMERIC_FIELDS:
+            value = str(value)
+        if op == "MATCHES":
+            # Motif gardé tel quel (casefold changerait \W en \w) : insensibilité via IGNORECASE
+            try:
+                value = re.compile(value, re.IGNORECASE)
+            except re.error:
+                # Chemins Windows écrits tels quels ("C:\Temp") : recherche littérale
+                value = re.compile(re.escape(value), re.IGNORECASE)
+        elif field not in self.NUMERIC_FIELDS:
+            value = value.casefold()
+        self.rules[action].append((allow, field, op, value, source))
+
+    # ------ Compilation ------
+    def decider(self, action):
+        """Fonction compilée contexte -> bool pour l'action (recompilée seulement si les règles ont changé)."""
+        decide = self._compiled.get(action)
+        if decide is None:
+            decide = self._compiled[action] = self._compile(action)
+        return decide
+
+    def _compile(self, action):
+        constants = {}
+
+        def const(value):
+            name = f"C{len(constants)}"
+            constants[name] = value
+            return name
+
+        fields = {}
+
+        def var(field):
+            return fields.setdefault(field, f"f{len(fields)}")
+
+        # Blocs de règles consécutives de même verdict
+        blocks = []
+        for allow, field, op, value, _source in self.rules[action]:
+            if not blocks or blocks[-1][0] != allow:
+                blocks.append((allow, {}))
+            blocks[-1][1].setdefault((field, op), []).append(value)
+
+        body = []
+        for allow, groups in blocks:
+            tests = []
+            for (field, op), values in groups.items():
+                tests.extend(f"({var(field)} is not None and {test})" for test in self._tests(var(field), op, values, const))
+            body.append(f"    if {' or '.join(tests)}:\n        return {allow}")
+
+        prologue = []
+        for field, name in fields.items():
+            prologue.append(f"    {name} = get({field!r})")
+            if field not in self.NUMERIC_FIELDS:
+                prologue.append(f"    if {name} is not None:\n        {name} = {name}.casefold()")
+        source = "\n".join(
+            ["def decide(context):", "    get = context.get", *prologue, *body, f"    return {self.defaults[action]}"]
+        )
+        self.sources[action] = source
+        namespace = dict(constants)
+        exec(compile(source, f"<shareql {action}>", "exec"), namespace)
+        return namespace["decide"]
+
+    @staticmethod
+    def _tests(name, op, values, const):
+        """Expressions Python (une ou plusieurs) équivalentes au OU des règles `op` sur ce champ."""
+        if op == "==":
+            return [f"{name} in {const(frozenset(values))}"] if len(values) > 1 else [f"{name} == {const(values[0])}"]
+        if op == "!=":
+            return [f"{name} != {const(v)}" for v in values]
+        if op in (">", ">="):
+            return [f"{name} {op} {const(min(values))}"]
+        if op in ("<", "<="):
+            return [f"{name} {op} {const(max(values))}"]
+        if op == "ENDSWITH":
+            # Extensions simples (".kdbx") : un seul accès à un ensemble au lieu de N endswith
+            if len(values) > 1 and all(v.startswith(".") and v.count(".") == 1 and "\\" not in v for v in values):
+                return [f"{name}[{name}.rfind('.'):] in {const(frozenset(values))}"]
+            return [f"{name}.endswith({const(tuple(values))})"]
+        if op == "STARTSWITH":
+            return [f"{name}.startswith({const(tuple(values))})"]
+        if op == "CONTAINS":
+            if len(values) == 1:
+                return [f"{const(values[0])} in {name}"]
+            return [f"{const(re.compile('|'.join(re.escape(v) for v in values)))}.search({name}) is not None"]
+        # MATCHES : une seule regex ; en cas de conflit (groupes nommés en double...), une regex par règle
+        try:
+            combined = re.compile("|".join(f"(?:{v.pattern})" for v in values), re.IGNORECASE) \
+                if len(values) > 1 else values[0]
+        except re.error:
+            return [f"{const(v)}.search({name}) is not None" for v in values]
+        return [f"{const(combined)}.search({name}) is not None"]
+
+    # ------ Évaluation ------
+    def allows(self, action, context):
+        """context : {champ: valeur} de l'objet évalué. True = autorisé."""
+        return self.decider(action)(context)
+
+    def explore(self, context):
+        return self.decider("EXPLORATION")(context)
+
+    def process(self, context):
+        return self.decider("PROCESSING")(context)
+
+    @staticmethod
+    def _test(op, actual, value):
+        if op == "==":
+            return actual == value
+        if op == "!=":
+            return actual != value
+        if op == "MATCHES":
+            return value.search(actual) is not None
+        if op == "CONTAINS":
+            return value in actual
+        if op == "STARTSWITH":
+            return actual.startswith(value)
+        if op == "ENDSWITH":
+            return actual.endswith(value)
+        if op == "<":
+            return actual < value
+        if op == "<=":
+            return actual <= value
+        if op == ">":
+            return actual > value
+        return actual >= value
+
+    def interpret(self, action, context):
+        """Évaluation règle par règle (référence de la version compilée)."""
+        for allow, field, op, value, _source in self.rules[action]:
+            actual = context.get(field)
+            if actual is not None and field not in self.NUMERIC_FIELDS:
+                actual = actual.casefold()
+            if actual is not None and self._test(op, actual, value):
+                return allow
+        return self.defaults[action]
+
+    # ------ Contextes (crawler, post-filtrage ManSpider, dashboard) ------
+    @staticmethod
+    def share_context(share):
+        return {"DEPTH": 0, "SHARE.NAME": share}
+
+    @staticmethod
+    def directory_context(share, parts):
+        """Dossier share\\parts[0]\\...\\parts[-1] (profondeur = nombre de composants)."""
+        return {"DEPTH": len(parts), "SHARE.NAME": share, "DIRECTORY.NAME": parts[-1],
+                "DIRECTORY.PATH": "\\" + "\\".join(parts)}
+
+    @staticmethod
+    def file_context(share, parts, name, size=None):
+        """Fichier `name` du dossier share\\parts (profondeur du dossier parent)."""
+        context = {"DEPTH": len(parts), "SHARE.NAME": share, "DIRECTORY.NAME": parts[-1] if parts else "",
+                   "DIRECTORY.PATH": "\\" + "\\".join(parts), "FILE.NAME": name,
+                   "FILE.PATH": "\\" + "\\".join(parts + [name])}
+        if size is not None:
+            context["FILE.SIZE"] = size
+        return context
+
+    def keeps(self, path, size=None):
+        """
+        Chemin "SHARE\\dossier\\...\\fichier" (format ManSpider / enum_file.json) : True si le crawler l'aurait
+        retenu (share et dossiers explorables, fichier traité).
+        """
+        share, *parts = [p for p in path.split("\\") if p]
+        if not parts:
+            return False
+        explore = self.decider("EXPLORATION")
+        if not explore(self.share_context(share)):
+            return False
+        for depth in range(1, len(parts)):
+            if not explore(self.directory_context(share, parts[:depth])):
+                return False
+        return self.decider("PROCESSING")(self.file_context(share, parts[:-1], parts[-1], size))
@@ -1,3 +1,4 @@
+import os
 import xml.etree.ElementTree as ET
 
 class XmlParser:
@@ -12,56 +13,23 @@ class XmlParser:
         hosts_data = []
         
         try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
+            # iterparse : un seul élément <host> en mémoire à la fois
+            context = ET.iterparse(xml_file, events=('start', 'end'))
+            root = None
             
-            for host in root.findall('host'):
-                # Récupérer l'adresse IP
-                address = host.find('address')
-                if address is None:
+            for event, host in context:
+                if event == 'start':
+                    if root is None:
+                        root = host
+                    continue
+                if host.tag != 'host':
                     continue
                 
-                ip = address.get('addr')
-                
-                # Récupérer le hostname (optionnel)
-                hostname = None
-                hostnames_elem = host.find('hostnames')
-                if hostnames_elem is not None:
-                    hostname_elem = hostnames_elem.find('hostname')
-                    if hostname_elem is not None:
-                        hostname = hostname_elem.get('name')
-                
-                # Récupérer les ports
-                ports_list = []
-                ports_elem = host.find('ports')
-                if ports_elem is not None:
-                    for port in ports_elem.findall('port'):
-                        portid = port.get('portid')
-                        protocol = port.get('protocol')
-                        
-                        state = port.find('state')
-                        if state is None or state.get('state') != 'open':
-                            continue
-                        
-                        service = port.find('service')
-                        service_name = service.get('name') if service is not None else ''
-                        product = service.get('product') if service is not None else ''
-                        version = service.get('version') if service is not None else ''
-                        
-                        ports_list.append({
-                            'port': portid,
-                            'protocol': protocol,
-                            'service': service_name,
-                            'product': product,
-                            'version': version
-                        })
-                
-                if ports_list:
-                    hosts_data.append({
-                        'ip': ip,
-                        'hostname': hostname,
-                        'ports': ports_list
-                    })
+                host_data = XmlParser._parse_host(host)
+                host.clear()
+                root.clear()
+                if host_data:
+                    hosts_data.append(host_data)
         
         except FileNotFoundError:
             print(f" ⚠️ Fichier XML {xml_file} non trouvé.")
@@ -71,3 +39,126 @@ class XmlParser:
             print(f" ⚠️ Erreur inattendue lors du parsing de {xml_file}: {e}")
         
         return hosts_data
+    
+    @staticmethod
+    def merge_nmap_xml(xml_files, output_file):
+        """
+        Fusionne plusieurs XML Nmap (shards) en un seul XML valide : en-tête <nmaprun>
+        du premier fichier puis tous les <host>, lus en streaming.
+        Écrit dans un fichier temporaire renommé à la fin. Retourne le nombre d'hôtes.
+        """
+        tmp_file = f"{output_file}.tmp"
+        count = 0
+        header = None
+
+        def on_root(attrib):
+            nonlocal header
+            if header is None:
+                header = XmlParser.nmaprun_header(attrib)
+                out.write(header)
+
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as out:
+                for xml_file in xml_files:
+                    for fragment in XmlParser.iter_host_fragments(xml_file, on_root):
+                        out.write(fragment)
+                        count += 1
+                
+                if header is None:
+                    out.write(XmlParser.nmaprun_header(None))
+                out.write('</nmaprun>\n')
+            os.replace(tmp_file, output_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        
+        return count
+
+    @staticmethod
+    def nmaprun_header(attrib):
+        """Prologue XML + balise <nmaprun> ouvrante (attributs du premier shard, sinon minimale)."""
+        if attrib is None:
+            return '<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun scanner="nmap">\n'
+        attrs = ''.join(f' {k}="{v}"' for k, v in XmlParser._escaped(attrib))
+        return f'<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun{attrs}>\n'
+
+    @staticmethod
+    def iter_host_fragments(xml_file, on_root=None):
+        """
+        <host> sérialisés (une ligne chacun) d'un XML Nmap, lus en streaming.
+        on_root(attrib) reçoit les attributs de <nmaprun>. Un fichier absent ou invalide est ignoré.
+        """
+        try:
+            context = ET.iterparse(xml_file, events=('start', 'end'))
+            root = None
+            for event, elem in context:
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        if on_root is not None:
+                            on_root(elem.attrib)
+                    continue
+                if elem.tag != 'host':
+                    continue
+                yield ET.tostring(elem, encoding='unicode').strip() + "\n"
+                elem.clear()
+                root.clear()
+        except (FileNotFoundError, ET.ParseError) as e:
+            print(f" ⚠️ Shard ignoré lors de la fusion ({xml_file}) : {e}")
+    
+    @staticmethod
+    def _escaped(attrib):
+        for k, v in attrib.items():
+            yield k, v.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
+    
+    @staticmethod
+    def _parse_host(host):
+        """Extrait ip, hostname et ports ouverts d'un élément <host>."""
+        # Récupérer l'adresse IP
+        address = host.find('address')
+        if address is None:
+            return None
+
+        ip = address.get('addr')
+
+        # Récupérer le hostname (optionnel)
+        hostname = None
+        hostnames_elem = host.find('hostnames')
+        if hostnames_elem is not None:
+            hostname_elem = hostnames_elem.find('hostname')
+            if hostname_elem is not None:
+                hostname = hostname_elem.get('name')
+
+        # Récupérer les ports
+        ports_list = []
+        ports_elem = host.find('ports')
+        if ports_elem is not None:
+            for port in ports_elem.findall('port'):
+                portid = port.get('portid')
+                protocol = port.get('protocol')
+
+                state = port.find('state')
+                if state is None or state.get('state') != 'open':
+                    continue
+
+                service = port.find('service')
+                service_name = service.get('name') if service is not None else ''
+                product = service.get('product') if service is not None else ''
+                version = service.get('version') if service is not None else ''
+
+                ports_list.append({
+                    'port': portid,
+                    'protocol': protocol,
+                    'service': service_name,
+                    'product': product,
+                    'version': version
+                })
+
+        if not ports_list:
+            return None
+        return {
+            'ip': ip,
+            'hostname': hostname,
+            'ports': ports_list
+        }
@@ -1,5 +1,5 @@
 from pathlib import Path
-from utils.command_runner import run_cmd
+from utils.command_runner import run_cmd_async
 
 
 class CertipyScanner:
@@ -16,18 +16,11 @@ class CertipyScanner:
         self.output_dir = Path(base_output_dir) / safe_dc
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def find_vulnerabilities(self, dc_ip, domain, username, password):
-        """
-        Lance Certipy 'find' en mode vuln (-vuln) avec sortie JSON dans le dossier du DC.
-        -dc-ip : IP résolue du DC
-        -ns    : nom du DC (dc_host), ou IP si l'utilisateur a donné une IP
-        """
-        print(f"\n📂 Lancement de Certipy (find vuln) sur {dc_ip}...")
-        
+    def _find_cmd(self, dc_ip, domain, username, password):
         user_upn = f"{username}@{domain}"
         output_prefix = self.output_dir / f"{domain.replace('.', '_')}"
         
-        cmd = [
+        return [
             "certipy", "find",
             "-u", user_upn,
             "-p", password,
@@ -37,7 +30,15 @@ class CertipyScanner:
             "-output", str(output_prefix),
             "-ns", dc_ip,   # ← ici on utilise bien self.dc_host
         ]
+    
+    async def find_vulnerabilities_async(self, dc_ip, domain, username, password):
+        """
+        Lance Certipy 'find' en mode vuln (-vuln) avec sortie JSON dans le dossier du DC.
+        -dc-ip : IP résolue du DC
+        -ns    : nom du DC (dc_host), ou IP si l'utilisateur a donné une IP
+        """
+        print(f"\n📂 Lancement de Certipy (find vuln) sur {dc_ip}...")
         
-        run_cmd(cmd)
+        await run_cmd_async(self._find_cmd(dc_ip, domain, username, password))
         
         print(f"\n✅ Certipy terminé, résultats dans {self.output_dir}")
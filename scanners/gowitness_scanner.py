@@ -1,8 +1,13 @@
+import asyncio
 from pathlib import Path
-from utils.command_runner import run_cmd
+from utils.command_runner import run_cmd_async
 from config import (
     GOWITNESS_OUTPUT_GLOBAL,
     GOWITNESS_DB_FILE_PATH,
+    GOWITNESS_THREADS,
+    GOWITNESS_WEB_PORTS,
+    GOWITNESS_BATCH_SIZE,
+    GOWITNESS_FLUSH_INTERVAL,
 )
 
 
@@ -14,32 +19,75 @@ class GoWitnessScanner:
         self.base_output_dir = Path(base_output_dir)
         GOWITNESS_OUTPUT_GLOBAL.mkdir(parents=True, exist_ok=True)
     
-    def scan_from_nmap_xml(self, xml_file: str):
+    @staticmethod
+    def web_urls(hosts):
         """
-        Lance GoWitness directement sur un fichier XML Nmap.
-        Les screenshots vont dans scan/screenshots_global
-        et la même DB est réutilisée pour tous les scans.
-        
-        Exemple de commande résultante :
-        gowitness scan nmap -f scan/10_189_15_239_24/full_scan.xml \
-            -s scan/screenshots_global --write-db --open-only
+        Extrait les URLs web des hôtes au format NmapJsonBuilder :
+        ports de GOWITNESS_WEB_PORTS ou services 'http*'. HTTPS si le port/service l'indique.
         """
-        xml_path = Path(xml_file)
-        if not xml_path.exists():
-            print(f" ⚠️ Fichier XML {xml_path} introuvable.")
-            return
-        
-        print(f"\n📸 Lancement de GoWitness sur le XML Nmap : {xml_path}")
-        print(f"📁 Dossier screenshots global : {GOWITNESS_OUTPUT_GLOBAL}")
+        urls = []
+        for host in hosts:
+            for p in host.get("ports", []):
+                service = (p.get("service") or "").lower()
+                port = int(p["port"])
+                if port not in GOWITNESS_WEB_PORTS and "http" not in service:
+                    continue
+                scheme = "https" if port in (443, 8443) or "https" in service or "ssl" in service else "http"
+                urls.append(f"{scheme}://{host['ip']}:{port}")
+        return urls
+
+    @staticmethod
+    def _targets_cmd(urls, targets_file):
+        targets_path = Path(targets_file)
+        targets_path.write_text("\n".join(urls) + "\n", encoding="utf-8")
         
-        cmd = [
-            "gowitness", "scan", "nmap",
-            "-f", str(xml_path),
+        print(f"\n📸 GoWitness sur {len(urls)} URL(s) ({targets_path.name})")
+        return [
+            "gowitness", "scan", "file",
+            "-f", str(targets_path),
             "-s", str(GOWITNESS_OUTPUT_GLOBAL),
+            "-t", str(GOWITNESS_THREADS),
             "--write-db",
-            "--open-only",
         ]
+
+    async def scan_from_targets_async(self, urls, targets_file):
+        """Lance GoWitness sur une liste d'URLs (écrite dans targets_file)."""
+        await run_cmd_async(self._targets_cmd(urls, targets_file))
+
+    async def scan_from_queue_async(self, hosts_queue, batch_dir):
+        """
+        Consomme une asyncio.Queue de listes d'hôtes (format NmapJsonBuilder, alimentée par
+        NmapScanner.scan_subnet_async) et lance GoWitness par lots de GOWITNESS_BATCH_SIZE URLs
+        (ou toutes les GOWITNESS_FLUSH_INTERVAL secondes). None dans la queue signale la fin du scan.
+        Chaque URL n'est capturée qu'une fois.
+        """
+        batch_dir = Path(batch_dir)
+        seen = set()
+        batch = []
+        batch_index = 0
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        finished = False
+        
+        while not finished:
+            try:
+                hosts = await asyncio.wait_for(hosts_queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                hosts = []
+            if hosts is None:
+                finished = True
+                hosts = []
+            
+            for url in self.web_urls(hosts):
+                if url not in seen:
+                    seen.add(url)
+                    batch.append(url)
+            
+            flush_due = loop.time() - last_flush >= GOWITNESS_FLUSH_INTERVAL
+            if batch and (finished or len(batch) >= GOWITNESS_BATCH_SIZE or flush_due):
+                await self.scan_from_targets_async(batch, batch_dir / f"gowitness_targets_{batch_index}.txt")
+                batch_index += 1
+                batch = []
+                last_flush = loop.time()
         
-        run_cmd(cmd)
-        print(f" ✅ Scan GoWitness terminé. Screenshots dans {GOWITNESS_OUTPUT_GLOBAL}")
-        print(f" ✅ Base Gowitness : {GOWITNESS_DB_FILE_PATH}")
+        print(f" ✅ GoWitness terminé : {len(seen)} URL(s) capturée(s). Base : {GOWITNESS_DB_FILE_PATH}")
@@ -0,0 +1,295 @@
+import base64
+import json
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from utils.ldap_snapshot import LdapSnapshotStore
+from config import LDAP_PAGE_SIZE, LDAP_RESOLVE_THREADS, LDAP_CONNECT_TIMEOUT, LDAP_SNAPSHOT_REUSE_GRAYBOX
+
+try:
+    from ldap3 import Server, Connection, NTLM, DSA
+except ImportError:  # ldap3 optionnel : LdeepScanner retombe sur ldeep
+    Server = None
+
+
+class LdapCollector:
+    """
+    Collecte LDAP native (ldap3) en remplacement des cinq process ldeep :
+    un seul bind, des recherches paginées limitées aux attributs utiles, et les mêmes
+    fichiers que ldeep dans le dossier du DC (trusts, pkis, delegations, users, machines-ip).
+    - (objectClass=user) est parcouru UNE fois : utilisateurs activés, ordinateurs et
+      délégations en sont extraits côté client (plus de triple parcours de l'annuaire) ;
+    - trusts et PKIs sont deux petites recherches dédiées ;
+    - les comptes sont partagés via LdapSnapshotStore : un instantané récent (TTL) évite de reparcourir
+      l'annuaire, et chaque parcours alimente l'instantané utilisé par session-hunter.
+    """
+
+    # Attributs demandés par recherche (union des besoins du dashboard / des outils)
+    ACCOUNT_ATTRIBUTES = [
+        "objectClass", "distinguishedName", "sAMAccountName", "userPrincipalName",
+        "displayName", "description", "mail", "memberOf", "objectSid", "objectGUID",
+        "userAccountControl", "adminCount", "servicePrincipalName",
+        "lastLogonTimestamp", "pwdLastSet", "whenCreated",
+        "name", "dNSHostName", "operatingSystem", "operatingSystemVersion",
+        "msDS-AllowedToDelegateTo", "msDS-AllowedToActOnBehalfOfOtherIdentity",
+    ]
+    TRUST_ATTRIBUTES = [
+        "cn", "distinguishedName", "flatName", "trustPartner", "trustType",
+        "trustDirection", "trustAttributes", "securityIdentifier", "whenCreated",
+    ]
+    PKI_ATTRIBUTES = ["cn", "name", "distinguishedName", "dNSHostName", "certificateTemplates", "whenCreated"]
+
+    # Attributs multi-valués : toujours exportés en liste (les autres le sont en scalaire)
+    MULTI_VALUED = {
+        "objectClass", "memberOf", "servicePrincipalName", "msDS-AllowedToDelegateTo",
+        "certificateTemplates",
+    }
+    INT_ATTRIBUTES = {"adminCount", "trustType", "trustDirection", "trustAttributes"}
+    FILETIME_ATTRIBUTES = {"lastLogonTimestamp", "pwdLastSet"}
+    GENERALIZED_TIME_ATTRIBUTES = {"whenCreated"}
+    SID_ATTRIBUTES = {"objectSid", "securityIdentifier"}
+    # Mêmes noms de flags que ldeep (le dashboard teste "TRUSTED_FOR_DELEGATION" etc.)
+    UAC_FLAGS = [
+        (0x1, "SCRIPT"), (0x2, "ACCOUNTDISABLE"), (0x8, "HOMEDIR_REQUIRED"), (0x10, "LOCKOUT"),
+        (0x20, "PASSWD_NOTREQD"), (0x40, "PASSWD_CANT_CHANGE"), (0x80, "ENCRYPTED_TEXT_PWD_ALLOWED"),
+        (0x100, "TEMP_DUPLICATE_ACCOUNT"), (0x200, "NORMAL_ACCOUNT"), (0x800, "INTERDOMAIN_TRUST_ACCOUNT"),
+        (0x1000, "WORKSTATION_TRUST_ACCOUNT"), (0x2000, "SERVER_TRUST_ACCOUNT"),
+        (0x10000, "DONT_EXPIRE_PASSWORD"), (0x20000, "MNS_LOGON_ACCOUNT"), (0x40000, "SMARTCARD_REQUIRED"),
+        (0x80000, "TRUSTED_FOR_DELEGATION"), (0x100000, "NOT_DELEGATED"), (0x200000, "USE_DES_KEY_ONLY"),
+        (0x400000, "DONT_REQ_PREAUTH"), (0x800000, "PASSWORD_EXPIRED"),
+        (0x1000000, "TRUSTED_TO_AUTH_FOR_DELEGATION"), (0x4000000, "PARTIAL_SECRETS_ACCOUNT"),
+    ]
+    UAC_DISABLED = 0x2
+    # Comptes de trust (interdomaine, poste, serveur) : hors de users.json, comme
+    # le filtre sAMAccountType=805306368 de "ldeep users enabled"
+    UAC_TRUST_ACCOUNTS = 0x800 | 0x1000 | 0x2000
+    UAC_DELEGATION = 0x80000 | 0x1000000
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def available():
+        return Server is not None
+
+    # ------ Connexion ------
+    @staticmethod
+    def connect(dc_ip, domain, username, password):
+        """Bind NTLM unique (comme session-hunter). Lève RuntimeError si le bind échoue."""
+        server = Server(dc_ip, get_info=DSA, connect_timeout=LDAP_CONNECT_TIMEOUT)
+        conn = Connection(server, user=f"{domain}\\{username}", password=password, authentication=NTLM)
+        if not conn.bind():
+            raise RuntimeError(f"bind LDAP refusé sur {dc_ip} : {conn.result.get('description')} {conn.result.get('message') or ''}".strip())
+        return conn
+
+    @staticmethod
+    def naming_contexts(conn, domain):
+        """(defaultNamingContext, configurationNamingContext), déduits du domaine si le rootDSE est muet."""
+        base = ",".join(f"DC={part}" for part in domain.split("."))
+        config = f"CN=Configuration,{base}"
+        info = conn.server.info
+        if info is not None and info.other:
+            base = (info.other.get("defaultNamingContext") or [base])[0]
+            config = (info.other.get("configurationNamingContext") or [config])[0]
+        return base, config
+
+    @staticmethod
+    def paged_search(conn, search_base, search_filter, attributes, controls=None):
+        """
+        Génère les entrées (dn, attributs bruts) d'une recherche paginée (LDAP_PAGE_SIZE par page).
+        controls : contrôles LDAP additionnels (ex : SD_FLAGS pour nTSecurityDescriptor).
+        """
+        entries = conn.extend.standard.paged_search(
+            search_base, search_filter,
+            attributes=attributes,
+            controls=controls,
+            paged_size=LDAP_PAGE_SIZE,
+            generator=True,
+        )
+        for entry in entries:
+            if entry.get("type") == "searchResEntry":
+                yield entry["dn"], entry["raw_attributes"]
+
+    # ------ Mise en forme (format des JSON ldeep -v) ------
+    @staticmethod
+    def format_sid(raw):
+        if len(raw) < 8:
+            return raw.hex()
+        authority = int.from_bytes(raw[2:8], "big")
+        count = raw[1]
+        subs = [int.from_bytes(raw[8 + 4 * i:12 + 4 * i], "little") for i in range(count)]
+        return "S-{}-{}".format(raw[0], authority) + "".join(f"-{s}" for s in subs)
+
+    @staticmethod
+    def format_filetime(value):
+        ticks = int(value)
+        if ticks <= 0 or ticks >= 0x7FFFFFFFFFFFFFFF:
+            ticks = 0
+        return str(datetime(1601, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=ticks // 10))
+
+    @staticmethod
+    def format_generalized_time(value):
+        try:
+            return str(datetime.strptime(value[:14], "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc))
+        except ValueError:
+            return value
+
+    @staticmethod
+    def format_uac(value):
+        uac = int(value)
+        return " | ".join(name for flag, name in LdapCollector.UAC_FLAGS if uac & flag)
+
+    @staticmethod
+    def format_entry(dn, raw_attributes):
+        """Convertit les attributs bruts (bytes) d'une entrée en dict JSON façon ldeep."""
+        entry = {"dn": dn}
+        for name, values in raw_attributes.items():
+            if not values:
+                continue
+            if name in LdapCollector.SID_ATTRIBUTES:
+                formatted = [LdapCollector.format_sid(v) for v in values]
+            elif name == "objectGUID":
+                formatted = [str(uuid.UUID(bytes_le=v)) if len(v) == 16 else v.hex() for v in values]
+            elif name == "msDS-AllowedToActOnBehalfOfOtherIdentity":
+                formatted = [base64.b64encode(v).decode() for v in values]
+            else:
+                text = [v.decode("utf-8", errors="replace") for v in values]
+                if name == "userAccountControl":
+                    formatted = [LdapCollector.format_uac(v) for v in text]
+                elif name in LdapCollector.FILETIME_ATTRIBUTES:
+                    formatted = [LdapCollector.format_filetime(v) for v in text]
+                elif name in LdapCollector.GENERALIZED_TIME_ATTRIBUTES:
+                    formatted = [LdapCollector.format_generalized_time(v) for v in text]
+                elif name in LdapCollector.INT_ATTRIBUTES:
+                    formatted = [int(v) for v in text]
+                else:
+                    formatted = text
+            entry[name] = formatted if name in LdapCollector.MULTI_VALUED or len(formatted) > 1 else formatted[0]
+        return entry
+
+    # ------ Collecte ------
+    def collect(self, dc_ip, domain, username, password):
+        """Bind, collecte et écrit les fichiers. Retourne les statuts/durées par dump (comme LdeepScanner)."""
+        started = time.monotonic()
+        conn = self.connect(dc_ip, domain, username, password)
+        print(f" ✅ Bind LDAP sur {dc_ip} en {time.monotonic() - started:.1f}s")
+        try:
+            return self.collect_from_connection(conn, domain, snapshot=LdapSnapshotStore(),
+                                                reuse_snapshot=LDAP_SNAPSHOT_REUSE_GRAYBOX)
+        finally:
+            conn.unbind()
+
+    def collect_from_connection(self, conn, domain, resolve=True, snapshot=None, reuse_snapshot=False):
+        """
+        Collecte sur une connexion déjà liée (réutilisable, ex: benchmark sur un annuaire simulé).
+        snapshot : LdapSnapshotStore optionnel, réécrit après chaque parcours des comptes.
+        reuse_snapshot : lire l'instantané s'il est complet et récent au lieu de parcourir l'annuaire.
+        """
+        timings = {}
+        base, config = self.naming_contexts(conn, domain)
+
+        # 1. Comptes : un seul parcours pour users / computers / delegations
+        started = time.monotonic()
+        accounts = snapshot.load_accounts(domain, with_data=True) if snapshot is not None and reuse_snapshot else None
+        if accounts is not None:
+            print(f" ♻️ Instantané LDAP réutilisé pour {domain} ({LdapSnapshotStore.describe(snapshot.info(domain, 'accounts'))})")
+            rows = [(a["entry"], a["uac"]) for a in accounts]
+        else:
+            rows = []
+            for dn, raw in self.paged_search(conn, base, "(objectClass=user)", self.ACCOUNT_ATTRIBUTES):
+                rows.append((self.format_entry(dn, raw), int(raw.get("userAccountControl", [b"0"])[0] or 0)))
+            if snapshot is not None:
+                snapshot.save_accounts(domain, (self.account_row(e, uac) for e, uac in rows),
+                                       dc=conn.server.host, source="graybox")
+        users, computers, delegations = self.split_accounts(rows)
+        accounts_time = time.monotonic() - started
+        timings["users"] = self._write("users.json", users, accounts_time)
+        timings["delegations"] = self._write("delegations.json", delegations, 0.0)
+
+        # 2. Ordinateurs + résolution DNS (parallèle, hors annuaire)
+        started = time.monotonic()
+        if resolve:
+            self.resolve_computers(computers)
+        timings["machines_ip"] = self._write("machines-ip.json", computers, time.monotonic() - started)
+
+        # 3. Trusts
+        started = time.monotonic()
+        trusts = [self.format_entry(dn, raw) for dn, raw in
+                  self.paged_search(conn, base, "(objectClass=trustedDomain)", self.TRUST_ATTRIBUTES)]
+        timings["trusts"] = self._write("trusts.json", trusts, time.monotonic() - started)
+
+        # 4. PKIs (services d'inscription de la partition de configuration)
+        started = time.monotonic()
+        pki_base = f"CN=Enrollment Services,CN=Public Key Services,CN=Services,{config}"
+        try:
+            pkis = [self.format_entry(dn, raw) for dn, raw in
+                    self.paged_search(conn, pki_base, "(objectClass=pKIEnrollmentService)", self.PKI_ATTRIBUTES)]
+        except Exception as e:
+            # Pas d'ADCS : le conteneur n'existe pas
+            print(f" ⚠️ Recherche des PKIs impossible ({pki_base}) : {e}")
+            pkis = []
+        timings["pkis"] = self._write("pkis.json", pkis, time.monotonic() - started)
+
+        print(f" ✅ Collecte LDAP native : {len(users)} utilisateur(s), {len(computers)} ordinateur(s), "
+              f"{len(delegations)} délégation(s), {len(trusts)} trust(s), {len(pkis)} PKI(s)")
+        return timings
+
+    @staticmethod
+    def split_accounts(rows):
+        """(entrée, UAC) -> (utilisateurs activés hors comptes de trust, ordinateurs, comptes avec délégation)."""
+        users, computers, delegations = [], [], []
+        for entry, uac in rows:
+            classes = [c.lower() for c in entry.get("objectClass", [])]
+            if uac & LdapCollector.UAC_DELEGATION or entry.get("msDS-AllowedToDelegateTo") \
+                    or entry.get("msDS-AllowedToActOnBehalfOfOtherIdentity"):
+                delegations.append(entry)
+            if "computer" in classes:
+                computers.append(entry)
+            elif not uac & (LdapCollector.UAC_DISABLED | LdapCollector.UAC_TRUST_ACCOUNTS):
+                users.append(entry)
+        return users, computers, delegations
+
+    @staticmethod
+    def account_row(entry, uac):
+        """Ligne d'instantané (colonnes utiles aux outils + entrée complète) pour un compte."""
+        return {
+            "dn": entry["dn"],
+            "is_computer": "computer" in [c.lower() for c in entry.get("objectClass", [])],
+            "sam": entry.get("sAMAccountName"),
+            "sid": entry.get("objectSid"),
+            "admin_count": entry.get("adminCount", 0),
+            "uac": uac,
+            "dns_hostname": entry.get("dNSHostName"),
+            "os": entry.get("operatingSystem"),
+            "entry": entry,
+        }
+
+    @staticmethod
+    def resolve_computers(computers):
+        """Ajoute 'ip' à chaque ordinateur (dNSHostName résolu, None si échec)."""
+        def resolve(computer):
+            hostname = computer.get("dNSHostName")
+            if not hostname:
+                return None
+            try:
+                return socket.gethostbyname(hostname)
+            except OSError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=LDAP_RESOLVE_THREADS) as executor:
+            for computer, ip in zip(computers, executor.map(resolve, computers)):
+                computer["ip"] = ip
+
+    def _write(self, filename, items, elapsed):
+        """Écrit un fichier JSON (tmp + rename) et retourne l'entrée de timing correspondante."""
+        path = self.output_dir / filename
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(items, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return {"status": "ok", "returncode": 0, "seconds": round(elapsed, 1), "count": len(items)}
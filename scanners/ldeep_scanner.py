@@ -1,104 +1,151 @@
+import asyncio
 import json
+import time
 from pathlib import Path
-from utils.command_runner import run_cmd
+from utils.command_runner import run_cmd_async
+from scanners.ldap_collector import LdapCollector
+from config import LDEEP_MAX_PARALLEL_DUMPS, LDAP_COLLECTOR_BACKEND
 
 class LdeepScanner:
-    """Gère les scans Ldeep (LDAP) ciblés (trusts, pkis, users, delegations, computers) et export JSON + usernames.txt."""
+    """
+    Gère les scans Ldeep (LDAP) ciblés (trusts, pkis, users, delegations, computers) et export JSON + usernames.txt.
+    Avec LDAP_COLLECTOR_BACKEND = "native", la collecte passe par LdapCollector (ldap3, un seul bind),
+    ldeep restant le repli.
+    """
     
     def __init__(self, base_output_dir, dc_host):
-        safe_dc = str(dc_host).replace(":", "_").replace("/", "_").replace("\\", "_")
-        self.output_dir = Path(base_output_dir) / safe_dc
+        self.safe_dc = str(dc_host).replace(":", "_").replace("/", "_").replace("\\", "_")
+        self.output_dir = Path(base_output_dir) / self.safe_dc
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def dump_specific(self, dc_ip, domain, username, password):
-        print(f"\n📂 Lancement de ldeep (dump spécifique) sur {dc_ip}...")
-        
-        # 1. Trusts (JSON)
-        print("\n🔗 Récupération des trusts...")
-        trusts_file = self.output_dir / "trusts.json"
-        cmd_trusts = [
-            "ldeep", "--outfile", str(trusts_file),
+    def _ldap_cmd(self, outfile, dc_ip, domain, username, password, *command):
+        return [
+            "ldeep", "--outfile", str(outfile),
             "ldap",
             "-s", f"ldap://{dc_ip}",
             "-d", domain,
             "-u", username,
             "-p", password,
-            "trusts",
+            *command,
             "-v"
         ]
-        run_cmd(cmd_trusts)
 
-        # 2. PKIs (JSON)
-        print("\n🔐 Récupération des PKIs...")
-        pkis_file = self.output_dir / "pkis.json"
-        cmd_pkis = [
-            "ldeep", "--outfile", str(pkis_file),
-            "ldap",
-            "-s", f"ldap://{dc_ip}",
-            "-d", domain,
-            "-u", username,
-            "-p", password,
-            "pkis",
-            "-v"
+    def _dumps(self, dc_ip, domain, username, password):
+        """
+        Liste des dumps ldeep : (nom, message, commande).
+        Les dumps sont indépendants ; le plus long (computers --resolve) est en tête
+        pour démarrer dès le premier créneau.
+        """
+        files = self._dump_files()
+        return [
+            # Computers & IP Resolution (JSON)
+            ("machines_ip", "\n💻 Récupération des ordinateurs et résolution IP...",
+             self._ldap_cmd(files["machines_ip"], dc_ip, domain, username, password, "computers", "--resolve")),
+            # Users (JSON)
+            ("users", "\n🔐 Récupération des utilisateurs activés...",
+             self._ldap_cmd(files["users"], dc_ip, domain, username, password, "users", "enabled")),
+            # Trusts (JSON)
+            ("trusts", "\n🔗 Récupération des trusts...",
+             self._ldap_cmd(files["trusts"], dc_ip, domain, username, password, "trusts")),
+            # PKIs (JSON)
+            ("pkis", "\n🔐 Récupération des PKIs...",
+             self._ldap_cmd(files["pkis"], dc_ip, domain, username, password, "pkis")),
+            # Delegations (JSON)
+            ("delegations", "\n🔐 Récupération des delegations...",
+             self._ldap_cmd(files["delegations"], dc_ip, domain, username, password, "delegations")),
         ]
-        run_cmd(cmd_pkis)
 
-        # 3. Delegations (JSON)
-        print("\n🔐 Récupération des delegations...")
-        delegations_file = self.output_dir / "delegations.json"
-        cmd_delegations = [
-            "ldeep", "--outfile", str(delegations_file),
-            "ldap",
-            "-s", f"ldap://{dc_ip}",
-            "-d", domain,
-            "-u", username,
-            "-p", password,
-            "delegations",
-            "-v"
-        ]
-        run_cmd(cmd_delegations)
+    def _dump_files(self):
+        return {
+            "trusts": self.output_dir / "trusts.json",
+            "pkis": self.output_dir / "pkis.json",
+            "delegations": self.output_dir / "delegations.json",
+            "users": self.output_dir / "users.json",
+            "machines_ip": self.output_dir / "machines-ip.json",
+        }
 
-        # 4. Users (JSON)
-        print("\n🔐 Récupération des utilisateurs activés...")
-        users_file = self.output_dir / "users.json"
-        cmd_users = [
-            "ldeep", "--outfile", str(users_file),
-            "ldap",
-            "-s", f"ldap://{dc_ip}",
-            "-d", domain,
-            "-u", username,
-            "-p", password,
-            "users",
-            "enabled",
-            "-v"
-        ]
-        run_cmd(cmd_users)
+    def _dump_timing(self, name, started, result):
+        """Statut et durée d'un dump (un dump en échec n'interrompt pas les autres)."""
+        elapsed = time.monotonic() - started
+        if result is None:
+            status = "erreur"
+        elif result.timed_out:
+            status = "timeout"
+        elif result.returncode != 0:
+            status = "échec"
+        else:
+            status = "ok"
+        icon = "✅" if status == "ok" else "⚠️"
+        print(f" {icon} ldeep {name} sur {self.safe_dc} : {status} en {elapsed:.1f}s")
+        return {
+            "status": status,
+            "returncode": result.returncode if result is not None else None,
+            "seconds": round(elapsed, 1),
+        }
 
-        # 5. Computers & IP Resolution (JSON) - NOUVELLE ÉTAPE
-        print("\n💻 Récupération des ordinateurs et résolution IP...")
-        machines_ip_file = self.output_dir / "machines-ip.json"
-        cmd_computers = [
-            "ldeep", "--outfile", str(machines_ip_file),
-            "ldap",
-            "-s", f"ldap://{dc_ip}",
-            "-d", domain,
-            "-u", username,
-            "-p", password,
-            "computers",
-            "--resolve",
-            "-v"
-        ]
-        run_cmd(cmd_computers)
+    def _dump_native(self, dc_ip, domain, username, password):
+        """
+        Collecte native ldap3 (LDAP_COLLECTOR_BACKEND = "native") : un seul bind, mêmes fichiers.
+        Retourne les timings, ou None pour retomber sur les process ldeep.
+        """
+        if LDAP_COLLECTOR_BACKEND != "native":
+            return None
+        if not LdapCollector.available():
+            print(" ⚠️ ldap3 non installé : collecte via ldeep.")
+            return None
+        print(f"\n📂 Collecte LDAP native (ldap3) sur {dc_ip}...")
+        try:
+            return LdapCollector(self.output_dir).collect(dc_ip, domain, username, password)
+        except Exception as e:
+            print(f" ⚠️ Collecte LDAP native en échec sur {dc_ip} ({e}) : collecte via ldeep.")
+            return None
+
+    async def dump_specific_async(self, dc_ip, domain, username, password):
+        """
+        Collecte native si possible, sinon lance les dumps ldeep en parallèle (au plus
+        LDEEP_MAX_PARALLEL_DUMPS à la fois pour ce DC), puis parse/exporte dès qu'ils sont tous finis.
+        Collecte native et parsing final tournent hors de la boucle d'événements.
+        """
+        timings = await asyncio.to_thread(self._dump_native, dc_ip, domain, username, password)
+        if timings is not None:
+            return await asyncio.to_thread(self._finalize, timings)
         
-        print(f"\n✅ Dump LDAP spécifique terminé dans {self.output_dir}")
+        print(f"\n📂 Lancement de ldeep (dump spécifique) sur {dc_ip}...")
+        limit = asyncio.Semaphore(LDEEP_MAX_PARALLEL_DUMPS)
+        
+        async def run_dump(name, message, cmd):
+            async with limit:
+                print(message)
+                started = time.monotonic()
+                result = await run_cmd_async(cmd, log_name=f"{self.safe_dc}_{name}")
+                return self._dump_timing(name, started, result)
+        
+        dumps = self._dumps(dc_ip, domain, username, password)
+        results = await asyncio.gather(*(run_dump(*dump) for dump in dumps), return_exceptions=True)
+        timings = {}
+        for (name, _, _), result in zip(dumps, results):
+            if isinstance(result, Exception):
+                print(f" ❌ Erreur lors du dump ldeep {name} : {result}")
+                result = {"status": "erreur", "returncode": None, "seconds": None}
+            timings[name] = result
+        
+        return await asyncio.to_thread(self._finalize, timings)
+
+    def _finalize(self, timings):
+        files = self._dump_files()
+        total = sum(t["seconds"] or 0 for t in timings.values())
+        failed = [name for name, t in timings.items() if t["status"] != "ok"]
+        print(f"\n✅ Dump LDAP spécifique terminé dans {self.output_dir} ({total:.1f}s cumulées)")
+        if failed:
+            print(f" ⚠️ Dump(s) ldeep en échec : {', '.join(failed)}")
         
         # Parse et exporte en JSON agrégé
         # On passe le nouveau fichier machines_ip_file au parser
-        results = self._parse_results(trusts_file, pkis_file, users_file, delegations_file, machines_ip_file)
-        self._export_json(results)
+        results = self._parse_results(files["trusts"], files["pkis"], files["users"], files["delegations"], files["machines_ip"])
+        self._export_json(results, timings)
 
         # Export usernames.txt à partir de users.json
-        self._export_usernames_from_users_json(users_file)
+        self._export_usernames_from_users_json(files["users"])
 
         return results
 
@@ -158,12 +205,14 @@ class LdeepScanner:
 
         return results
 
-    def _export_json(self, results):
+    def _export_json(self, results, timings=None):
         json_file = self.output_dir / "ldap_results.json"
         json_data = {
             "metadata": {
                 "scanner": "ldeep",
-                "export_type": "structured_ldap_dump"
+                "export_type": "structured_ldap_dump",
+                # Statut et durée de chaque dump ldeep
+                "dumps": timings or {},
             },
             "data": {
                 "trusts": {
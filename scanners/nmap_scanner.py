@@ -1,48 +1,280 @@
+import asyncio
+import ipaddress
 from pathlib import Path
-from utils.command_runner import run_cmd
+from utils.command_runner import run_cmd_async
 from parsers.nmap_json_builder import NmapJsonBuilder
-from config import ALL_PORTS_NMAP, NMAP_OPTIONS, OUTPUT_BASE_DIR
+from parsers.nmap_shard_merger import NmapShardMerger
+from parsers.xml_parser import XmlParser
+from config import (
+    ALL_PORTS_NMAP,
+    NMAP_OPTIONS,
+    OUTPUT_BASE_DIR,
+    NMAP_SHARD_PREFIX,
+    NMAP_MAX_PROCESSES,
+    NMAP_MERGE_INTERVAL,
+    NMAP_SCAN_MODE,
+    NMAP_DISCOVERY_OPTIONS,
+)
 
 
 class NmapScanner:
-    """Gère les scans Nmap (un dossier par sous-réseau + modes liste d'hôtes)."""
-    
-    def __init__(self, base_output_dir=None):
+    """
+    Gère les scans Nmap (un dossier par sous-réseau + modes liste d'hôtes).
+    Moteur asyncio : une coroutine par shard / groupe (aucun thread par nmap), au plus
+    NMAP_MAX_PROCESSES shards en vol ; parsings et fusions via asyncio.to_thread.
+    """
+
+    def __init__(self, base_output_dir=None, mode=None):
         self.base_output_dir = Path(base_output_dir or OUTPUT_BASE_DIR)
         self.base_output_dir.mkdir(parents=True, exist_ok=True)
-    
+        # "full" ou "pipeline" (voir NMAP_SCAN_MODE)
+        self.mode = mode or NMAP_SCAN_MODE
+        # Callback appelé avec chaque lot d'hôtes trouvés (format NmapJsonBuilder), voir scan_subnet_async
+        self._on_hosts = None
+
     def _subnet_folder(self, subnet: str) -> Path:
         safe_name = subnet.replace("/", "_").replace(".", "_")
         folder = self.base_output_dir / safe_name
         folder.mkdir(parents=True, exist_ok=True)
         return folder
-    
-    def scan_subnet(self, subnet: str):
-        subdir = self._subnet_folder(subnet)
-        xml_file = subdir / "full_scan.xml"
-        json_file = subdir / "full_scan.json"
-        
-        cmd = [
-            "nmap", subnet,
+
+    @staticmethod
+    def _full_cmd(target: str, xml_file: Path):
+        return [
+            "nmap", target,
             "-p", ALL_PORTS_NMAP,
             "-sV", "-sC"
         ] + NMAP_OPTIONS.split() + [
             "-oX", str(xml_file)
         ]
-        
+
+    @staticmethod
+    def _discovery_cmd(target: str, xml_file: Path):
+        return [
+            "nmap", target,
+            "-p", ALL_PORTS_NMAP,
+        ] + NMAP_DISCOVERY_OPTIONS.split() + [
+            "-oX", str(xml_file)
+        ]
+
+    @staticmethod
+    def _service_cmd(targets_file: Path, ports, xml_file: Path):
+        return [
+            "nmap", "-iL", str(targets_file),
+            "-p", ",".join(str(p) for p in ports),
+            "-sV", "-sC"
+        ] + NMAP_OPTIONS.split() + [
+            "-oX", str(xml_file)
+        ]
+
+    def _notify_hosts(self, hosts):
+        if self._on_hosts is None or not hosts:
+            return
+        try:
+            self._on_hosts(hosts)
+        except Exception as e:
+            print(f" ⚠️ Erreur dans le callback de résultats Nmap : {e}")
+
+    @staticmethod
+    def _read_discovery(target: str, discovery_xml: Path):
+        """Lit le XML de découverte : (ports ouverts (tuple trié) -> liste d'IP, hôtes découverts)."""
+        groups = {}
+        discovered = []
+        if discovery_xml.exists():
+            try:
+                discovered = list(NmapJsonBuilder.iter_hosts(str(discovery_xml)))
+            except Exception as e:
+                print(f" ⚠️ Erreur lors de la lecture de {discovery_xml}: {e}")
+                discovered = []
+            for host in discovered:
+                ports = tuple(sorted({p["port"] for p in host["ports"] if p["protocol"] == "tcp"}))
+                if ports:
+                    groups.setdefault(ports, []).append(host["ip"])
+        else:
+            print(f" ❌ Fichier XML de découverte non généré pour {target}.")
+
+        live_pairs = sum(len(ports) * len(ips) for ports, ips in groups.items())
+        print(f" ✅ Découverte {target} : {sum(len(ips) for ips in groups.values())} hôte(s), {live_pairs} couple(s) hôte:port")
+        return groups, discovered
+
+    @staticmethod
+    def _write_groups(groups, workdir: Path):
+        """Écrit un fichier de cibles par groupe : [(targets_file, ports, group_xml)]."""
+        jobs = []
+        for index, (ports, ips) in enumerate(groups.items()):
+            targets_file = workdir / f"group_{index}.txt"
+            targets_file.write_text("\n".join(ips) + "\n", encoding="utf-8")
+            jobs.append((targets_file, ports, workdir / f"group_{index}.xml"))
+        return jobs
+
+    @staticmethod
+    def _merge_shards(merger, completed):
+        """Ajoute les shards terminés depuis la dernière fusion (les précédents ne sont pas reparsés)."""
+        hosts, up_hosts = merger.merge(completed)
+        print(f" 🔀 Fusion de {len(completed)} shard(s) : {hosts} hôte(s) XML, {up_hosts} hôte(s) avec ports ouverts")
+
+    @staticmethod
+    def _result(subdir, xml_file, json_file):
+        return {
+            "folder": subdir,
+            "xml": xml_file if xml_file.exists() else None,
+            "json": json_file if json_file.exists() else None,
+        }
+
+    # ------ Scan ------
+    # Les parsings/fusions (CPU + disque) tournent via asyncio.to_thread et les callbacks on_hosts
+    # sont appelés depuis la boucle d'événements (asyncio.Queue.put_nowait OK).
+
+    async def _notify_json_async(self, json_file: Path):
+        if self._on_hosts is not None and json_file.exists():
+            hosts = await asyncio.to_thread(lambda: list(NmapJsonBuilder.iter_json_hosts([str(json_file)])))
+            self._notify_hosts(hosts)
+
+    async def _scan_target_async(self, target: str, xml_file: Path):
+        if self.mode == "pipeline":
+            await self._run_pipeline_async(target, xml_file)
+        else:
+            await run_cmd_async(self._full_cmd(target, xml_file))
+
+    async def _run_pipeline_async(self, target: str, xml_file: Path):
+        """
+        Mode pipeline en deux phases :
+        1. découverte SYN rapide (pas de -sV) des ports ouverts de ALL_PORTS_NMAP ;
+        2. -sV -sC uniquement sur les hôtes vivants, groupés par ensemble de ports ouverts
+           (un nmap -iL par groupe), puis fusion des groupes dans xml_file.
+        """
+        workdir = xml_file.parent / f"{xml_file.stem}_pipeline"
+        workdir.mkdir(parents=True, exist_ok=True)
+
+        discovery_xml = workdir / "discovery.xml"
+        print(f" 🔎 Découverte rapide des ports ouverts sur {target}...")
+        await run_cmd_async(self._discovery_cmd(target, discovery_xml))
+
+        groups, discovered = await asyncio.to_thread(self._read_discovery, target, discovery_xml)
+        self._notify_hosts(discovered)
+
+        jobs = self._write_groups(groups, workdir)
+        results = await asyncio.gather(
+            *(run_cmd_async(self._service_cmd(targets_file, ports, group_xml)) for targets_file, ports, group_xml in jobs),
+            return_exceptions=True,
+        )
+        group_xmls = []
+        for (_, _, group_xml), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f" ❌ Erreur lors du scan de services sur {target} : {result}")
+            elif group_xml.exists():
+                group_xmls.append(group_xml)
+
+        await asyncio.to_thread(XmlParser.merge_nmap_xml, [str(x) for x in sorted(group_xmls)], str(xml_file))
+
+    async def scan_subnet_async(self, subnet: str, shard_prefix=None, on_hosts=None):
+        """
+        Scanne un subnet. S'il est plus large que shard_prefix (défaut NMAP_SHARD_PREFIX),
+        il est découpé en shards scannés en parallèle et fusionnés au fil de l'eau.
+        En mode "pipeline", chaque cible passe par une découverte rapide avant -sV -sC.
+        on_hosts(hosts) est appelé à chaque lot d'hôtes avec ports ouverts :
+        fin de découverte, shard terminé ou fin du scan.
+        """
+        self._on_hosts = on_hosts
+        shard_prefix = NMAP_SHARD_PREFIX if shard_prefix is None else shard_prefix
+        network = ipaddress.ip_network(subnet, strict=False)
+        if shard_prefix and network.prefixlen < shard_prefix:
+            return await self._scan_sharded_async(subnet, network, shard_prefix)
+
+        subdir = self._subnet_folder(subnet)
+        xml_file = subdir / "full_scan.xml"
+        json_file = subdir / "full_scan.json"
+
         print(f"\n📡 Lancement du scan Nmap sur {subnet}...")
         print(f"📁 Dossier de sortie : {subdir}")
-        run_cmd(cmd)
-        
+        await self._scan_target_async(subnet, xml_file)
+
         if xml_file.exists():
             print(f" ✅ Scan Nmap terminé. Résultats XML : {xml_file}")
-            NmapJsonBuilder.build_json(str(xml_file), str(json_file))
+            await asyncio.to_thread(NmapJsonBuilder.build_json, str(xml_file), str(json_file))
             print(f" ✅ JSON généré : {json_file}")
+            await self._notify_json_async(json_file)
         else:
             print(f" ❌ Fichier XML Nmap non généré pour {subnet}.")
-        
-        return {
-            "folder": subdir,
-            "xml": xml_file if xml_file.exists() else None,
-            "json": json_file if json_file.exists() else None,
-        }
+
+        return self._result(subdir, xml_file, json_file)
+
+    async def _scan_sharded_async(self, subnet, network, shard_prefix):
+        """
+        Découpe le subnet en /shard_prefix et fusionne les shards terminés dans
+        full_scan.xml / full_scan.json (au plus toutes les NMAP_MERGE_INTERVAL secondes).
+        """
+        subdir = self._subnet_folder(subnet)
+        shards_dir = subdir / "shards"
+        shards_dir.mkdir(parents=True, exist_ok=True)
+        xml_file = subdir / "full_scan.xml"
+        json_file = subdir / "full_scan.json"
+
+        shards = [str(s) for s in network.subnets(new_prefix=shard_prefix)]
+        print(f"\n📡 Lancement du scan Nmap sur {subnet} en {len(shards)} shard(s) /{shard_prefix}...")
+        print(f"📁 Dossier de sortie : {subdir}")
+
+        completed = []
+        merger = NmapShardMerger(xml_file, json_file, shards_dir)
+        loop = asyncio.get_running_loop()
+        last_merge = 0.0
+
+        # Fenêtre glissante de tâches (contre-pression : pas une tâche par /24 d'un /8 d'un coup)
+        remaining = iter(shards)
+        tasks = {}
+
+        def refill():
+            while len(tasks) < NMAP_MAX_PROCESSES:
+                shard = next(remaining, None)
+                if shard is None:
+                    return
+                tasks[asyncio.ensure_future(self._scan_shard_async(shard, shards_dir))] = shard
+
+        refill()
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    shard = tasks.pop(task)
+                    try:
+                        shard_files = task.result()
+                    except Exception as e:
+                        print(f" ❌ Erreur sur le shard {shard} : {e}")
+                        continue
+                    if shard_files is None:
+                        continue
+
+                    completed.append(shard_files)
+                    print(f" ✅ Shard {shard} terminé ({len(completed)}/{len(shards)})")
+
+                    if loop.time() - last_merge >= NMAP_MERGE_INTERVAL:
+                        await asyncio.to_thread(self._merge_shards, merger, list(completed))
+                        last_merge = loop.time()
+                refill()
+
+            if completed:
+                await asyncio.to_thread(self._merge_shards, merger, completed)
+                print(f" ✅ Scan Nmap terminé. Résultats XML : {xml_file}")
+                print(f" ✅ JSON généré : {json_file}")
+            else:
+                print(f" ❌ Aucun shard Nmap n'a produit de résultat pour {subnet}.")
+        finally:
+            # Annulation : les nmap en cours sont tués par run_cmd_async
+            for task in tasks:
+                task.cancel()
+            merger.close()
+
+        return self._result(subdir, xml_file, json_file)
+
+    async def _scan_shard_async(self, shard, shards_dir):
+        safe_name = shard.replace("/", "_").replace(".", "_")
+        shard_xml = shards_dir / f"{safe_name}.xml"
+        shard_json = shards_dir / f"{safe_name}.json"
+
+        await self._scan_target_async(shard, shard_xml)
+        if not shard_xml.exists():
+            print(f" ❌ Fichier XML Nmap non généré pour le shard {shard}.")
+            return None
+        await asyncio.to_thread(NmapJsonBuilder.build_json, str(shard_xml), str(shard_json))
+        await self._notify_json_async(shard_json)
+        return shard_xml, shard_json
@@ -1,5 +1,5 @@
 from pathlib import Path
-from utils.command_runner import run_cmd
+from utils.command_runner import run_cmd_async
 
 class NxcScanner:
     """Gère les scans NetExec (nxc)."""
@@ -7,16 +7,19 @@ class NxcScanner:
     def __init__(self, output_dir):
         self.output_dir = Path(output_dir)
     
-    
-    def scan_smb_signing(self, subnet):
-        """Scan SMB signing."""
+    def _smb_signing_cmd(self, subnet):
         output_file = self.output_dir / "nxc_smb_signing.txt"
         cmd = [
             "nxc", "smb", subnet,
             "--gen-relay-list", str(output_file)
         ]
+        return cmd, output_file
+    
+    async def scan_smb_signing_async(self, subnet):
+        """Scan SMB signing."""
+        cmd, output_file = self._smb_signing_cmd(subnet)
         
         print(f"\n🔍 Scan SMB signing sur {subnet}...")
-        run_cmd(cmd)
+        await run_cmd_async(cmd)
         print(f" ✅ Résultats dans {output_file}")
     
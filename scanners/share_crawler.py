@@ -0,0 +1,338 @@
+import ipaddress
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from pathlib import Path
+
+from impacket.smbconnection import SMBConnection, SessionError
+
+from parsers.shareql import ShareQLRules
+from parsers.manspider_parser import ManSpiderOutputParser
+from parsers.credential_matcher import CredentialMatcher
+from utils.loot_store import LootStore
+from utils.tcp_probe import probe
+from config import (
+    SHARE_CRAWLER_HOSTS,
+    SHARE_CRAWLER_CONNECTIONS,
+    SHARE_CRAWLER_TIMEOUT,
+    SHARE_CRAWLER_PROBE_CONCURRENCY,
+    SHARE_CRAWLER_MAX_DOWNLOAD,
+    SHARE_CRAWLER_RULES,
+)
+
+
+# Hôtes explorés simultanément, tous crawlers du process confondus (un ShareCrawler par CIDR dans le workflow)
+_host_slots = threading.BoundedSemaphore(SHARE_CRAWLER_HOSTS)
+
+
+def human_size(size):
+    """Taille lisible, comme dans la sortie ManSpider (ex. 12.34KB)."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size}B" if unit == "B" else f"{size:.2f}{unit}"
+        size /= 1024
+
+
+class SmbConnectionPool:
+    """Au plus `size` connexions SMB authentifiées vers un hôte, partagées par les threads de cet hôte."""
+
+    def __init__(self, factory, size, first, timeout=SHARE_CRAWLER_TIMEOUT):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.Queue()
+        self.idle.put(first)
+        self.created = 1
+        self.all = [first]
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        """
+        Connexion libre, ou nouvelle connexion tant que le pool n'est pas plein. Un hôte qui refuse une
+        session de plus fait attendre une connexion existante, par tranches de `timeout` : si celle-ci
+        casse entre-temps, la place libérée est reprise (nouvelle tentative de connexion) au lieu
+        d'attendre indéfiniment une connexion qui ne reviendra pas.
+        """
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            if create:
+                try:
+                    conn = self.factory()
+                except Exception:
+                    with self._lock:
+                        self.created -= 1
+                        if self.created == 0:
+                            raise
+                else:
+                    with self._lock:
+                        self.all.append(conn)
+                    return conn
+            try:
+                return self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                continue
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except SessionError:
+            raise
+        except Exception:
+            # Connexion cassée (timeout, reset) : remplacée à la prochaine demande
+            broken = True
+            raise
+        finally:
+            if broken:
+                with self._lock:
+                    self.created -= 1
+                self._close(conn)
+            else:
+                self.idle.put(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        for conn in self.all:
+            self._close(conn)
+
+
+class ShareCrawler:
+    """
+    Crawler SMB en process (impacket), alternative à ManSpider pour le workflow ManSpider :
+    - pré-sonde TCP 445 asyncio du CIDR, puis au plus SHARE_CRAWLER_HOSTS hôtes explorés en parallèle
+      (limite globale au process, partagée par les CIDR crawlés en même temps), chacun avec un pool d'au plus SHARE_CRAWLER_CONNECTIONS connexions SMB (un dossier listé par requête) ;
+    - règles ShareQL évaluées pendant le parcours : un share ou dossier refusé (EXPLORATION) n'est
+      jamais listé, un fichier refusé (PROCESSING) n'est pas retenu ;
+    - chaque fichier retenu est écrit aussitôt dans <output_json>.jsonl, puis <output_json> est regroupé
+      par hôte au schéma d'enum_file.json (ou de grepcreds.json avec grep=True : fichiers téléchargés
+      via LootStore, inchangés / doublons non retéléchargés, contenu noté par CredentialMatcher).
+      En fin de share, les fichiers revus inchangés sont marqués vus et ceux qui ne sont plus retenus
+      sont retirés de l'index (sauf si un dossier du share n'a pas pu être listé).
+    """
+
+    def __init__(self, base_output_dir, network_cidr, rules=None, hosts=SHARE_CRAWLER_HOSTS,
+                 connections=SHARE_CRAWLER_CONNECTIONS, timeout=SHARE_CRAWLER_TIMEOUT):
+        self.network_cidr = network_cidr
+        safe_cidr = str(network_cidr).replace(":", "").replace("/", "_").replace("\\", "_")
+        self.output_dir = Path(base_output_dir) / safe_cidr
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.rules = ShareQLRules.load(rules or SHARE_CRAWLER_RULES)
+        self.explore = self.rules.decider("EXPLORATION")
+        self.process = self.rules.decider("PROCESSING")
+        self.host_limit = hosts
+        self.connections = connections
+        self.timeout = timeout
+        self._journal_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    # ------ API ------
+    def crawl(self, domain, username, password, output_json="enum_file.json", grep=False, hashes=None):
+        self.domain, self.username, self.password = domain, username, password
+        self.lmhash, self.nthash = hashes.split(":") if hashes else ("", "")
+        self.grep = grep
+        self.store = LootStore() if grep else None
+        self.matcher = CredentialMatcher() if grep else None
+        self.stats = dict.fromkeys(
+            ("hosts", "shares", "dirs", "pruned", "files", "skipped", "downloaded", "duplicates", "cached", "forgotten",
+             "errors"), 0
+        )
+
+        targets = [str(ip) for ip in ipaddress.ip_network(self.network_cidr, strict=False).hosts()] or [str(self.network_cidr)]
+        print(f"\n🕷️ Crawler SMB sur {self.network_cidr} : pré-sonde 445 de {len(targets)} hôtes...")
+        started = time.monotonic()
+        reachable = sorted(probe(targets, 445, SHARE_CRAWLER_PROBE_CONCURRENCY, min(self.timeout, 2)),
+                           key=lambda ip: ipaddress.ip_address(ip))
+        print(f"→ {len(reachable)} hôtes joignables, exploration ({self.host_limit} hôtes x {self.connections} connexions)...")
+
+        json_path = self.output_dir / output_json
+        journal_path = json_path.with_suffix(".jsonl")
+        logged_in = []
+        # Une ligne par fichier, visible immédiatement (suivi pendant le crawl)
+        with open(journal_path, "w", encoding="utf-8", buffering=1) as journal:
+            self._journal = journal
+            with ThreadPoolExecutor(max_workers=self.host_limit) as executor:
+                futures = {executor.submit(self._crawl_host, ip): ip for ip in reachable}
+                for future in futures:
+                    # Un hôte en échec (SQLite du loot...) n'interrompt pas le CIDR ni l'écriture du JSON groupé
+                    try:
+                        if future.result():
+                            logged_in.append(futures[future])
+                    except Exception as e:
+                        self._count("errors")
+                        print(f" ⚠️ Crawl de {futures[future]} interrompu : {e}")
+
+        hosts = ManSpiderOutputParser.write_grouped(journal_path, logged_in, json_path)
+        elapsed = time.monotonic() - started
+        s = self.stats
+        print(f"✅ Crawler terminé en {elapsed:.0f}s : {s['hosts']} hôtes, {s['shares']} shares, {s['dirs']} dossiers "
+              f"({s['pruned']} élagués par les règles), {s['files']} fichiers retenus ({s['skipped']} écartés), "
+              f"{s['errors']} erreurs.")
+        if grep:
+            print(f"→ Contenus : {s['downloaded']} téléchargés (dont {s['duplicates']} déjà connus sur un autre chemin), "
+                  f"{s['cached']} inchangés non retéléchargés (cache loot), {s['forgotten']} disparus retirés de l'index.")
+        print(f"✅ Résultats JSON dans {json_path} ({sum(len(h['files']) for h in hosts)} fichiers)")
+
+    # ------ Un hôte ------
+    def _connect(self, ip):
+        conn = SMBConnection(ip, ip, sess_port=445, timeout=self.timeout)
+        conn.login(self.username, self.password, self.domain, self.lmhash, self.nthash)
+        return conn
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _emit(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._journal_lock:
+            self._journal.write(line)
+
+    def _crawl_host(self, ip):
+        """Explore tous les shares autorisés d'un hôte. Retourne True si l'authentification a réussi."""
+        with _host_slots:
+            return self._crawl_host_slot(ip)
+
+    def _crawl_host_slot(self, ip):
+        first = None
+        try:
+            first = self._connect(ip)
+            shares = [share["shi1_netname"][:-1] for share in first.listShares()]
+        except Exception:
+            if first is not None:
+                SmbConnectionPool._close(first)
+            self._count("errors")
+            return False
+        self._count("hosts")
+
+        pool = SmbConnectionPool(lambda: self._connect(ip), self.connections, first, self.timeout)
+        states = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                pending = {}    # future -> état du share listé (None sans grep)
+                for share in shares:
+                    if not self.explore(ShareQLRules.share_context(share)):
+                        self._count("pruned")
+                        continue
+                    self._count("shares")
+                    state = None
+                    if self.grep:
+                        # Index loot du share : fichiers connus, revus, inchangés, listing incomplet ?
+                        state = states[share] = {"known": self.store.known(ip, share), "seen": set(),
+                                                 "unchanged": [], "incomplete": False}
+                    pending[executor.submit(self._list_dir, pool, ip, share, state, [])] = state
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        state = pending.pop(future)
+                        try:
+                            jobs = future.result()
+                        except Exception:
+                            # Dossier listé mais pas traité jusqu'au bout (loot, grep) : sous-dossiers non visités
+                            self._count("errors")
+                            if state is not None:
+                                state["incomplete"] = True
+                            continue
+                        for job in jobs:
+                            pending[executor.submit(self._list_dir, pool, ip, *job)] = job[1]
+        finally:
+            pool.close()
+        for share, state in states.items():
+            self._sync_share(ip, share, state)
+        return True
+
+    def _sync_share(self, ip, share, state):
+        """Fin de share : seen_at des fichiers inchangés, oubli des fichiers connus absents de ce passage."""
+        self.store.touch(ip, share, state["unchanged"])
+        if state["incomplete"]:
+            return
+        removed = [path for path in state["known"] if path not in state["seen"]]
+        if removed:
+            self.store.forget(ip, share, removed)
+            self._count("forgotten", len(removed))
+
+    def _list_dir(self, pool, ip, share, state, parts):
+        """Liste un dossier ; retourne les sous-dossiers à explorer [(share, state, parts), ...]."""
+        dir_path = "\\" + "\\".join(parts)
+        try:
+            with pool.connection() as conn:
+                entries = conn.listPath(share, (dir_path.rstrip("\\") + "\\*"))
+        except Exception:
+            self._count("errors")
+            if state is not None:
+                state["incomplete"] = True
+            return []
+        self._count("dirs")
+
+        subdirs = []
+        for entry in entries:
+            name = entry.get_longname()
+            if name in (".", ".."):
+                continue
+            if entry.is_directory():
+                if self.explore(ShareQLRules.directory_context(share, parts + [name])):
+                    subdirs.append((share, state, parts + [name]))
+                else:
+                    self._count("pruned")
+                continue
+
+            size = entry.get_filesize()
+            file_path = "\\".join(parts + [name])
+            if not self.process(ShareQLRules.file_context(share, parts, name, size)):
+                self._count("skipped")
+                continue
+            self._count("files")
+            record = {"ip": ip, "path": f"{share}\\{file_path}", "size": human_size(size)}
+            if self.grep:
+                record = self._grep_file(pool, ip, share, state, file_path, size, entry.get_mtime_epoch(), record)
+            if record is not None:
+                self._emit(record)
+        return subdirs
+
+    def _grep_file(self, pool, ip, share, state, file_path, size, mtime, record):
+        """Contenu via LootStore (téléchargé seulement s'il a changé) ; record grepcreds si le score est non nul."""
+        state["seen"].add(file_path)
+        if size > SHARE_CRAWLER_MAX_DOWNLOAD:
+            return None
+        sha256 = LootStore.unchanged(state["known"], file_path, size, mtime)
+        if sha256 is not None and self.store.has_blob(sha256):
+            self._count("cached")
+            state["unchanged"].append(file_path)
+        else:
+            tmp = self.store.temp_file()
+            try:
+                with pool.connection() as conn:
+                    conn.getFile(share, "\\" + file_path, tmp.write)
+                tmp.close()
+            except Exception:
+                tmp.close()
+                Path(tmp.name).unlink(missing_ok=True)
+                self._count("errors")
+                return None
+            sha256, is_new = self.store.put_file(ip, share, file_path, size, mtime, tmp.name, move=True)
+            self._count("downloaded")
+            if not is_new:
+                self._count("duplicates")
+
+        result, _cached = self.store.grep(sha256, self.matcher)
+        if not result["score"]:
+            return None
+        return {**record, **result}
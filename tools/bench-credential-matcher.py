@@ -0,0 +1,122 @@
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Accès aux modules du projet (parsers/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from parsers.credential_matcher import CredentialMatcher
+
+EXTENSIONS = [".ini", ".config", ".xml", ".ps1", ".bat", ".json", ".txt", ".vbs"]
+FILLER = [
+    "Write-Host \"Deploying package {n}\"",
+    "<setting name=\"Timeout{n}\" value=\"{n}\" />",
+    "[Section{n}]",
+    "LogLevel=Information",
+    "robocopy \\\\fs01\\deploy C:\\deploy /MIR /R:{n}",
+    "\"endpoint\": \"https://app{n}.corp.local/api\",",
+    "; generated by the build pipeline {n}",
+    "If Err.Number <> 0 Then WScript.Quit {n}",
+]
+SECRETS = [
+    "DB_PASSWORD=Winter{n}!",
+    "$cred = New-Object PSCredential(\"svc_{n}\", $pwd)",
+    "<add name=\"Main\" connectionString=\"Server=sql{n};User Id=sa;Password=P@ss{n}\" />",
+    "\"api_key\": \"AKIA{n:012d}\",",
+    "net use Z: \\\\fs01\\share /user:CORP\\admin{n} Azerty{n}",
+    "username = backup{n}",
+]
+
+
+def generate_corpus(root, file_count, lines_per_file, seed=1337):
+    """Corpus synthétique de fichiers de config/scripts : ~2 % de lignes sensibles."""
+    rnd = random.Random(seed)
+    total = 0
+    for i in range(file_count):
+        lines = []
+        for n in range(lines_per_file):
+            source = SECRETS if rnd.random() < 0.02 else FILLER
+            lines.append(rnd.choice(source).format(n=rnd.randint(1, 99999)))
+        path = root / f"file{i}{rnd.choice(EXTENSIONS)}"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        total += path.stat().st_size
+    return total
+
+
+def legacy_patterns(matcher):
+    """Approche d'origine : une regex sensible à la casse par variante (mot, Mot, MOT), un passage chacune."""
+    variants = set()
+    for word in matcher.patterns():
+        variants.update((word, word.capitalize(), word.upper()))
+    return [re.compile(re.escape(v)) for v in sorted(variants)]
+
+
+def scan_legacy(patterns, files):
+    hits = 0
+    for path in files:
+        text = path.read_bytes().decode("utf-8", errors="replace")
+        for pattern in patterns:
+            hits += len(pattern.findall(text))
+    return hits
+
+
+def scan_compiled(matcher, files):
+    scored = 0
+    for path in files:
+        if matcher.scan_file(path)["score"]:
+            scored += 1
+    return scored
+
+
+def measure(label, func, size, file_count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed:8.2f} s   {size / 1024 / 1024 / elapsed:8.1f} Mo/s   {file_count / elapsed:8.0f} fichiers/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recherche de credentials : une regex par variante vs CredentialMatcher")
+    parser.add_argument("-n", "--files", type=int, default=2000, help="Nombre de fichiers synthétiques (défaut 2000)")
+    parser.add_argument("-l", "--lines", type=int, default=200, help="Lignes par fichier (défaut 200)")
+    parser.add_argument("--dir", help="Mesurer sur un dossier existant (loot ManSpider...) au lieu du corpus synthétique")
+    parser.add_argument("--top", type=int, default=5, help="Afficher les N fichiers les mieux notés")
+    args = parser.parse_args()
+
+    matcher = CredentialMatcher()
+    workdir = None
+    if args.dir:
+        files = [p for p in Path(args.dir).rglob("*") if p.is_file()]
+        size = sum(p.stat().st_size for p in files)
+    else:
+        workdir = Path(tempfile.mkdtemp(prefix="bench_creds_"))
+        print(f"[*] Génération de {args.files} fichiers dans {workdir}...")
+        size = generate_corpus(workdir, args.files, args.lines)
+        files = sorted(workdir.iterdir())
+    print(f"[+] Corpus : {len(files)} fichiers, {size / 1024 / 1024:.1f} Mo")
+
+    patterns = legacy_patterns(matcher)
+    print(f"[*] {len(patterns)} regex (variantes de casse) vs {len(matcher.patterns())} règles compilées en une regex")
+    measure("une regex / variante", lambda: scan_legacy(patterns, files), size, len(files))
+    scored = measure("CredentialMatcher", lambda: scan_compiled(matcher, files), size, len(files))
+    print(f"[+] {scored}/{len(files)} fichiers avec au moins une correspondance")
+
+    if args.top:
+        ranking = sorted(((matcher.scan_file(p)["score"], p) for p in files), reverse=True)[:args.top]
+        for score, path in ranking:
+            print(f"  {score:6d}  {path}")
+
+    if workdir is not None:
+        for f in workdir.iterdir():
+            os.remove(f)
+        workdir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import json
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Accès aux modules du projet (scanners/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from scanners.ldap_collector import LdapCollector
+
+DOMAIN = "corp.local"
+BASE_DN = "DC=corp,DC=local"
+ADMIN_DN = f"CN=bench-admin,CN=Users,{BASE_DN}"
+ADMIN_PASSWORD = "bench"
+DUMPS = ("users", "machines_ip", "delegations", "trusts", "pkis")
+DUMP_FILES = {"users": "users.json", "machines_ip": "machines-ip.json", "delegations": "delegations.json",
+              "trusts": "trusts.json", "pkis": "pkis.json"}
+
+
+def sid(rid):
+    return b"\x01\x05\x00\x00\x00\x00\x00\x05\x15\x00\x00\x00" + b"".join(
+        x.to_bytes(4, "little") for x in (1111, 2222, 3333, rid))
+
+
+def generate_directory(path, user_count, computer_count, seed=1337):
+    """Annuaire AD synthétique (dn -> attributs), sérialisé pour être rechargé par chaque process."""
+    rnd = random.Random(seed)
+    entries = [(ADMIN_DN, {"objectClass": ["top", "person"], "userPassword": ADMIN_PASSWORD})]
+    groups = [f"CN=Group{i},CN=Users,{BASE_DN}" for i in range(50)]
+    # Attributs "bruit" que ldeep -v récupère aussi (il demande tous les attributs)
+    noise = {"logonCount": "42", "badPwdCount": "0", "codePage": "0", "countryCode": "0",
+             "primaryGroupID": "513", "instanceType": "4", "sAMAccountType": "805306368",
+             "homeDirectory": "\\\\fs01\\home", "profilePath": "\\\\fs01\\profiles"}
+
+    for i in range(user_count):
+        uac = 512 | (2 if rnd.random() < 0.1 else 0) | (0x80000 if rnd.random() < 0.005 else 0)
+        attrs = {
+            "objectClass": ["top", "person", "organizationalPerson", "user"],
+            "distinguishedName": f"CN=user{i},CN=Users,{BASE_DN}",
+            "sAMAccountName": f"user{i}",
+            "userPrincipalName": f"user{i}@{DOMAIN}",
+            "displayName": f"User {i}",
+            "description": f"Compte de test {i}",
+            "memberOf": rnd.sample(groups, 3),
+            "objectSid": sid(1000 + i),
+            "objectGUID": rnd.randbytes(16),
+            "userAccountControl": str(uac),
+            "adminCount": "1" if i % 200 == 0 else "0",
+            "pwdLastSet": "133500000000000000",
+            "lastLogonTimestamp": "0" if i % 7 == 0 else "133510000000000000",
+            "whenCreated": "20240101120000.0Z",
+            **noise,
+        }
+        if i % 100 == 0:
+            attrs["servicePrincipalName"] = [f"HTTP/web{i}.{DOMAIN}"]
+            attrs["msDS-AllowedToDelegateTo"] = [f"cifs/fs01.{DOMAIN}"]
+        entries.append((attrs["distinguishedName"], attrs))
+
+    for i in range(computer_count):
+        attrs = {
+            "objectClass": ["top", "person", "organizationalPerson", "user", "computer"],
+            "distinguishedName": f"CN=PC{i},CN=Computers,{BASE_DN}",
+            "sAMAccountName": f"PC{i}$",
+            "name": f"PC{i}",
+            "dNSHostName": f"pc{i}.{DOMAIN}",
+            "operatingSystem": "Windows Server 2019" if i % 10 == 0 else "Windows 10 Pro",
+            "objectSid": sid(500000 + i),
+            "objectGUID": rnd.randbytes(16),
+            "userAccountControl": str(0x1000 | (0x80000 if i < 3 else 0)),
+            "servicePrincipalName": [f"HOST/pc{i}.{DOMAIN}", f"HOST/PC{i}"],
+            "whenCreated": "20240101120000.0Z",
+            **noise,
+        }
+        entries.append((attrs["distinguishedName"], attrs))
+
+    for i in range(3):
+        attrs = {"objectClass": ["top", "leaf", "trustedDomain"], "cn": f"partner{i}.local",
+                 "distinguishedName": f"CN=partner{i}.local,CN=System,{BASE_DN}",
+                 "flatName": f"PARTNER{i}", "trustPartner": f"partner{i}.local",
+                 "trustType": "2", "trustDirection": str(1 + i % 3), "trustAttributes": "8",
+                 "securityIdentifier": sid(0)[:24], "whenCreated": "20240101120000.0Z"}
+        entries.append((attrs["distinguishedName"], attrs))
+
+    pki_dn = f"CN=CORP-CA,CN=Enrollment Services,CN=Public Key Services,CN=Services,CN=Configuration,{BASE_DN}"
+    entries.append((pki_dn, {"objectClass": ["top", "pKIEnrollmentService"], "cn": "CORP-CA", "name": "CORP-CA",
+                             "distinguishedName": pki_dn, "dNSHostName": f"ca01.{DOMAIN}",
+                             "certificateTemplates": ["User", "Machine", "WebServer"]}))
+
+    with open(path, "wb") as f:
+        pickle.dump(entries, f)
+    return len(entries)
+
+
+def open_standin(directory_file):
+    """
+    Annuaire LDAP de substitution : ldap3 en stratégie MOCK_SYNC chargé avec l'annuaire synthétique.
+    Retourne (connexion liée, durée de chargement) : le chargement est un coût "serveur", exclu des mesures.
+    """
+    from ldap3 import Server, Connection, MOCK_SYNC
+    started = time.perf_counter()
+    with open(directory_file, "rb") as f:
+        entries = pickle.load(f)
+    conn = Connection(Server("bench-dc"), user=ADMIN_DN, password=ADMIN_PASSWORD, client_strategy=MOCK_SYNC)
+    for dn, attrs in entries:
+        conn.strategy.add_entry(dn, attrs)
+    load_time = time.perf_counter() - started
+    conn.bind()
+    return conn, load_time
+
+
+def ldeep_like_worker(dump, directory_file, out_dir):
+    """
+    Un process = un dump, comme un appel ldeep : interpréteur + imports + bind + recherche de TOUS
+    les attributs (ldeep -v) + écriture. Les filtres bit à bit (userAccountControl:1.2.840.113556.1.4.803:=)
+    ne sont pas supportés par le mock : ils sont appliqués côté client, ce qui avantage légèrement ce chemin.
+    """
+    conn, load_time = open_standin(directory_file)
+    base = BASE_DN
+    config = f"CN=Configuration,{BASE_DN}"
+    if dump == "trusts":
+        entries = LdapCollector.paged_search(conn, base, "(objectClass=trustedDomain)", ["*"])
+    elif dump == "pkis":
+        entries = LdapCollector.paged_search(
+            conn, f"CN=Enrollment Services,CN=Public Key Services,CN=Services,{config}",
+            "(objectClass=pKIEnrollmentService)", ["*"])
+    elif dump == "machines_ip":
+        entries = LdapCollector.paged_search(conn, base, "(objectClass=computer)", ["*"])
+    else:
+        entries = LdapCollector.paged_search(conn, base, "(objectClass=user)", ["*"])
+
+    items = []
+    for dn, raw in entries:
+        uac = int(raw.get("userAccountControl", [b"0"])[0] or 0)
+        computer = b"computer" in raw.get("objectClass", [])
+        if dump == "users" and (computer or uac & (LdapCollector.UAC_DISABLED | LdapCollector.UAC_TRUST_ACCOUNTS)):
+            continue
+        if dump == "delegations" and not (uac & LdapCollector.UAC_DELEGATION or raw.get("msDS-AllowedToDelegateTo")):
+            continue
+        raw.pop("userPassword", None)
+        items.append(LdapCollector.format_entry(dn, raw))
+    with open(Path(out_dir) / DUMP_FILES[dump], "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=4, ensure_ascii=False)
+    print(f"load={load_time}")
+
+
+def run_ldeep_like(directory_file, out_dir, parallel):
+    """Lance les cinq dumps en process séparés. Retourne (durée murale, durée hors chargement du mock)."""
+    cmds = [[sys.executable, __file__, "--worker", dump, "--directory", str(directory_file), "--out", str(out_dir)]
+            for dump in DUMPS]
+    started = time.perf_counter()
+    if parallel:
+        procs = [subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) for cmd in cmds]
+        outputs = [p.communicate()[0] for p in procs]
+        wall = time.perf_counter() - started
+        # En parallèle, on retire le plus long chargement (ils se recouvrent)
+        loads = [float(o.strip().split("load=")[-1]) for o in outputs]
+        return wall, wall - max(loads)
+    load_total = 0.0
+    for cmd in cmds:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        load_total += float(output.strip().split("load=")[-1])
+    wall = time.perf_counter() - started
+    return wall, wall - load_total
+
+
+def run_native(directory_file, out_dir):
+    conn, _ = open_standin(directory_file)
+    started = time.perf_counter()
+    LdapCollector(out_dir).collect_from_connection(conn, DOMAIN, resolve=False)
+    return time.perf_counter() - started
+
+
+def compare_outputs(ldeep_dir, native_dir):
+    ok = True
+    for dump, filename in DUMP_FILES.items():
+        a = json.loads((Path(ldeep_dir) / filename).read_text(encoding="utf-8"))
+        b = json.loads((Path(native_dir) / filename).read_text(encoding="utf-8"))
+        same = sorted(e["dn"] for e in a) == sorted(e["dn"] for e in b)
+        ok = ok and same
+        print(f"  {filename:<18} ldeep-like {len(a):>7}   natif {len(b):>7}   {'OK' if same else 'DIFFÉRENT'}")
+    return ok
+
+
+def run_live(args, workdir):
+    """Comparaison réelle : 5 process ldeep séquentiels (ancien comportement) vs collecte native, sur un vrai DC."""
+    ldeep_dir = workdir / "ldeep"
+    ldeep_dir.mkdir()
+    started = time.perf_counter()
+    for command in (["trusts"], ["pkis"], ["delegations"], ["users", "enabled"], ["computers", "--resolve"]):
+        outfile = ldeep_dir / {"trusts": "trusts.json", "pkis": "pkis.json", "delegations": "delegations.json",
+                               "users": "users.json", "computers": "machines-ip.json"}[command[0]]
+        subprocess.run(["ldeep", "--outfile", str(outfile), "ldap", "-s", f"ldap://{args.dc_ip}", "-d", args.domain,
+                        "-u", args.username, "-p", args.password, *command, "-v"], capture_output=True)
+    ldeep_time = time.perf_counter() - started
+
+    native_dir = workdir / "native"
+    started = time.perf_counter()
+    LdapCollector(native_dir).collect(args.dc_ip, args.domain, args.username, args.password)
+    native_time = time.perf_counter() - started
+
+    print(f"  ldeep (5 process)  {ldeep_time:8.2f} s")
+    print(f"  natif (1 bind)     {native_time:8.2f} s   (x{ldeep_time / native_time:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collecte LDAP : 5 process type ldeep vs collecteur natif ldap3")
+    parser.add_argument("-n", "--users", type=int, default=5000, help="Nombre d'utilisateurs synthétiques (défaut 5000)")
+    parser.add_argument("-c", "--computers", type=int, default=None, help="Nombre d'ordinateurs (défaut users/4)")
+    parser.add_argument("--keep", action="store_true", help="Conserver les fichiers générés")
+    # Mode réel (optionnel) : ldeep vs natif sur un vrai DC
+    parser.add_argument("--dc-ip", help="Comparer sur un vrai DC plutôt que sur l'annuaire synthétique")
+    parser.add_argument("-d", "--domain")
+    parser.add_argument("-u", "--username")
+    parser.add_argument("-p", "--password")
+    # Mode interne : un process "ldeep-like"
+    parser.add_argument("--worker", choices=DUMPS, help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        ldeep_like_worker(args.worker, args.directory, args.out)
+        return
+
+    if not LdapCollector.available():
+        print("[!] ldap3 n'est pas installé.")
+        sys.exit(1)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_ldap_"))
+    try:
+        if args.dc_ip:
+            if not shutil.which("ldeep") or not all([args.domain, args.username, args.password]):
+                print("[!] Mode réel : ldeep dans le PATH et -d/-u/-p requis.")
+                sys.exit(1)
+            run_live(args, workdir)
+            return
+
+        computers = args.computers if args.computers is not None else args.users // 4
+        directory_file = workdir / "directory.pickle"
+        count = generate_directory(directory_file, args.users, computers)
+        print(f"[*] Annuaire synthétique : {count} entrées ({args.users} utilisateurs, {computers} ordinateurs)")
+
+        ldeep_dir = workdir / "ldeep"
+        ldeep_dir.mkdir()
+        seq_wall, seq_net = run_ldeep_like(directory_file, ldeep_dir, parallel=False)
+        par_wall, par_net = run_ldeep_like(directory_file, ldeep_dir, parallel=True)
+        native_time = run_native(directory_file, workdir / "native")
+
+        print("\n  Temps hors chargement de l'annuaire simulé :")
+        print(f"  ldeep-like séquentiel (5 process) {seq_net:8.2f} s   (mural {seq_wall:.2f} s)")
+        print(f"  ldeep-like parallèle  (5 process) {par_net:8.2f} s   (mural {par_wall:.2f} s)")
+        print(f"  natif (1 bind, 3 recherches)      {native_time:8.2f} s   (x{seq_net / native_time:.1f} vs séquentiel)")
+        print()
+        same = compare_outputs(ldeep_dir, workdir / "native")
+        print(f"[{'+' if same else '!'}] Mêmes objets exportés : {same}")
+    finally:
+        if args.keep:
+            print(f"[*] Fichiers conservés dans {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
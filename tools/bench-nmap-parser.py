@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Accès aux modules du projet (parsers/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from parsers.nmap_json_builder import NmapJsonBuilder
+
+PORTS = [(80, "http", "Apache httpd", "2.4.41"), (443, "https", "nginx", "1.18.0"),
+         (445, "microsoft-ds", "", ""), (3389, "ms-wbt-server", "Microsoft Terminal Services", ""),
+         (22, "ssh", "OpenSSH", "8.2p1"), (1433, "ms-sql-s", "Microsoft SQL Server 2019", "15.00.2000")]
+
+
+def generate_xml(path, host_count, seed=1337):
+    """Génère un XML Nmap synthétique : ~1/3 d'hôtes down, le reste avec 1 à 4 ports (open/closed)."""
+    rnd = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun scanner="nmap" args="nmap -sV -sC" version="7.94">\n')
+        f.write('<scaninfo type="syn" protocol="tcp" numservices="6" services="22,80,443,445,1433,3389"/>\n')
+        for i in range(host_count):
+            ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+            if rnd.random() < 0.33:
+                f.write(f'<host><status state="down" reason="no-response"/><address addr="{ip}" addrtype="ipv4"/></host>\n')
+                continue
+            f.write(f'<host starttime="1" endtime="2"><status state="up" reason="syn-ack"/>'
+                    f'<address addr="{ip}" addrtype="ipv4"/>'
+                    f'<hostnames><hostname name="host{i}.corp.local" type="PTR"/></hostnames><ports>')
+            for port, name, product, version in rnd.sample(PORTS, rnd.randint(1, 4)):
+                state = "open" if rnd.random() < 0.8 else "closed"
+                f.write(f'<port protocol="tcp" portid="{port}"><state state="{state}" reason="syn-ack" reason_ttl="127"/>'
+                        f'<service name="{name}" product="{product}" version="{version}" method="probed" conf="10"/>'
+                        f'<script id="banner" output="{"A" * 200}"/></port>')
+            f.write('</ports></host>\n')
+        f.write('<runstats><finished time="2"/><hosts up="1" down="1" total="2"/></runstats>\n</nmaprun>\n')
+
+
+def build_json_libnmap(xml_file, json_file):
+    """Ancienne implémentation (chargement complet du rapport via libnmap), pour comparaison."""
+    from libnmap.parser import NmapParser
+    nmap_report = NmapParser.parse_fromfile(xml_file)
+    hosts_data = []
+    for host in nmap_report.hosts:
+        if not host.is_up():
+            continue
+        host_info = {"ip": host.address, "hostname": host.hostnames[0] if host.hostnames else None,
+                     "status": host.status, "ports": []}
+        for service in host.services:
+            if service.state != "open":
+                continue
+            host_info["ports"].append({
+                "port": service.port, "protocol": service.protocol, "state": service.state,
+                "service": service.service,
+                "product": getattr(service, 'service_dict', {}).get('product', ''),
+                "version": getattr(service, 'service_dict', {}).get('version', ''),
+                "extrainfo": getattr(service, 'service_dict', {}).get('extrainfo', ''),
+                "banner": service.banner
+            })
+        if host_info["ports"]:
+            hosts_data.append(host_info)
+    with open(json_file, 'w') as f:
+        json.dump(hosts_data, f, indent=4)
+
+
+def measure(label, func, xml_file, json_file):
+    """Deux passes : une chronométrée, une sous tracemalloc (qui fausse les temps) pour le pic mémoire."""
+    start = time.perf_counter()
+    func(xml_file, json_file)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(xml_file, json_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<12} {elapsed:8.2f} s   pic mémoire {peak / 1024 / 1024:8.1f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing XML Nmap : libnmap (DOM complet) vs iterparse (streaming)")
+    parser.add_argument("-n", "--hosts", type=int, default=65536, help="Nombre d'hôtes synthétiques (défaut 65536 = /16)")
+    parser.add_argument("--keep", action="store_true", help="Conserver les fichiers générés")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_nmap_"))
+    xml_file = workdir / "full_scan.xml"
+    print(f"[*] Génération de {args.hosts} hôtes dans {xml_file}...")
+    generate_xml(xml_file, args.hosts)
+    print(f"[+] XML : {xml_file.stat().st_size / 1024 / 1024:.1f} Mo")
+
+    stream_json = workdir / "stream.json"
+    measure("iterparse", lambda x, j: NmapJsonBuilder.build_json(str(x), str(j)), xml_file, stream_json)
+
+    try:
+        import libnmap  # noqa: F401
+    except ImportError:
+        print("  libnmap      non installé, comparaison ignorée.")
+    else:
+        libnmap_json = workdir / "libnmap.json"
+        measure("libnmap", build_json_libnmap, xml_file, libnmap_json)
+        same = json.loads(stream_json.read_text()) == json.loads(libnmap_json.read_text())
+        print(f"[{'+' if same else '!'}] Sorties JSON identiques : {same}")
+
+    if not args.keep:
+        for f in workdir.iterdir():
+            os.remove(f)
+        workdir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
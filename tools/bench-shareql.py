@@ -0,0 +1,83 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Accès aux modules du projet (parsers/..., config)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from parsers.shareql import ShareQLRules
+from config import SHARE_CRAWLER_RULES
+
+SHARES = ["Users", "Public", "Finance", "IT", "Deploy", "Backup", "C$", "ADMIN$", "IPC$", "SYSVOL", "NETLOGON", "print$"]
+DIRECTORIES = ["Documents", "Desktop", "AppData", "Scripts", "Projets", "Archives", "Windows", "Temp", "Program Files",
+               "ProgramData", "$Recycle.Bin", "Compta", "RH", "svc", "old", "Installers"]
+EXTENSIONS = [".txt", ".log", ".docx", ".xlsx", ".pdf", ".kdbx", ".config", ".xml", ".json", ".ini", ".ps1", ".bat",
+              ".exe", ".msi", ".jpg", ".png", ".mp4", ".lnk", ".tmp", ".cab", ""]
+
+
+def mixed_case(rnd, name):
+    """Casse variable, comme sur de vrais shares (Web.CONFIG, SYSVOL / sysvol...)."""
+    return rnd.choice((str, str.upper, str.lower, str.title, str.swapcase))(name)
+
+
+def generate_contexts(count, seed=1337):
+    """Contextes ShareQL synthétiques : ~1/3 de dossiers, 2/3 de fichiers, profondeurs 0 à 12, casse mélangée."""
+    rnd = random.Random(seed)
+    contexts = []
+    for i in range(count):
+        share = mixed_case(rnd, rnd.choice(SHARES))
+        parts = [mixed_case(rnd, rnd.choice(DIRECTORIES)) for _ in range(rnd.randint(0, 12))]
+        if parts and rnd.random() < 0.33:
+            contexts.append(ShareQLRules.directory_context(share, parts))
+        else:
+            name = mixed_case(rnd, f"file{i}{rnd.choice(EXTENSIONS)}")
+            contexts.append(ShareQLRules.file_context(share, parts, name, rnd.randint(0, 50 * 1024 * 1024)))
+    return contexts
+
+
+def decide_all(decide, contexts):
+    allowed = 0
+    for context in contexts:
+        if decide(context):
+            allowed += 1
+    return allowed
+
+
+def measure(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<24} {elapsed:8.2f} s   {count / elapsed / 1e6:8.2f} M décisions/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ShareQL : évaluation règle par règle vs règles compilées")
+    parser.add_argument("-n", "--contexts", type=int, default=200000, help="Nombre de contextes synthétiques (défaut 200000)")
+    parser.add_argument("-r", "--rules", nargs="+", help="Fichiers .shareql (défaut SHARE_CRAWLER_RULES)")
+    parser.add_argument("--source", action="store_true", help="Afficher le code Python généré")
+    args = parser.parse_args()
+
+    rules = ShareQLRules.load(args.rules or SHARE_CRAWLER_RULES)
+    print(f"[*] {sum(len(r) for r in rules.rules.values())} règles conditionnelles, génération de {args.contexts} contextes...")
+    contexts = generate_contexts(args.contexts)
+
+    for action in ShareQLRules.ACTIONS:
+        decide = rules.decider(action)
+        mismatches = sum(1 for c in contexts if decide(c) != rules.interpret(action, c))
+        if mismatches:
+            print(f"[!] {action} : {mismatches} décisions différentes de l'évaluation règle par règle")
+            sys.exit(1)
+
+        print(f"[+] {action} ({len(rules.rules[action])} règles, défaut {'ALLOW' if rules.defaults[action] else 'DENY'})")
+        measure("règle par règle", lambda: decide_all(lambda c: rules.interpret(action, c), contexts), len(contexts))
+        allowed = measure("compilé", lambda: decide_all(decide, contexts), len(contexts))
+        print(f"  → {allowed}/{len(contexts)} autorisés, décisions identiques")
+        if args.source:
+            print(rules.sources[action])
+
+
+if __name__ == "__main__":
+    main()
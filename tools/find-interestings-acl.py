@@ -1,11 +1,31 @@
 import subprocess
 import argparse
+import os
 import sys
 import re
 import shutil
 import shlex  # Pour afficher les commandes proprement
 import json   # Ajout pour l'export JSON
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Accès aux modules du projet (utils/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.ldap_snapshot import LdapSnapshotStore
+from scanners.ldap_collector import LdapCollector
+from parsers.dacl_parser import DaclParser
+from utils.sid_resolver import SidResolver
+from utils.adaptive_limiter import AimdLimiter, classify_error
+from config import OUTPUT_BASE_DIR
+
+try:
+    from ldap3.protocol.microsoft import security_descriptor_control
+except ImportError:  # ldap3 requis uniquement pour le mode bulk
+    security_descriptor_control = None
 
 # --- CONFIGURATION DES DROITS INTÉRESSANTS ---
 INTERESTING_MASKS = [
@@ -20,6 +40,15 @@ INTERESTING_MASKS = [
     "ControlAccess"
 ]
 
+# SD_FLAGS : DACL_SECURITY_INFORMATION uniquement (lisible sans droits sur la SACL ni l'owner)
+SD_FLAGS_DACL = 0x04
+BULK_ATTRIBUTES = ["nTSecurityDescriptor"]
+# Nombre d'objets (descripteurs) envoyés d'un coup à un worker du mode bulk
+ACL_CHUNK_SIZE = 500
+# Journal de reprise (--resume) : dossier par défaut et intervalle d'écriture (s)
+ACL_CHECKPOINT_DIR = OUTPUT_BASE_DIR / "acl"
+ACL_CHECKPOINT_INTERVAL = 5
+
 # Regex
 RE_ACE_BLOCK = re.compile(r"ACE\[\d+\] info(.*?)(?=ACE\[\d+\] info|Total ACEs|\Z)", re.DOTALL)
 RE_ACCESS_MASK = re.compile(r"Access mask\s*:\s*(.*)", re.IGNORECASE)
@@ -30,7 +59,12 @@ class AuthenticationError(Exception):
     """Levée quand une erreur d'authentification est détectée"""
     pass
 
-def check_tools():
+def check_tools(mode):
+    if mode == "bulk":
+        if not LdapCollector.available() or security_descriptor_control is None:
+            print("[!] Erreur: le mode bulk nécessite le module Python 'ldap3' (ou utilisez --mode dacledit).")
+            sys.exit(1)
+        return
     if not shutil.which("ldapsearch"):
         print("[!] Erreur: 'ldapsearch' n'est pas trouvé dans le PATH.")
         sys.exit(1)
@@ -65,20 +99,7 @@ def get_all_dns(dc_ip, user_upn, password, base_dn, verbose=False):
         print(f"[!] Erreur critique ldapsearch (Code {e.returncode})")
         err_msg = e.stderr
 
-        # Gestion des erreurs d'authentification Step 1
-        if "data 52e" in err_msg or "Invalid credentials" in err_msg:
-            print("\n[!!!] AUTH FAILED (LDAP): Identifiants invalides.")
-            print("      Le script s'arrête immédiatement.")
-            sys.exit(1)
-        elif "data 775" in err_msg:
-            print("\n[!!!] COMPTE VERROUILLÉ (Account Locked - data 775) [!!!]")
-            sys.exit(1)
-        elif "data 525" in err_msg:
-            print("\n[!] UTILISATEUR INTROUVABLE (User not found - data 525).")
-            sys.exit(1)
-        else:
-            print(f"Détails bruts: {err_msg}")
-            sys.exit(1)
+        abort_on_ldap_error(err_msg)
 
     dns = []
     for line in result.stdout.splitlines():
@@ -89,6 +110,65 @@ def get_all_dns(dc_ip, user_upn, password, base_dn, verbose=False):
     print(f"[+] {len(dns)} objets trouvés dans l'AD.")
     return dns
 
+def abort_on_ldap_error(err_msg):
+    """Gestion des erreurs d'authentification LDAP (Step 1) : arrêt immédiat dans tous les cas."""
+    if "data 52e" in err_msg or "Invalid credentials" in err_msg or "invalidCredentials" in err_msg:
+        print("\n[!!!] AUTH FAILED (LDAP): Identifiants invalides.")
+        print("      Le script s'arrête immédiatement.")
+    elif "data 775" in err_msg:
+        print("\n[!!!] COMPTE VERROUILLÉ (Account Locked - data 775) [!!!]")
+    elif "data 525" in err_msg:
+        print("\n[!] UTILISATEUR INTROUVABLE (User not found - data 525).")
+    else:
+        print(f"Détails bruts: {err_msg}")
+    sys.exit(1)
+
+def objects_store(args):
+    """Instantané des DN uniquement si le base DN est la racine du domaine (sinon liste partielle)."""
+    domain_root = ",".join(f"DC={part}" for part in args.domain.split("."))
+    return LdapSnapshotStore() if args.base_dn.replace(" ", "").lower() == domain_root.lower() else None
+
+def load_dns(args, user_upn):
+    """
+    DN de tous les objets : depuis l'instantané LDAP (scan/ldap_snapshots.sqlite3) si récent,
+    sinon via ldapsearch (puis mise en cache). Seul un base DN racine du domaine est mis en cache.
+    """
+    store = objects_store(args)
+    if store and args.refresh:
+        store.invalidate(args.domain, "objects")
+
+    if store:
+        dns = store.load_objects(args.domain)
+        if dns is not None:
+            print(f"[+] Instantané LDAP réutilisé ({LdapSnapshotStore.describe(store.info(args.domain, 'objects'))}).")
+            return dns
+
+    dns = get_all_dns(args.host, user_upn, args.password, args.base_dn, args.verbose)
+    if store:
+        store.save_objects(args.domain, dns, dc=args.host, source="find-interestings-acl")
+    return dns
+
+def is_interesting_ace(trustee, access_mask_str, filter_trustees=None):
+    """
+    Filtre texte du mode dacledit : trustee (-f, logique OR), INTERESTING_MASKS, Principal Self en lecture exclu.
+    Le mode bulk applique les mêmes règles sur les masques entiers (DaclParser.analyse_chunk).
+    """
+    if filter_trustees:
+        match_found = False
+        for f in filter_trustees:
+            if f.lower() in trustee.lower():
+                match_found = True
+                break
+        if not match_found:
+            return False
+
+    is_interesting = any(interest.lower() in access_mask_str.lower() for interest in INTERESTING_MASKS)
+
+    if "Principal Self" in trustee and "Read" in access_mask_str and "Write" not in access_mask_str:
+        return False
+
+    return is_interesting
+
 def parse_dacledit_output(output, target_dn, filter_trustees=None, verbose=False):
     findings = []
     ace_blocks = RE_ACE_BLOCK.findall(output)
@@ -103,21 +183,7 @@ def parse_dacledit_output(output, target_dn, filter_trustees=None, verbose=False
             raw_trustee = trustee_match.group(1).strip()
             trustee = raw_trustee.split('(')[0].strip()
 
-            if filter_trustees:
-                match_found = False
-                for f in filter_trustees:
-                    if f.lower() in trustee.lower():
-                        match_found = True
-                        break
-                if not match_found:
-                    continue
-
-            is_interesting = any(interest.lower() in access_mask_str.lower() for interest in INTERESTING_MASKS)
-
-            if "Principal Self" in trustee and "Read" in access_mask_str and "Write" not in access_mask_str:
-                 continue
-
-            if is_interesting:
+            if is_interesting_ace(trustee, access_mask_str, filter_trustees):
                 findings.append({
                     "dn": target_dn,
                     "trustee": trustee,
@@ -128,6 +194,8 @@ def parse_dacledit_output(output, target_dn, filter_trustees=None, verbose=False
 def check_single_dn(dn, impacket_creds_string, filter_trustees=None, verbose=False):
     """
     Utilise dacledit. Si auth fail, lève une exception pour arrêter le main thread.
+    Retourne (findings, issue) ; findings vaut None si le DN n'a pas pu être lu (il sera
+    retenté par --resume) et l'issue ("ok", "timeout", "busy", "error") alimente AimdLimiter.
     """
     cmd = ["dacledit.py", impacket_creds_string, "-target-dn", dn, "-action", "read"]
 
@@ -151,74 +219,341 @@ def check_single_dn(dn, impacket_creds_string, filter_trustees=None, verbose=Fal
                 safe_cmd = f"dacledit.py {safe_creds} -target-dn \"{dn}\" -action read"
                 print(f"\n[DEBUG] Échec commande: {safe_cmd}")
                 print(f"        Erreur: {err_msg}")
-            return []
+            return None, classify_error(err_msg)
 
-        return parse_dacledit_output(result.stdout, dn, filter_trustees, verbose)
+        return parse_dacledit_output(result.stdout, dn, filter_trustees, verbose), "ok"
 
     except AuthenticationError:
         # On relance l'exception pour qu'elle remonte au thread principal
         raise
     except subprocess.TimeoutExpired:
         if verbose: print(f"\n[DEBUG] Timeout sur {dn}")
-        return []
+        return None, "timeout"
     except Exception:
-        return []
+        return None, "error"
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-H", "--host", required=True, help="IP du DC (ex: 10.3.10.11)")
-    parser.add_argument("-d", "--domain", required=True, help="Domaine FQDN (ex: north.sevenkingdoms.local)")
-    parser.add_argument("-u", "--username", required=True, help="Utilisateur SIMPLE (ex: arya.stark)")
-    parser.add_argument("-p", "--password", required=True, help="Mot de passe")
-    parser.add_argument("-b", "--base-dn", required=True, help="Base DN (ex: DC=north,DC=sevenkingdoms,DC=local)")
-    parser.add_argument("-t", "--threads", type=int, default=10)
-    parser.add_argument("-v", "--verbose", action="store_true", help="Mode debug (affiche les commandes)")
-    parser.add_argument("-f", "--filter", action="append", help="Filtrer par Trustee (ex: -f 'Domain Admins'). Logique OR.")
-    parser.add_argument("--json", help="Fichier de sortie pour les résultats au format JSON (ex: output.json)")
+def print_progress(completed, total, started):
+    elapsed = time.monotonic() - started
+    rate = completed / elapsed if elapsed else 0
+    total_str = f"/{total}" if total else ""
+    sys.stdout.write(f"\r[*] Progression : {completed}{total_str} objets ({rate:.0f} objets/s)")
+    sys.stdout.flush()
 
-    args = parser.parse_args()
+def print_finding(vul):
+    print(f"\n[+] INTERESSANT: {vul['dn']}")
+    print(f"    Trustee : {vul['trustee']}")
+    print(f"    Rights  : {vul['rights']}")
+
+class AclCheckpoint:
+    """
+    Journal JSON Lines du scan (append-only) : une ligne d'en-tête (mode, base DN, filtres) puis
+    une ligne par objet traité {"dn", "findings"}. Les lignes sont écrites par paquets toutes les
+    ACL_CHECKPOINT_INTERVAL secondes et à la fermeture : le fichier est exploitable pendant le scan
+    et --resume repart de là après un Ctrl+C ou un arrêt pour verrouillage.
+    Findings : {"trustee_sid", "rights"} en mode bulk (noms résolus à la fin), {"trustee", "rights"} sinon.
+    """
+
+    def __init__(self, path, header, resume=False):
+        self.path = Path(path)
+        self.done = set()
+        self.findings = []   # [(dn, finding), ...] repris du journal
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            complete = self._load(header)
+            self.file = open(self.path, "a", encoding="utf-8")
+            if not complete:
+                self.file.write("\n")   # ne pas coller le prochain objet à une ligne tronquée
+        else:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.file.write(json.dumps({"checkpoint": header, "started": datetime.now().isoformat()}) + "\n")
+            self.file.flush()
+
+    def _load(self, header):
+        """Relit le journal ; retourne False si sa dernière ligne est tronquée (pas de fin de ligne)."""
+        complete = True
+        with open(self.path, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                complete = line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # dernière ligne tronquée par un arrêt brutal
+                if i == 0:
+                    if record.get("checkpoint") != header:
+                        print(f"[!] {self.path} a été produit avec d'autres paramètres (mode, base DN ou filtres) :")
+                        print(f"    {record.get('checkpoint')}")
+                        print("    Relancez sans --resume ou avec --checkpoint vers un autre fichier.")
+                        sys.exit(1)
+                    continue
+                self.done.add(record["dn"])
+                self.findings.extend((record["dn"], finding) for finding in record["findings"])
+        print(f"[+] Reprise : {len(self.done)} objets déjà traités, {len(self.findings)} ACL reprises de {self.path}")
+        return complete
+
+    def record(self, dn, findings):
+        self.buffer.append(json.dumps({"dn": dn, "findings": findings}, ensure_ascii=False) + "\n")
+        if time.monotonic() - self.last_flush >= ACL_CHECKPOINT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.file.flush()
+            self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class DaclAnalyser:
+    """
+    Analyse des descripteurs du mode bulk, par chunks de ACL_CHUNK_SIZE objets :
+    ProcessPoolExecutor si workers > 1 (au plus 2 chunks en vol par worker pour borner
+    la mémoire pendant la lecture LDAP), sinon dans le process courant.
+    on_chunk(dns, findings) est appelé à la fin de chaque chunk (journal de reprise).
+    Les droits intéressants sont compilés une fois en masques entiers (DaclParser.compile_rights).
+    """
+
+    def __init__(self, workers, trustees=None, on_chunk=None):
+        self.bits, self.composites = DaclParser.compile_rights(INTERESTING_MASKS)
+        self.trustees = trustees
+        self.on_chunk = on_chunk
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.max_pending = workers * 2
+        self.pending = {}   # future -> DN du chunk
+        self.chunk = []
+        self.candidates = []
+        self.ace_count = 0
+
+    def add(self, dn, sd):
+        self.chunk.append((dn, sd))
+        if len(self.chunk) >= ACL_CHUNK_SIZE:
+            self._submit()
+
+    def _submit(self):
+        chunk, self.chunk = self.chunk, []
+        if not chunk:
+            return
+        dns = [dn for dn, _sd in chunk]
+        if self.pool is None:
+            self._collect(dns, DaclParser.analyse_chunk(chunk, self.bits, self.composites, self.trustees))
+            return
+        future = self.pool.submit(DaclParser.analyse_chunk, chunk, self.bits, self.composites, self.trustees)
+        self.pending[future] = dns
+        if len(self.pending) >= self.max_pending:
+            done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._collect(self.pending.pop(future), future.result())
+
+    def _collect(self, dns, result):
+        ace_count, findings = result
+        self.ace_count += ace_count
+        self.candidates.extend(findings)
+        if self.on_chunk is not None:
+            self.on_chunk(dns, findings)
+
+    def finish(self):
+        """Dernier chunk, attente des workers ; retourne [(dn, SID du trustee, droits), ...]."""
+        self._submit()
+        for future, dns in self.pending.items():
+            self._collect(dns, future.result())
+        self.pending = {}
+        if self.pool is not None:
+            self.pool.shutdown()
+        return self.candidates
+
+    def abort(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+def summarize_by_trustee(findings):
+    """
+    Agrège les findings par trustee : nombre d'ACE, nombre d'objets distincts et répartition
+    des droits. Trié par nombre d'objets puis d'ACE (les trustees les plus puissants en tête).
+    """
+    by_trustee = {}
+    for vul in findings:
+        entry = by_trustee.setdefault(vul["trustee"], {"aces": 0, "objects": set(), "rights": Counter()})
+        entry["aces"] += 1
+        entry["objects"].add(vul["dn"])
+        entry["rights"].update(vul["rights"].split(", "))
+
+    summary = [
+        {
+            "trustee": trustee,
+            "objects": len(entry["objects"]),
+            "aces": entry["aces"],
+            "rights": dict(entry["rights"].most_common()),
+        }
+        for trustee, entry in by_trustee.items()
+    ]
+    summary.sort(key=lambda e: (-e["objects"], -e["aces"], e["trustee"].lower()))
+    return summary
+
+def print_summary(summary, top):
+    print(f"\n[*] Synthèse par trustee (top {min(top, len(summary))} / {len(summary)}) :")
+    print(f"    {'#':>3}  {'Objets':>7}  {'ACE':>7}  {'Trustee':<35} Droits")
+    for rank, entry in enumerate(summary[:top], 1):
+        rights = ", ".join(f"{right} ({count})" for right, count in list(entry["rights"].items())[:4])
+        print(f"    {rank:>3}  {entry['objects']:>7}  {entry['aces']:>7}  {entry['trustee']:<35} {rights}")
+
+def bulk_scan(args, checkpoint):
+    """
+    Mode bulk : un seul bind LDAP, nTSecurityDescriptor de tous les objets lus par recherches
+    paginées (contrôle SD_FLAGS, DACL seule) et DACL analysées en mémoire (DaclParser).
+    Les trustees sont résolus par SidResolver (SID bien connus + instantané disque ou une
+    recherche paginée (objectSid=*) sur tout le domaine) ; le filtre -f devient un ensemble de SID
+    appliqué directement par les workers.
+    Le décodage des DACL est réparti sur --workers process (DaclAnalyser) pendant la lecture.
+    Les objets déjà présents dans le journal de reprise sont lus mais pas réanalysés.
+    Retourne (findings, nombre d'objets analysés).
+    """
+    try:
+        conn = LdapCollector.connect(args.host, args.domain, args.username, args.password)
+    except RuntimeError as e:
+        print("[!] Erreur critique bind LDAP")
+        abort_on_ldap_error(str(e))
+    except Exception as e:
+        print(f"[!] Connexion LDAP impossible vers {args.host} : {e}")
+        sys.exit(1)
+
+    resolver = SidResolver(args.domain)
+    try:
+        source = resolver.load(conn, dc=args.host, refresh=args.refresh)
+    except Exception as e:
+        print(f"[!] Erreur pendant la résolution des SID : {e}")
+        conn.unbind()
+        sys.exit(1)
+    print(f"[+] Cache SID -> principal : {len(resolver.principals)} entrées, source {source}.")
+
+    trustees = None
+    if args.filter:
+        trustees = resolver.match(args.filter)
+        print(f"[*] Filtre trustee : {len(trustees)} principal(aux) retenu(s).")
+        if not trustees:
+            print("[!] Aucun principal ne correspond au filtre -f.")
+            conn.unbind()
+            return [], 0
+
+    print(f"[*] Lecture des nTSecurityDescriptor (recherche paginée sur {args.base_dn})...")
+
+    def on_chunk(dns, findings):
+        by_dn = {}
+        for dn, trustee_sid, rights in findings:
+            by_dn.setdefault(dn, []).append({"trustee_sid": trustee_sid, "rights": rights})
+        for dn in dns:
+            checkpoint.record(dn, by_dn.get(dn, []))
+
+    analyser = DaclAnalyser(args.workers, trustees, on_chunk)
+    dns = []
+    without_sd = 0
+    started = time.monotonic()
+
+    try:
+        entries = LdapCollector.paged_search(
+            conn, args.base_dn, "(objectClass=*)", BULK_ATTRIBUTES,
+            controls=security_descriptor_control(sdflags=SD_FLAGS_DACL),
+        )
+        for dn, attrs in entries:
+            dns.append(dn)
+            sd = attrs.get("nTSecurityDescriptor")
+            if not sd:
+                without_sd += 1
+            elif dn not in checkpoint.done:
+                analyser.add(dn, sd[0])
+
+            if len(dns) % 1000 == 0:
+                print_progress(len(dns), None, started)
+        candidates = analyser.finish()
+    except KeyboardInterrupt:
+        print("\n[!] Interruption utilisateur (Ctrl+C). Arrêt...")
+        analyser.abort()
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n[!] Erreur pendant la recherche LDAP : {e}")
+        analyser.abort()
+        sys.exit(1)
+    finally:
+        conn.unbind()
+
+    print(f"\n[*] {analyser.ace_count} ACE analysées ({args.workers} worker(s)).")
+
+    if without_sd:
+        print(f"\n[!] {without_sd} objets sans nTSecurityDescriptor lisible (droits insuffisants).")
+
+    # Les DN lus alimentent aussi l'instantané partagé (utile au mode dacledit)
+    store = objects_store(args)
+    if store:
+        store.save_objects(args.domain, dns, dc=args.host, source="find-interestings-acl")
 
-    check_tools()
+    resumed = [(dn, f["trustee_sid"], f["rights"]) for dn, f in checkpoint.findings]
 
+    findings = []
+    for dn, trustee_sid, rights in resumed + candidates:
+        vul = {"dn": dn, "trustee": resolver.name(trustee_sid), "rights": rights}
+        if not args.summary_only:
+            print_finding(vul)
+        findings.append(vul)
+
+    return findings, len(dns)
+
+def dacledit_scan(args, checkpoint):
+    """
+    Mode dacledit : un process dacledit.py par DN (lent, conservé pour comparaison / repli).
+    Les DN déjà présents dans le journal de reprise sont sautés ; un DN en échec n'y est pas inscrit.
+    Retourne (findings, nombre d'objets analysés).
+    """
     # Credentials Construction
     ldap_user_upn = f"{args.username}@{args.domain}"
     impacket_creds = f"{args.domain}/{args.username}:{args.password}"
 
-    print(f"[*] Configuration:")
-    print(f"    DC IP (LDAP)   : {args.host}")
-    print(f"    Auth ldapsearch: {ldap_user_upn}")
-    print(f"    Auth dacledit  : {impacket_creds.split(':')[0]}:*****")
-    print("-" * 50)
+    # Step 1: LDAP Search (Déjà sécurisé par sys.exit), ou instantané LDAP partagé s'il est récent
+    all_dns = [dn for dn in load_dns(args, ldap_user_upn) if dn not in checkpoint.done]
 
-    # Step 1: LDAP Search (Déjà sécurisé par sys.exit)
-    all_dns = get_all_dns(args.host, ldap_user_upn, args.password, args.base_dn, args.verbose)
+    limiter = AimdLimiter(args.threads, min_limit=args.min_threads, adaptive=not args.no_adaptive)
+    if limiter.adaptive:
+        print(f"[*] Scan ACL en cours : concurrence adaptative de {limiter.limit} à {args.threads} threads...")
+    else:
+        print(f"[*] Scan ACL en cours avec {args.threads} threads...")
 
-    print(f"[*] Scan ACL en cours avec {args.threads} threads...")
+    results = [{"dn": dn, **finding} for dn, finding in checkpoint.findings]
 
-    results = []
+    def check(dn):
+        # Les threads du pool attendent leur tour : seuls `limiter.limit` dacledit.py tournent à la fois
+        with limiter.slot():
+            started = time.monotonic()
+            outcome = "auth"
+            try:
+                data, outcome = check_single_dn(dn, impacket_creds, args.filter, args.verbose)
+                return data
+            finally:
+                limiter.record(time.monotonic() - started, outcome)
 
     # Step 2: DACL Edit (Sécurisé via Exception et shutdown)
     with ThreadPoolExecutor(max_workers=args.threads) as executor:
-        future_to_dn = {
-            executor.submit(check_single_dn, dn, impacket_creds, args.filter, args.verbose): dn
-            for dn in all_dns
-        }
+        future_to_dn = {executor.submit(check, dn): dn for dn in all_dns}
 
         completed = 0
         try:
             for future in as_completed(future_to_dn):
                 completed += 1
-                if completed % 10 == 0:
-                    sys.stdout.write(f"\r[*] Progression : {completed}/{len(all_dns)}")
-                    sys.stdout.flush()
+                limiter.print_status(completed, len(all_dns))
 
                 try:
                     data = future.result()
+                    if data is not None:
+                        checkpoint.record(future_to_dn[future], [
+                            {"trustee": vul["trustee"], "rights": vul["rights"]} for vul in data
+                        ])
                     if data:
                         for vul in data:
-                            print(f"\n[+] INTERESSANT: {vul['dn']}")
-                            print(f"    Trustee : {vul['trustee']}")
-                            print(f"    Rights  : {vul['rights']}")
+                            if not args.summary_only:
+                                limiter.metrics.clear_line()
+                                print_finding(vul)
                             results.append(vul)
                 except AuthenticationError as e:
                     # C'est ICI qu'on catch l'erreur fatale venant d'un thread
@@ -238,7 +573,75 @@ def main():
             executor.shutdown(wait=False)
             sys.exit(0)
 
+    limiter.print_status(completed, len(all_dns), force=True)
+    if limiter.adaptive:
+        print(f"\n[*] Concurrence finale : {limiter.limit} threads ({limiter.backoffs} recul(s)).")
+
+    return results, len(all_dns)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", "--host", required=True, help="IP du DC (ex: 10.3.10.11)")
+    parser.add_argument("-d", "--domain", required=True, help="Domaine FQDN (ex: north.sevenkingdoms.local)")
+    parser.add_argument("-u", "--username", required=True, help="Utilisateur SIMPLE (ex: arya.stark)")
+    parser.add_argument("-p", "--password", required=True, help="Mot de passe")
+    parser.add_argument("-b", "--base-dn", required=True, help="Base DN (ex: DC=north,DC=sevenkingdoms,DC=local)")
+    parser.add_argument("-t", "--threads", type=int, default=10, help="Threads dacledit max (mode dacledit uniquement)")
+    parser.add_argument("--min-threads", type=int, default=1, help="Plancher de la concurrence adaptative (mode dacledit)")
+    parser.add_argument("--no-adaptive", action="store_true", help="Concurrence fixe à --threads (pas d'AIMD)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Process d'analyse des DACL (mode bulk uniquement, défaut : nombre de CPU)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Mode debug (affiche les commandes)")
+    parser.add_argument("-f", "--filter", action="append", help="Filtrer par Trustee, nom ou SID (ex: -f 'Domain Admins'). Logique OR.")
+    parser.add_argument("--json", help="Fichier de sortie pour les résultats au format JSON (ex: output.json)")
+    parser.add_argument("--refresh", action="store_true", help="Ignorer les instantanés LDAP en cache (DN, SID) et réinterroger le DC")
+    parser.add_argument("--checkpoint", help="Journal JSON Lines du scan (défaut : scan/acl/<domaine>_<mode>.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="Reprendre le scan depuis le journal : les objets déjà traités sont sautés")
+    parser.add_argument("--summary", help="Fichier JSON de la synthèse par trustee")
+    parser.add_argument("--summary-only", action="store_true", help="N'afficher que la synthèse par trustee (pas chaque ACE)")
+    parser.add_argument("--top", type=int, default=20, help="Nombre de trustees affichés dans la synthèse (défaut : 20)")
+    parser.add_argument("--mode", choices=["bulk", "dacledit"], default="bulk",
+                        help="bulk : nTSecurityDescriptor lus en LDAP paginé et analysés en mémoire (défaut) ; "
+                             "dacledit : un process dacledit.py par objet")
+
+    args = parser.parse_args()
+
+    check_tools(args.mode)
+
+    print(f"[*] Configuration:")
+    print(f"    DC IP (LDAP)   : {args.host}")
+    print(f"    Mode           : {args.mode}")
+    if args.mode == "bulk":
+        print(f"    Auth LDAP      : {args.domain}\\{args.username}:*****")
+    else:
+        print(f"    Auth ldapsearch: {args.username}@{args.domain}")
+        print(f"    Auth dacledit  : {args.domain}/{args.username}:*****")
+    print("-" * 50)
+
+    checkpoint = AclCheckpoint(
+        args.checkpoint or ACL_CHECKPOINT_DIR / f"{args.domain.lower()}_{args.mode}.jsonl",
+        {"mode": args.mode, "domain": args.domain.lower(), "base_dn": args.base_dn, "filter": sorted(args.filter or [])},
+        resume=args.resume,
+    )
+    print(f"[*] Journal de reprise : {checkpoint.path}")
+
+    started = time.monotonic()
+    try:
+        if args.mode == "bulk":
+            results, scanned = bulk_scan(args, checkpoint)
+        else:
+            results, scanned = dacledit_scan(args, checkpoint)
+    finally:
+        # Ctrl+C, verrouillage, erreur LDAP : le journal reste complet jusqu'au dernier objet traité
+        checkpoint.close()
+    elapsed = time.monotonic() - started
+
     print(f"\n\n[*] Analyse terminée. {len(results)} ACLs intéressantes trouvées.")
+    print(f"[*] {scanned} objets analysés en {elapsed:.1f}s ({scanned / elapsed if elapsed else 0:.0f} objets/s).")
+
+    summary = summarize_by_trustee(results)
+    if summary:
+        print_summary(summary, args.top)
 
     if args.json:
         try:
@@ -248,5 +651,13 @@ def main():
         except IOError as e:
             print(f"[!] Erreur lors de l'écriture du fichier JSON : {e}")
 
+    if args.summary:
+        try:
+            with open(args.summary, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=4, ensure_ascii=False)
+            print(f"[+] Synthèse par trustee exportée dans : {args.summary}")
+        except IOError as e:
+            print(f"[!] Erreur lors de l'écriture de la synthèse : {e}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
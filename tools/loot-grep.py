@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Accès aux modules du projet (utils/..., parsers/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.loot_store import LootStore
+from parsers.credential_matcher import CredentialMatcher
+
+
+def walk(root):
+    """(chemin relatif style Windows, chemin local, taille, mtime) de chaque fichier sous root."""
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            local = Path(dirpath) / name
+            try:
+                st = local.stat()
+            except OSError:
+                continue
+            yield str(local.relative_to(root)).replace("/", "\\"), local, st.st_size, st.st_mtime
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grep credentials of a local loot directory through the loot cache (unchanged files are skipped)"
+    )
+    parser.add_argument("directory", help="Loot directory (ManSpider loot, mounted share copy...)")
+    parser.add_argument("--host", default="local", help="Host label stored in the cache (default: local)")
+    parser.add_argument("--share", help="Share label stored in the cache (default: directory name)")
+    parser.add_argument("--min-score", type=int, default=5, help="Only report files scoring at least this (default 5)")
+    parser.add_argument("--top", type=int, default=20, help="Number of files to print (default 20)")
+    args = parser.parse_args()
+
+    root = Path(args.directory).resolve()
+    if not root.is_dir():
+        print(f"[!] Dossier introuvable : {root}")
+        sys.exit(1)
+    share = args.share or root.name
+
+    store = LootStore()
+    matcher = CredentialMatcher()
+    known = store.known(args.host, share)
+    counters = {"unchanged": 0, "new": 0, "duplicate": 0, "grep_cached": 0}
+    results = []
+    seen = set()
+    unchanged = []
+    started = time.monotonic()
+
+    for path, local, size, mtime in walk(root):
+        seen.add(path)
+        sha256 = LootStore.unchanged(known, path, size, mtime)
+        if sha256 is not None and store.has_blob(sha256):
+            counters["unchanged"] += 1
+            unchanged.append(path)
+        else:
+            sha256, is_new = store.put_file(args.host, share, path, size, mtime, local)
+            counters["new" if is_new else "duplicate"] += 1
+
+        result, cached = store.grep(sha256, matcher)
+        counters["grep_cached"] += cached
+        if result["score"] >= args.min_score:
+            results.append((result["score"], path, result))
+
+    store.touch(args.host, share, unchanged)
+    removed = [path for path in known if path not in seen]
+    if removed:
+        store.forget(args.host, share, removed)
+    elapsed = time.monotonic() - started
+
+    print(f"[+] {len(seen)} fichiers en {elapsed:.1f}s : {counters['unchanged']} inchangés, "
+          f"{counters['new']} nouveaux contenus, {counters['duplicate']} doublons, {len(removed)} disparus ; "
+          f"grep en cache pour {counters['grep_cached']}.")
+    results.sort(key=lambda r: (-r[0], r[1]))
+    for score, path, result in results[:args.top]:
+        keywords = ", ".join(m["keyword"] for m in result["matches"][:5])
+        print(f"  {score:6d}  {path}  [{keywords}]")
+        for snippet in result["code_snippets"][:3]:
+            print(f"          {snippet}")
+    stats = store.stats()
+    print(f"[*] Cache : {stats['files']} fichiers indexés ({stats['hosts']} hôtes), {stats['blobs']} contenus uniques, "
+          f"{stats['blob_bytes'] / 1024 / 1024:.1f} Mo.")
+
+
+if __name__ == "__main__":
+    main()
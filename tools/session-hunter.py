@@ -1,13 +1,32 @@
 import argparse
+import json
 import sys
 import logging
-import socket
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
 
 from ldap3 import Server, Connection, ALL, SASL, KERBEROS, NTLM
 from impacket.dcerpc.v5 import transport, rrp
 from impacket.dcerpc.v5.dtypes import NULL
 
+# Accès aux modules du projet (utils/...)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.ldap_snapshot import LdapSnapshotStore
+from utils.adaptive_limiter import AimdLimiter, classify_error
+from utils.session_store import SessionStore
+from utils.tcp_probe import probe
+from config import (
+    SESSION_PROBE_CONCURRENCY,
+    SESSION_PROBE_TIMEOUT,
+    SESSION_RPC_TIMEOUT,
+    SESSION_WATCH_INTERVAL,
+    SESSION_WATCH_HOT_INTERVAL,
+    SESSION_WATCH_HOT_TTL,
+)
+
 # Configuration des logs
 logging.basicConfig(format='%(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +50,12 @@ class SessionHunter:
         self.admin_users = set()
         self.computers = []
 
+        # Concurrence adaptative (AIMD) + métriques live, partagées par les threads
+        self.limiter = AimdLimiter(args.threads, min_limit=args.min_threads, adaptive=not args.no_adaptive)
+
+        # Sessions persistées et indexées (scan/sessions/<domaine>/), lues aussi par le WebServer
+        self.store = SessionStore(self.domain)
+
     def get_ldap_connection(self):
         """Établit la connexion LDAP pour récupérer infos users et computers"""
         server = Server(self.dc_ip, get_info=ALL)
@@ -47,45 +72,83 @@ class SessionHunter:
         return conn
 
     def enumerate_ldap(self):
-        """Récupère Computers et mappage SID Utilisateurs"""
-        conn = self.get_ldap_connection()
-        search_base = self.get_search_base(conn)
-
-        logger.info(f"[*] Énumération LDAP sur {self.domain}...")
-
-        # 1. Récupérer les utilisateurs pour mapper SID -> Nom et vérifier adminCount
-        # On prend tout pour avoir la résolution de nom, c'est rapide en Python
-        conn.search(search_base, '(objectClass=user)', attributes=['sAMAccountName', 'objectSid', 'adminCount'])
-
-        for entry in conn.entries:
-            try:
-                sid = str(entry.objectSid)
-                name = str(entry.sAMAccountName)
-                self.sid_map[sid] = name
+        """
+        Récupère Computers et mappage SID Utilisateurs.
+        Les comptes viennent de l'instantané LDAP partagé (scan/ldap_snapshots.sqlite3) s'il est récent,
+        sinon d'un parcours LDAP paginé qui alimente l'instantané pour les prochains runs.
+        """
+        # Un base DN explicite ne couvre pas forcément tout le domaine : pas d'instantané
+        store = None if self.args.base_dn else LdapSnapshotStore()
+        if store and self.args.refresh:
+            store.invalidate(self.domain, "accounts")
+
+        accounts = store.load_accounts(self.domain) if store else None
+        if accounts is not None:
+            logger.info(f"[+] Instantané LDAP réutilisé ({LdapSnapshotStore.describe(store.info(self.domain, 'accounts'))}).")
+        else:
+            accounts = self.fetch_accounts()
+            if store:
+                store.save_accounts(self.domain, accounts, dc=self.dc_ip, source="session-hunter")
 
-                if str(entry.adminCount) == '1':
-                    self.admin_users.add(name)
-            except:
+        # 1. Mapper SID -> Nom et vérifier adminCount
+        for account in accounts:
+            if not account["sid"] or not account["sam"]:
                 continue
+            self.sid_map[account["sid"]] = account["sam"]
+            if account["admin_count"] == 1:
+                self.admin_users.add(account["sam"])
 
         logger.info(f"[+] {len(self.sid_map)} utilisateurs mis en cache pour résolution SID.")
         logger.info(f"[+] {len(self.admin_users)} utilisateurs identifiés comme High Value (adminCount=1).")
 
-        # 2. Récupérer les ordinateurs cibles
-        ldap_filter = '(objectClass=computer)'
-        if self.args.servers_only:
-            ldap_filter = '(&(objectClass=computer)(operatingSystem=*Server*))'
-        elif self.args.workstations_only:
-            ldap_filter = '(&(objectClass=computer)(!(operatingSystem=*Server*)))'
+        # 2. Ordinateurs cibles (filtre serveurs / postes appliqué sur operatingSystem)
+        for account in accounts:
+            if not account["is_computer"] or not account["dns_hostname"]:
+                continue
+            is_server = "server" in (account["os"] or "").lower()
+            if self.args.servers_only and not is_server:
+                continue
+            if self.args.workstations_only and is_server:
+                continue
+            self.computers.append(account["dns_hostname"])
 
-        conn.search(search_base, ldap_filter, attributes=['dNSHostName'])
+        logger.info(f"[+] {len(self.computers)} ordinateurs cibles trouvés via LDAP.")
 
-        for entry in conn.entries:
-            if entry.dNSHostName:
-                self.computers.append(str(entry.dNSHostName))
+    def fetch_accounts(self):
+        """Parcours LDAP paginé de (objectClass=user) : utilisateurs ET ordinateurs en une seule recherche."""
+        conn = self.get_ldap_connection()
+        search_base = self.get_search_base(conn)
+
+        logger.info(f"[*] Énumération LDAP sur {self.domain}...")
+
+        accounts = []
+        entries = conn.extend.standard.paged_search(
+            search_base, '(objectClass=user)',
+            attributes=['objectClass', 'sAMAccountName', 'objectSid', 'adminCount',
+                        'userAccountControl', 'dNSHostName', 'operatingSystem'],
+            paged_size=1000,
+            generator=True,
+        )
+        for entry in entries:
+            if entry.get('type') != 'searchResEntry':
+                continue
+            attrs = entry['attributes']
+            try:
+                accounts.append({
+                    'dn': entry['dn'],
+                    'is_computer': 'computer' in [c.lower() for c in attrs.get('objectClass') or []],
+                    'sam': str(attrs.get('sAMAccountName') or '') or None,
+                    'sid': str(attrs.get('objectSid') or '') or None,
+                    'admin_count': int(attrs.get('adminCount') or 0),
+                    'uac': int(attrs.get('userAccountControl') or 0),
+                    'dns_hostname': str(attrs.get('dNSHostName') or '') or None,
+                    'os': str(attrs.get('operatingSystem') or '') or None,
+                })
+            except (TypeError, ValueError):
+                continue
 
-        logger.info(f"[+] {len(self.computers)} ordinateurs cibles trouvés via LDAP.")
         conn.unbind()
+        return accounts
 
     def get_search_base(self, conn):
         if self.args.base_dn:
@@ -96,6 +159,7 @@ class SessionHunter:
         """
         Connect to Remote Registry (HKEY_USERS) to find active sessions.
         Equivalent to the PowerShell script's main non-admin method.
+        Les erreurs remontent à worker(), qui les classe pour la concurrence adaptative.
         """
         active_sessions = []
 
@@ -107,10 +171,11 @@ class SessionHunter:
 
         if hasattr(rpctransport, 'set_credentials'):
             rpctransport.set_credentials(self.username, self.password, self.domain, self.lmhash, self.nthash)
+        rpctransport.set_connect_timeout(SESSION_RPC_TIMEOUT)
 
+        dce = rpctransport.get_dce_rpc()
+        dce.connect()
         try:
-            dce = rpctransport.get_dce_rpc()
-            dce.connect()
             dce.bind(rrp.MSRPC_UUID_RRP)
 
             # Open HKEY_USERS
@@ -141,62 +206,222 @@ class SessionHunter:
                     break
 
             rrp.BaseRegCloseKey(dce, hKey)
+        finally:
             dce.disconnect()
 
-        except Exception as e:
-            # logger.debug(f"[-] Erreur sur {target}: {e}")
-            return None
-
         return active_sessions
 
+    # ------ Étape 2 : énumération winreg des hôtes joignables ------
     def worker(self, target):
-        # Scan de port rapide pour éviter d'attendre sur le RPC
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            result = sock.connect_ex((target, 445))
-            sock.close()
-            if result != 0:
-                return None
-        except:
-            return None
+        """Retourne (sessions ou None, durée de l'énumération winreg en s)."""
+        if self.limiter.abort_reason:
+            return None, 0.0
 
-        return self.check_registry_sessions(target)
+        with self.limiter.slot():
+            started = time.monotonic()
+            outcome = "ok"
+            try:
+                return self.check_registry_sessions(target), time.monotonic() - started
+            except Exception as e:
+                # Timeout, hôte saturé, échec d'authentification... : pilote la concurrence
+                outcome = classify_error(e)
+                return None, time.monotonic() - started
+            finally:
+                self.limiter.record(time.monotonic() - started, outcome)
 
     def run(self):
         self.enumerate_ldap()
 
-        logger.info(f"[*] Démarrage de la chasse aux sessions ({self.args.threads} threads)...")
-        print(f"{'HOST':<30} {'USER':<25} {'HIGH VALUE':<10}")
-        print("-" * 65)
+        # Étape 1 : seuls les hôtes qui répondent sur 445 passent à l'étape winreg
+        logger.info(f"[*] Étape 1 : pré-sonde TCP 445 de {len(self.computers)} hôtes ({self.args.probe_concurrency} connexions simultanées)...")
+        started = time.monotonic()
+        reachable = probe(self.computers, 445, self.args.probe_concurrency, SESSION_PROBE_TIMEOUT)
+        elapsed = time.monotonic() - started
+        logger.info(f"[+] {len(reachable)}/{len(self.computers)} hôtes joignables sur 445 en {elapsed:.1f}s "
+                    f"({len(self.computers) / elapsed if elapsed else 0:.0f} hôtes/s).")
+        if reachable.unresolved:
+            logger.warning(f"[!] {len(reachable.unresolved)} nom(s) non résolu(s) (DNS), ignorés : "
+                           f"{', '.join(reachable.unresolved[:10])}{' ...' if len(reachable.unresolved) > 10 else ''}")
+
+        # Étape 2
+        if self.limiter.adaptive:
+            logger.info(f"[*] Étape 2 : énumération winreg (concurrence adaptative de {self.limiter.limit} à {self.args.threads} threads)...")
+        else:
+            logger.info(f"[*] Étape 2 : énumération winreg ({self.args.threads} threads)...")
+        started = time.monotonic()
+        self.sweep(list(reachable), scope=self.computers)
+        elapsed = time.monotonic() - started
+        logger.info(f"[+] Étape 2 terminée en {elapsed:.1f}s.")
 
+    def poll(self, targets, on_result=None):
+        """
+        Étape 2 sur `targets` : {hôte: (sessions ou None, durée winreg)}.
+        on_result(hôte, sessions, durée, nombre d'hôtes traités) est appelé au fil de l'eau.
+        S'arrête (futures annulées) si le limiteur signale un risque de verrouillage.
+        """
+        results = {}
         with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-            future_to_target = {executor.submit(self.worker, target): target for target in self.computers}
+            future_to_target = {executor.submit(self.worker, target): target for target in targets}
 
             for future in as_completed(future_to_target):
                 target = future_to_target[future]
+                if self.limiter.abort_reason:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
                 try:
-                    sessions = future.result()
-                    if sessions:
-                        for session in sessions:
-                            # Logique de filtrage --hunt
-                            if self.args.hunt and self.args.hunt.lower() not in session['user'].lower():
-                                continue
-
-                            # Logique de filtrage --match (seulement high value)
-                            if self.args.match and not session['is_high_value']:
-                                continue
-
-                            hv_str = "[!]" if session['is_high_value'] else ""
-
-                            # Coloration simple si possible
-                            if session['is_high_value']:
-                                print(f"\033[91m{target:<30} {session['user']:<25} {hv_str:<10}\033[0m")
-                            else:
-                                print(f"{target:<30} {session['user']:<25} {hv_str:<10}")
+                    sessions, host_time = future.result()
+                except Exception:
+                    continue
+                results[target] = (sessions, host_time)
+                if on_result is not None:
+                    on_result(target, sessions, host_time, len(results))
+        return results
+
+    def keep_session(self, session):
+        # Logique de filtrage --hunt
+        if self.args.hunt and self.args.hunt.lower() not in session['user'].lower():
+            return False
+        # Logique de filtrage --match (seulement high value)
+        if self.args.match and not session['is_high_value']:
+            return False
+        return True
+
+    def sweep(self, targets, scope=()):
+        """
+        Énumère les sessions des hôtes joignables et affiche une ligne par session (avec la durée winreg de l'hôte),
+        ou un objet JSON par ligne avec --jsonl. Chaque hôte énuméré met à jour le SessionStore ;
+        les hôtes de `scope` (ou de `targets`) non énumérés y sont marqués périmés.
+        """
+        jsonl = self.args.jsonl
+        if not jsonl:
+            print(f"{'HOST':<30} {'USER':<25} {'HIGH VALUE':<10} {'TIME':>7}")
+            print("-" * 75)
+
+        def show(target, sessions, host_time, completed):
+            if sessions is not None:
+                self.store.update(target, sessions)
+            if not jsonl:
+                self.limiter.print_status(completed, len(targets))
+            for session in sessions or []:
+                if not self.keep_session(session):
+                    continue
+
+                if jsonl:
+                    print(json.dumps({"host": target, **session, "time": round(host_time, 2)}, ensure_ascii=False), flush=True)
+                    continue
+
+                hv_str = "[!]" if session['is_high_value'] else ""
+                time_str = f"{host_time:.2f}s"
+                self.limiter.metrics.clear_line()
+
+                # Coloration simple si possible
+                if session['is_high_value']:
+                    print(f"\033[91m{target:<30} {session['user']:<25} {hv_str:<10} {time_str:>7}\033[0m")
+                else:
+                    print(f"{target:<30} {session['user']:<25} {hv_str:<10} {time_str:>7}")
+
+        results = self.poll(targets, show)
+        confirmed = {host for host, (sessions, _) in results.items() if sessions is not None}
+        stale = self.store.mark_stale(set(scope or targets) - confirmed)
+        self.store.save()
+
+        if self.limiter.abort_reason:
+            logger.error(f"[!!!] Arrêt du scan : {self.limiter.abort_reason} (risque de verrouillage du compte).")
+        if not jsonl:
+            self.limiter.metrics.clear_line()
+            self.limiter.print_status(len(results), len(targets), force=True)
+            print()
+        logger.info(f"[+] Sessions enregistrées dans {self.store.path} ({len(self.store.hosts)} hôtes, "
+                    f"{len(self.store.high_value())} sessions high value, {stale} hôte(s) non confirmé(s) marqué(s) périmé(s)).")
+        hunted = self.store.where(self.args.hunt) if self.args.hunt else []
+        if hunted:
+            logger.info(f"[+] {self.args.hunt} connecté sur : {', '.join(h['host'] for h in hunted)}")
+        if self.limiter.adaptive:
+            logger.info(f"[*] Concurrence finale : {self.limiter.limit} threads ({self.limiter.backoffs} recul(s)).")
+
+    # ------ Mode --watch ------
+    def watch(self):
+        """
+        Surveillance continue : LDAP interrogé une seule fois (SID map et ordinateurs gardés en mémoire),
+        puis chaque hôte est resondé/réénuméré à son échéance : --interval s, ou --hot-interval s s'il
+        a porté une session high value depuis moins de SESSION_WATCH_HOT_TTL s.
+        Seuls les changements sont émis (JSON Lines) : "appear" / "disappear" par session, plus une
+        ligne "cycle" de statistiques. Un hôte injoignable ou en erreur garde son état (pas d'événement).
+        """
+        self.enumerate_ldap()
+        if not self.computers:
+            logger.error("[!] Aucun ordinateur à surveiller (OU vide ou filtre --servers-only / --workstations-only).")
+            return
+        out = open(self.args.events, "a", encoding="utf-8") if self.args.events else sys.stdout
+        logger.info(f"[*] Mode watch : {len(self.computers)} hôtes, période {self.args.interval}s "
+                    f"({self.args.hot_interval}s pour les hôtes chauds). Ctrl+C pour arrêter.")
+
+        state = {}        # hôte -> {sid: session} connues
+        next_poll = {host: 0.0 for host in self.computers}
+        last_high_value = {}
+        cycle = 0
+
+        def emit(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
 
-                except Exception as exc:
-                    pass
+        try:
+            while not self.limiter.abort_reason:
+                now = time.monotonic()
+                due = [host for host, t in next_poll.items() if t <= now]
+                if not due:
+                    time.sleep(max(1.0, min(next_poll.values()) - now))
+                    continue
+
+                cycle += 1
+                started = time.monotonic()
+                reachable = probe(due, 445, self.args.probe_concurrency, SESSION_PROBE_TIMEOUT)
+                probe_time = time.monotonic() - started
+                results = self.poll(list(reachable))
+                sweep_time = time.monotonic() - started - probe_time
+
+                stamp = datetime.now().isoformat(timespec="seconds")
+                events = 0
+                for host, (sessions, host_time) in results.items():
+                    if sessions is None:
+                        continue
+                    current = {s['sid']: s for s in sessions if self.keep_session(s)}
+                    previous = state.get(host, {})
+                    for sid in current.keys() - previous.keys():
+                        emit({"ts": stamp, "event": "appear", "host": host, **current[sid], "cycle": cycle})
+                        events += 1
+                    for sid in previous.keys() - current.keys():
+                        emit({"ts": stamp, "event": "disappear", "host": host, **previous[sid], "cycle": cycle})
+                        events += 1
+                    state[host] = current
+                    self.store.update(host, sessions)
+                    if any(s['is_high_value'] for s in sessions):
+                        last_high_value[host] = time.monotonic()
+
+                # Injoignables / en erreur : pas d'événement, mais l'état stocké n'est plus présenté comme courant
+                self.store.mark_stale(set(due) - {h for h, (sessions, _) in results.items() if sessions is not None})
+                now = time.monotonic()
+                hot = {h for h, seen in last_high_value.items() if now - seen < SESSION_WATCH_HOT_TTL}
+                self.store.save()
+                for host in due:
+                    next_poll[host] = now + (self.args.hot_interval if host in hot else self.args.interval)
+
+                emit({
+                    "ts": stamp, "event": "cycle", "cycle": cycle,
+                    "hosts_due": len(due), "reachable": len(reachable), "unresolved": len(reachable.unresolved),
+                    "polled": sum(1 for sessions, _ in results.values() if sessions is not None),
+                    "events": events, "hot_hosts": len(hot),
+                    "sessions": sum(len(v) for v in state.values()),
+                    "probe_s": round(probe_time, 2), "sweep_s": round(sweep_time, 2),
+                    "duration_s": round(probe_time + sweep_time, 2),
+                })
+        except KeyboardInterrupt:
+            logger.info("\n[!] Arrêt du mode watch (Ctrl+C).")
+        finally:
+            if self.limiter.abort_reason:
+                logger.error(f"[!!!] Arrêt du mode watch : {self.limiter.abort_reason} (risque de verrouillage du compte).")
+            if out is not sys.stdout:
+                out.close()
 
 def main():
     parser = argparse.ArgumentParser(description="Python alternative to Invoke-SessionHunter using Impacket & LDAP")
@@ -217,8 +442,22 @@ def main():
     # Filtres de résultats
     parser.add_argument("--hunt", help="Show sessions only for this specific user")
     parser.add_argument("--match", action="store_true", help="Show only High Value targets (adminCount=1)")
-
-    parser.add_argument("-t", "--threads", type=int, default=20, help="Threads (default 20)")
+    parser.add_argument("--jsonl", action="store_true", help="Print one JSON object per session instead of the table")
+
+    parser.add_argument("-t", "--threads", type=int, default=20, help="Max threads for the winreg stage (default 20)")
+    parser.add_argument("--probe-concurrency", type=int, default=SESSION_PROBE_CONCURRENCY,
+                        help=f"Simultaneous TCP 445 probes in stage 1 (default {SESSION_PROBE_CONCURRENCY})")
+    parser.add_argument("--min-threads", type=int, default=1, help="Adaptive concurrency floor (default 1)")
+    parser.add_argument("--no-adaptive", action="store_true", help="Fixed concurrency at --threads (no AIMD)")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached LDAP snapshot and query the DC again")
+
+    # Mode surveillance continue
+    parser.add_argument("--watch", action="store_true", help="Keep polling hosts and emit session appear/disappear events (JSON Lines)")
+    parser.add_argument("--interval", type=int, default=SESSION_WATCH_INTERVAL,
+                        help=f"Watch: seconds between polls of a host (default {SESSION_WATCH_INTERVAL})")
+    parser.add_argument("--hot-interval", type=int, default=SESSION_WATCH_HOT_INTERVAL,
+                        help=f"Watch: seconds between polls of hosts with recent high value sessions (default {SESSION_WATCH_HOT_INTERVAL})")
+    parser.add_argument("--events", help="Watch: append events to this file instead of stdout")
 
     args = parser.parse_args()
 
@@ -227,7 +466,10 @@ def main():
         sys.exit(1)
 
     hunter = SessionHunter(args)
-    hunter.run()
+    if args.watch:
+        hunter.watch()
+    else:
+        hunter.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import (
+    ADAPTIVE_INITIAL,
+    ADAPTIVE_WINDOW,
+    ADAPTIVE_MAX_ERROR_RATE,
+    ADAPTIVE_LATENCY_FACTOR,
+    ADAPTIVE_BACKOFF,
+    ADAPTIVE_COOLDOWN,
+    ADAPTIVE_AUTH_ABORT,
+)
+
+# Issues d'une requête :
+# - "ok" : la cible a répondu (y compris un refus applicatif, ex. accès refusé) ;
+# - "skip" : rien à mesurer (port fermé...), compté dans le débit seulement ;
+# - "error" : erreur quelconque, entre dans le taux d'erreurs de la fenêtre ;
+# - "timeout" / "busy" / "auth" : recul immédiat ; "lockout" : arrêt.
+BACKOFF_OUTCOMES = {"timeout", "busy", "auth"}
+
+# Motifs (minuscules) des messages d'erreur LDAP / SMB / RPC, du plus grave au moins grave
+OUTCOME_PATTERNS = [
+    ("lockout", ["data 775", "status_account_locked_out", "account locked"]),
+    ("auth", ["data 52e", "invalidcredentials", "invalid credentials", "status_logon_failure", "login failure"]),
+    ("busy", ["busy", "unavailable", "status_insufficient_resources", "status_request_not_accepted",
+              "connection reset", "too many"]),
+    ("timeout", ["timed out", "timeout"]),
+    # Refus applicatifs : la cible a répondu normalement
+    ("ok", ["access_denied", "access denied", "status_object_name_not_found", "status_pipe_not_available"]),
+]
+
+
+def classify_error(error):
+    """Exception ou message d'erreur -> issue ("lockout", "auth", "busy", "timeout", "ok" pour un refus, sinon "error")."""
+    text = f"{type(error).__name__} {error}".lower() if isinstance(error, BaseException) else str(error).lower()
+    for outcome, patterns in OUTCOME_PATTERNS:
+        if any(p in text for p in patterns):
+            return outcome
+    return "error"
+
+
+class LiveMetrics:
+    """Débit (fenêtre glissante de 10 s), p95 des latences récentes et compteurs d'erreurs par type."""
+
+    RATE_WINDOW = 10
+
+    def __init__(self):
+        self.completions = deque()
+        self.latencies = deque(maxlen=500)
+        self.counts = {}
+        self._last_print = 0.0
+
+    def record(self, latency, outcome):
+        now = time.monotonic()
+        self.completions.append(now)
+        while self.completions and now - self.completions[0] > self.RATE_WINDOW:
+            self.completions.popleft()
+        if outcome != "skip":
+            self.latencies.append(latency)
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def rate(self):
+        if len(self.completions) < 2:
+            return 0.0
+        span = max(time.monotonic() - self.completions[0], 1e-3)
+        return len(self.completions) / span
+
+    def p95(self):
+        return percentile(list(self.latencies), 0.95)
+
+    def errors(self):
+        return sum(n for outcome, n in self.counts.items() if outcome not in ("ok", "skip"))
+
+    def line(self, done, total, limit=None):
+        details = ", ".join(f"{o} {self.counts[o]}" for o in ("timeout", "busy", "auth", "error") if self.counts.get(o))
+        line = (f"[*] {done}/{total} | {self.rate():.1f} req/s | p95 {self.p95():.2f}s"
+                f" | erreurs {self.errors()}{f' ({details})' if details else ''}")
+        if limit is not None:
+            line += f" | workers {limit}"
+        return line
+
+    def print_status(self, done, total, limit=None, force=False):
+        """Ligne d'état réécrite sur place (au plus 2 fois par seconde)."""
+        now = time.monotonic()
+        if not force and now - self._last_print < 0.5:
+            return
+        self._last_print = now
+        sys.stdout.write("\r\033[K" + self.line(done, total, limit))
+        sys.stdout.flush()
+
+    @staticmethod
+    def clear_line():
+        """À appeler avant d'afficher un résultat pour ne pas l'écrire par-dessus la ligne d'état."""
+        sys.stdout.write("\r\033[K")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class AimdLimiter:
+    """
+    Limite de concurrence adaptative (AIMD) partagée par les threads d'un outil.
+    - slot() : bloque tant que le nombre de requêtes en cours atteint la limite courante ;
+    - record(latence, issue) : après chaque requête. Toutes les ADAPTIVE_WINDOW réponses, la limite
+      augmente de 1 si la fenêtre est saine (taux d'erreurs et p95 sous les seuils), sinon elle est
+      multipliée par ADAPTIVE_BACKOFF. Un timeout, un serveur occupé ou une anomalie
+      d'authentification provoque ce recul immédiatement (au plus une fois par ADAPTIVE_COOLDOWN s).
+    - Un verrouillage de compte, ou ADAPTIVE_AUTH_ABORT échecs d'authentification consécutifs,
+      positionne abort_reason : l'outil doit arrêter le scan.
+    adaptive=False garde la limite fixe à max_limit (métriques seulement).
+    """
+
+    # Sous ce p95 (s), la latence n'est jamais jugée dégradée (bruit sur les réponses très rapides)
+    LATENCY_FLOOR = 0.1
+
+    def __init__(self, max_limit, min_limit=1, initial=None, adaptive=True):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.adaptive = adaptive
+        if adaptive:
+            self.limit = max(self.min_limit, min(self.max_limit, initial or ADAPTIVE_INITIAL))
+        else:
+            self.limit = self.max_limit
+        self.metrics = LiveMetrics()
+        self.in_flight = 0
+        self.abort_reason = None
+        self.backoffs = 0
+        self._cond = threading.Condition()
+        self._window = []
+        self._baseline = None
+        self._last_backoff = 0.0
+        self._consecutive_auth = 0
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def record(self, latency, outcome):
+        with self._cond:
+            self.metrics.record(latency, outcome)
+
+            if outcome == "lockout":
+                self.abort_reason = "compte verrouillé"
+            elif outcome == "auth":
+                self._consecutive_auth += 1
+                if self._consecutive_auth >= ADAPTIVE_AUTH_ABORT:
+                    self.abort_reason = f"{self._consecutive_auth} échecs d'authentification consécutifs"
+            elif outcome != "skip":
+                self._consecutive_auth = 0
+
+            if not self.adaptive or outcome == "skip":
+                return
+            if outcome in BACKOFF_OUTCOMES:
+                self._backoff()
+                return
+
+            self._window.append((latency, outcome))
+            if len(self._window) >= ADAPTIVE_WINDOW:
+                self._evaluate()
+
+    def _evaluate(self):
+        latencies = [lat for lat, outcome in self._window if outcome == "ok"]
+        error_rate = sum(1 for _, outcome in self._window if outcome == "error") / len(self._window)
+        p95 = percentile(latencies, 0.95)
+        self._window = []
+
+        if self._baseline is None and latencies:
+            self._baseline = p95
+        healthy = error_rate <= ADAPTIVE_MAX_ERROR_RATE and (
+            self._baseline is None or p95 <= max(self._baseline * ADAPTIVE_LATENCY_FACTOR, self.LATENCY_FLOOR)
+        )
+
+        if not healthy:
+            self._backoff()
+            return
+        # Référence lissée sur les seules fenêtres saines : une dégradation lente reste détectée
+        if latencies:
+            self._baseline = 0.8 * self._baseline + 0.2 * p95
+        if self.limit < self.max_limit:
+            self.limit += 1
+            self._cond.notify_all()
+
+    def _backoff(self):
+        now = time.monotonic()
+        self._window = []
+        if now - self._last_backoff < ADAPTIVE_COOLDOWN:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        self.limit = max(self.min_limit, int(self.limit * ADAPTIVE_BACKOFF))
+
+    def print_status(self, done, total, force=False):
+        self.metrics.print_status(done, total, f"{self.in_flight}/{self.limit}", force)
@@ -1,22 +1,73 @@
+import asyncio
+import os
+import signal
 import subprocess
+import threading
+import time
+from datetime import datetime
+from utils.scheduler import scheduler
+from config import (
+    CMD_LOG_DIR,
+    CMD_LOG_MAX_BYTES,
+    CMD_LOG_BACKUPS,
+    CMD_DEFAULT_TIMEOUTS,
+    CMD_TOOL_TIMEOUTS,
+)
 
+# Taille max d'une ligne lue par run_cmd_async (StreamReader limite à 64 Kio par défaut)
+ASYNC_LINE_LIMIT = 1024 * 1024
 
-def run_cmd(cmd, cwd=None):
-    """
-    Exécute une commande de manière bloquante.
-    - Masque les mots de passe à l'affichage.
-    - Retourne l'objet CompletedProcess (code retour, stdout/stderr vides car redirigés).
-    """
-    # Masquer le mot de passe dans l'affichage
+
+class RotatingLog:
+    """Fichier de log d'un job, avec rotation (job.log, job.log.1, ...) au-delà de max_bytes."""
+
+    def __init__(self, path, max_bytes=CMD_LOG_MAX_BYTES, backups=CMD_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        # Écritures concurrentes possibles (thread lecteur + thread principal)
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.max_bytes and self._size + len(text) > self.max_bytes and self._size > 0:
+                self._rotate()
+            self._file.write(text)
+            self._file.flush()
+            self._size += len(text)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def mask_cmd(cmd):
+    """Version affichable de la commande, mots de passe masqués."""
     cmd_display = []
     skip_next = False
-    
+
     for item in cmd:
         if skip_next:
             skip_next = False
             cmd_display.append("*****")
             continue
-        
+
         if item in ["-p", "-P", "-ap"]:
             cmd_display.append(item)
             skip_next = True
@@ -28,21 +79,204 @@ def run_cmd(cmd, cwd=None):
                 cmd_display.append(item)
         else:
             cmd_display.append(item)
-    
-    print("\n→ Exécution :", " ".join(cmd_display))
-    
+
+    return " ".join(cmd_display)
+
+
+def _kill(proc):
+    """Tue le process et ses enfants (process group dédié)."""
     try:
-        result = subprocess.run(
-            cmd,
-            cwd=cwd,
-            check=False,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        return result
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, AttributeError):
+        proc.kill()
+
+
+def run_cmd(cmd, cwd=None, tool=None, priority=None, timeout=None, idle_timeout=None, on_line=None, log_name=None):
+    """
+    Exécute une commande de manière bloquante.
+    - Attend un slot de l'ordonnanceur global (limite globale + limite par outil).
+      tool : nom de l'outil pour les limites (défaut : basename de cmd[0]) ;
+      priority : surcharge de la priorité configurée pour l'outil.
+    - Masque les mots de passe à l'affichage.
+    - stdout/stderr sont lus ligne par ligne et écrits dans un log rotatif
+      scan/logs/<tool>/<log_name>.log ; on_line(line) est appelé pour chaque ligne
+      pendant l'exécution (parsing au fil de l'eau).
+    - timeout : durée max (s) ; idle_timeout : durée max (s) sans aucune sortie.
+      Défauts par outil dans CMD_TOOL_TIMEOUTS. En cas de dépassement le process est tué.
+    - Retourne l'objet CompletedProcess (returncode, stdout/stderr à None : voir result.log_file),
+      avec result.timed_out à True si le process a été tué.
+    """
+    tool = tool or scheduler.tool_name(cmd)
+    timeout, idle_timeout = _resolve_timeouts(tool, timeout, idle_timeout)
+    cmd_display = mask_cmd(cmd)
+
+    try:
+        with scheduler.slot(tool, priority):
+            print("\n→ Exécution :", cmd_display)
+            return _run_streaming(cmd, cwd, tool, cmd_display, timeout, idle_timeout, on_line, log_name)
     except FileNotFoundError:
         print("❌ Commande introuvable :", cmd[0])
     except Exception as e:
         print(f"❌ Erreur lors de l'exécution : {e}")
-    
+
     return None
+
+
+def _resolve_timeouts(tool, timeout, idle_timeout):
+    default_timeout, default_idle = CMD_TOOL_TIMEOUTS.get(tool, CMD_DEFAULT_TIMEOUTS)
+    return (
+        default_timeout if timeout is None else timeout,
+        default_idle if idle_timeout is None else idle_timeout,
+    )
+
+
+def _open_log(tool, log_name, pid, cmd_display):
+    log_name = log_name or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{pid}"
+    log = RotatingLog(CMD_LOG_DIR / tool / f"{log_name}.log")
+    log.write(f"$ {cmd_display}\n")
+    return log
+
+
+def _handle_line(log, line, on_line):
+    log.write(line)
+    if on_line is not None:
+        try:
+            on_line(line.rstrip("\n"))
+        except Exception as e:
+            log.write(f"[run_cmd] Erreur dans le callback on_line : {e}\n")
+
+
+def _close_log(cmd, proc_returncode, log, timed_out):
+    log.write(f"[run_cmd] Code retour : {proc_returncode}{' (' + timed_out + ')' if timed_out else ''}\n")
+    log.close()
+
+    result = subprocess.CompletedProcess(cmd, proc_returncode)
+    result.log_file = log.path
+    result.timed_out = timed_out is not None
+    return result
+
+
+def _run_streaming(cmd, cwd, tool, cmd_display, timeout, idle_timeout, on_line, log_name):
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=True,
+    )
+
+    log = _open_log(tool, log_name, proc.pid, cmd_display)
+
+    last_output = [time.monotonic()]
+
+    def reader():
+        for line in proc.stdout:
+            last_output[0] = time.monotonic()
+            _handle_line(log, line, on_line)
+        proc.stdout.close()
+
+    reader_thread = threading.Thread(target=reader, name=f"reader-{tool}", daemon=True)
+    reader_thread.start()
+
+    started = time.monotonic()
+    timed_out = None
+    while True:
+        try:
+            proc.wait(timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        now = time.monotonic()
+        if timeout and now - started > timeout:
+            timed_out = f"durée maximale de {timeout}s dépassée"
+        elif idle_timeout and now - last_output[0] > idle_timeout:
+            timed_out = f"aucune sortie depuis {idle_timeout}s"
+        if timed_out:
+            print(f"⏱️ {tool} tué : {timed_out}. Log : {log.path}")
+            _kill(proc)
+            proc.wait()
+            break
+
+    reader_thread.join(timeout=5)
+    return _close_log(cmd, proc.returncode, log, timed_out)
+
+
+async def run_cmd_async(cmd, cwd=None, tool=None, priority=None, timeout=None, idle_timeout=None, on_line=None, log_name=None):
+    """
+    Variante asyncio de run_cmd (mêmes paramètres, même log, même résultat).
+    Le process est lancé avec asyncio.create_subprocess_exec : l'attente d'un slot
+    et la lecture de la sortie ne mobilisent aucun thread. Si la coroutine est annulée,
+    le process (et son groupe) est tué avant de propager l'annulation.
+    """
+    tool = tool or scheduler.tool_name(cmd)
+    timeout, idle_timeout = _resolve_timeouts(tool, timeout, idle_timeout)
+    cmd_display = mask_cmd(cmd)
+
+    try:
+        async with scheduler.aslot(tool, priority):
+            print("\n→ Exécution :", cmd_display)
+            return await _run_streaming_async(cmd, cwd, tool, cmd_display, timeout, idle_timeout, on_line, log_name)
+    except FileNotFoundError:
+        print("❌ Commande introuvable :", cmd[0])
+    except Exception as e:
+        print(f"❌ Erreur lors de l'exécution : {e}")
+
+    return None
+
+
+async def _run_streaming_async(cmd, cwd, tool, cmd_display, timeout, idle_timeout, on_line, log_name):
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        start_new_session=True,
+        # Certains outils écrivent de très longues lignes (JSON, barres de progression)
+        limit=ASYNC_LINE_LIMIT,
+    )
+
+    log = _open_log(tool, log_name, proc.pid, cmd_display)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    timed_out = None
+
+    try:
+        while True:
+            wait_for = idle_timeout
+            if timeout:
+                remaining = timeout - (loop.time() - started)
+                if remaining <= 0:
+                    timed_out = f"durée maximale de {timeout}s dépassée"
+                    break
+                wait_for = min(wait_for, remaining) if wait_for else remaining
+            try:
+                raw = await asyncio.wait_for(proc.stdout.readline(), wait_for)
+            except asyncio.TimeoutError:
+                if timeout and loop.time() - started >= timeout:
+                    timed_out = f"durée maximale de {timeout}s dépassée"
+                else:
+                    timed_out = f"aucune sortie depuis {idle_timeout}s"
+                break
+            if not raw:
+                break
+            _handle_line(log, raw.decode("utf-8", errors="replace"), on_line)
+
+        if timed_out:
+            print(f"⏱️ {tool} tué : {timed_out}. Log : {log.path}")
+            _kill(proc)
+        await proc.wait()
+    except BaseException:
+        # Annulation (ou erreur) : ne pas laisser de process orphelin
+        if proc.returncode is None:
+            _kill(proc)
+            await asyncio.shield(proc.wait())
+        log.write("[run_cmd] Process tué : exécution annulée\n")
+        log.close()
+        raise
+
+    return _close_log(cmd, proc.returncode, log, timed_out)
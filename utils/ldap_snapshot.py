@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from config import LDAP_SNAPSHOT_DB, LDAP_SNAPSHOT_TTL
+
+
+class LdapSnapshotStore:
+    """
+    Cache disque (SQLite) des extractions LDAP complètes, par domaine.
+    Un instantané = un "kind" pour un domaine :
+    - "accounts" : tous les objets (objectClass=user), utilisateurs et ordinateurs, avec les colonnes
+      utiles aux outils (sAMAccountName, SID, adminCount, UAC, dNSHostName, OS) et, si le producteur
+      l'a fourni, l'entrée complète compressée (zlib) pour regénérer les JSON de la GrayBox ;
+    - "objects" : la liste de tous les DN (find-interestings-acl) ;
+    - "principals" : tous les objets porteurs d'un objectSid (SID -> nom, type), pour résoudre
+      les trustees des ACL (utils/sid_resolver.py).
+    Un instantané plus vieux que LDAP_SNAPSHOT_TTL est ignoré ; invalidate() le supprime.
+    La clé est le domaine (et non l'IP du DC) : tous les DC d'un domaine répliquent le même annuaire.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, db_path=LDAP_SNAPSHOT_DB, ttl=LDAP_SNAPSHOT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        with self._lock, self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    domain TEXT, kind TEXT, dc TEXT, source TEXT,
+                    fetched_at REAL, count INTEGER, has_data INTEGER,
+                    PRIMARY KEY (domain, kind)
+                );
+                CREATE TABLE IF NOT EXISTS accounts (
+                    domain TEXT, dn TEXT, is_computer INTEGER, sam TEXT, sid TEXT,
+                    admin_count INTEGER, uac INTEGER, dns_hostname TEXT, os TEXT, data BLOB
+                );
+                CREATE INDEX IF NOT EXISTS accounts_domain ON accounts (domain);
+                CREATE TABLE IF NOT EXISTS objects (domain TEXT, dn TEXT);
+                CREATE INDEX IF NOT EXISTS objects_domain ON objects (domain);
+                CREATE TABLE IF NOT EXISTS principals (domain TEXT, sid TEXT, name TEXT, kind TEXT);
+                CREATE INDEX IF NOT EXISTS principals_domain ON principals (domain);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte : transaction validée (ou annulée) puis fermée."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _key(domain):
+        return domain.strip().lower()
+
+    # ------ Métadonnées / invalidation ------
+    def info(self, domain, kind):
+        """Métadonnées de l'instantané s'il existe et n'a pas expiré, sinon None."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT dc, source, fetched_at, count, has_data FROM snapshots WHERE domain = ? AND kind = ?",
+                (self._key(domain), kind),
+            ).fetchone()
+        if row is None:
+            return None
+        dc, source, fetched_at, count, has_data = row
+        age = time.time() - fetched_at
+        if self.ttl and age > self.ttl:
+            return None
+        return {"dc": dc, "source": source, "age": age, "count": count, "has_data": bool(has_data)}
+
+    def invalidate(self, domain, kind=None):
+        key = self._key(domain)
+        kinds = [kind] if kind else ["accounts", "objects", "principals"]
+        with self._lock, self._connect() as db:
+            for k in kinds:
+                db.execute("DELETE FROM snapshots WHERE domain = ? AND kind = ?", (key, k))
+                db.execute(f"DELETE FROM {k} WHERE domain = ?", (key,))
+
+    def _replace(self, db, domain, kind, dc, source, count, has_data):
+        db.execute(f"DELETE FROM {kind} WHERE domain = ?", (domain,))
+        db.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (domain, kind, dc, source, time.time(), count, int(has_data)),
+        )
+
+    # ------ Comptes (users + computers) ------
+    def save_accounts(self, domain, accounts, dc=None, source=None):
+        """
+        accounts : itérable de dicts {dn, is_computer, sam, sid, admin_count, uac, dns_hostname, os, entry?}.
+        'entry' (dict JSON complet, optionnel) est stocké compressé.
+        """
+        key = self._key(domain)
+        rows = []
+        has_data = True
+        for a in accounts:
+            entry = a.get("entry")
+            has_data = has_data and entry is not None
+            rows.append((
+                key, a.get("dn"), int(bool(a.get("is_computer"))), a.get("sam"), a.get("sid"),
+                int(a.get("admin_count") or 0), int(a.get("uac") or 0), a.get("dns_hostname"), a.get("os"),
+                zlib.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8")) if entry is not None else None,
+            ))
+        with self._lock, self._connect() as db:
+            self._replace(db, key, "accounts", dc, source, len(rows), has_data and bool(rows))
+            db.executemany("INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def load_accounts(self, domain, with_data=False):
+        """
+        Comptes de l'instantané (liste de dicts comme pour save_accounts), ou None si absent/expiré.
+        with_data=True exige les entrées complètes (sinon None) et les décompresse dans 'entry'.
+        """
+        meta = self.info(domain, "accounts")
+        if meta is None or (with_data and not meta["has_data"]):
+            return None
+        columns = "dn, is_computer, sam, sid, admin_count, uac, dns_hostname, os" + (", data" if with_data else "")
+        with self._connect() as db:
+            rows = db.execute(f"SELECT {columns} FROM accounts WHERE domain = ?", (self._key(domain),)).fetchall()
+        accounts = []
+        for row in rows:
+            account = {
+                "dn": row[0], "is_computer": bool(row[1]), "sam": row[2], "sid": row[3],
+                "admin_count": row[4], "uac": row[5], "dns_hostname": row[6], "os": row[7],
+            }
+            if with_data:
+                account["entry"] = json.loads(zlib.decompress(row[8]).decode("utf-8"))
+            accounts.append(account)
+        return accounts
+
+    # ------ DN de tous les objets ------
+    def save_objects(self, domain, dns, dc=None, source=None):
+        key = self._key(domain)
+        rows = [(key, dn) for dn in dns]
+        with self._lock, self._connect() as db:
+            self._replace(db, key, "objects", dc, source, len(rows), False)
+            db.executemany("INSERT INTO objects VALUES (?, ?)", rows)
+
+    def load_objects(self, domain):
+        if self.info(domain, "objects") is None:
+            return None
+        with self._connect() as db:
+            return [row[0] for row in db.execute("SELECT dn FROM objects WHERE domain = ?", (self._key(domain),))]
+
+    # ------ Principaux (SID -> nom) ------
+    def save_principals(self, domain, principals, dc=None, source=None):
+        """principals : dict {sid: (nom, type)}."""
+        key = self._key(domain)
+        rows = [(key, sid, name, kind) for sid, (name, kind) in principals.items()]
+        with self._lock, self._connect() as db:
+            self._replace(db, key, "principals", dc, source, len(rows), False)
+            db.executemany("INSERT INTO principals VALUES (?, ?, ?, ?)", rows)
+
+    def load_principals(self, domain):
+        """{sid: (nom, type)} de l'instantané, ou None si absent/expiré."""
+        if self.info(domain, "principals") is None:
+            return None
+        with self._connect() as db:
+            rows = db.execute("SELECT sid, name, kind FROM principals WHERE domain = ?", (self._key(domain),))
+            return {sid: (name, kind) for sid, name, kind in rows}
+
+    @staticmethod
+    def describe(meta):
+        """Résumé lisible d'un instantané (pour les logs des outils)."""
+        return f"{meta['count']} entrées, {meta['age'] / 60:.0f} min, source {meta['source'] or '?'} ({meta['dc'] or '?'})"
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from config import LOOT_DB, LOOT_BLOB_DIR
+
+
+class LootStore:
+    """
+    Cache local des fichiers récupérés sur les shares (crawler SMB, loot d'un outil externe).
+    - files : (hôte, share, chemin) -> taille, mtime, SHA-256 du contenu. Un fichier dont la taille et le
+      mtime n'ont pas changé depuis le dernier passage n'est ni retéléchargé ni regrepé : known() charge
+      l'état d'un share en une requête et unchanged() fait la comparaison en mémoire (diff de métadonnées).
+    - blobs : contenu stocké une seule fois par SHA-256 (scripts GPO, configs déployées sur N hôtes).
+    - greps : résultat de CredentialMatcher par (SHA-256, empreinte des règles) ; changer les mots-clés
+      invalide naturellement le cache.
+    """
+
+    _lock = threading.Lock()
+    HASH_CHUNK = 1024 * 1024
+
+    def __init__(self, db_path=LOOT_DB, blob_dir=LOOT_BLOB_DIR):
+        self.db_path = db_path
+        self.blob_dir = blob_dir
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    host TEXT, share TEXT, path TEXT, size INTEGER, mtime REAL, sha256 TEXT, seen_at REAL,
+                    PRIMARY KEY (host, share, path)
+                );
+                CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+                CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, stored_at REAL);
+                CREATE TABLE IF NOT EXISTS greps (
+                    sha256 TEXT, matcher TEXT, score INTEGER, result TEXT,
+                    PRIMARY KEY (sha256, matcher)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte : transaction validée (ou annulée) puis fermée."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # ------ Diff de métadonnées ------
+    def known(self, host, share):
+        """{chemin: (taille, mtime, sha256)} de tous les fichiers déjà vus sur ce share."""
+        with self._connect() as db:
+            rows = db.execute("SELECT path, size, mtime, sha256 FROM files WHERE host = ? AND share = ?", (host, share))
+            return {path: (size, mtime, sha256) for path, size, mtime, sha256 in rows}
+
+    @staticmethod
+    def unchanged(known, path, size, mtime):
+        """SHA-256 connu si (taille, mtime) sont identiques au dernier passage, sinon None."""
+        entry = known.get(path)
+        if entry is not None and entry[0] == size and entry[1] == mtime:
+            return entry[2]
+        return None
+
+    # ------ Contenus ------
+    def blob_path(self, sha256):
+        return self.blob_dir / sha256[:2] / sha256
+
+    def has_blob(self, sha256):
+        return self.blob_path(sha256).exists()
+
+    def temp_file(self):
+        """Fichier temporaire ouvert en écriture binaire, sur le même disque que les blobs (put_file le déplace)."""
+        return tempfile.NamedTemporaryFile(dir=self.blob_dir, prefix=".partial-", delete=False)
+
+    @classmethod
+    def hash_file(cls, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def put_file(self, host, share, path, size, mtime, src, move=False):
+        """
+        Enregistre le contenu du fichier local `src` pour (hôte, share, chemin).
+        move=True déplace src (fichier temporaire de temp_file) ; sinon il est copié si le contenu est nouveau.
+        Retourne (sha256, nouveau contenu ?) : False = doublon d'un contenu déjà stocké (autre hôte, autre chemin).
+        """
+        sha256 = self.hash_file(src)
+        target = self.blob_path(sha256)
+        is_new = not target.exists()
+        if is_new:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if move:
+                os.replace(src, target)
+            else:
+                shutil.copyfile(src, target)
+        elif move:
+            os.remove(src)
+
+        now = time.time()
+        with self._lock, self._connect() as db:
+            if is_new:
+                db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (sha256, os.path.getsize(target), now))
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (host, share, path, size, mtime, sha256, now))
+        return sha256, is_new
+
+    def touch(self, host, share, paths):
+        """Met à jour seen_at des fichiers revus inchangés (non réenregistrés par put_file)."""
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.executemany("UPDATE files SET seen_at = ? WHERE host = ? AND share = ? AND path = ?",
+                           [(now, host, share, path) for path in paths])
+
+    def forget(self, host, share, paths):
+        """Retire de l'index les fichiers disparus du share (les blobs restent : ils peuvent être partagés)."""
+        with self._lock, self._connect() as db:
+            db.executemany("DELETE FROM files WHERE host = ? AND share = ? AND path = ?",
+                           [(host, share, path) for path in paths])
+
+    # ------ Grep mis en cache par contenu ------
+    def grep(self, sha256, matcher):
+        """Résultat de matcher.scan_file sur le blob, calculé une seule fois par contenu et par jeu de règles."""
+        with self._connect() as db:
+            row = db.execute("SELECT result FROM greps WHERE sha256 = ? AND matcher = ?",
+                             (sha256, matcher.fingerprint)).fetchone()
+        if row is not None:
+            return json.loads(row[0]), True
+
+        result = matcher.scan_file(self.blob_path(sha256))
+        with self._lock, self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO greps VALUES (?, ?, ?, ?)",
+                       (sha256, matcher.fingerprint, result["score"], json.dumps(result, ensure_ascii=False)))
+        return result, False
+
+    def stats(self):
+        with self._connect() as db:
+            files, hosts = db.execute("SELECT COUNT(*), COUNT(DISTINCT host) FROM files").fetchone()
+            blobs, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"files": files, "hosts": hosts, "blobs": blobs, "blob_bytes": size}
@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+from pathlib import Path
+from config import (
+    SCHEDULER_MAX_PROCESSES,
+    SCHEDULER_MAX_JOBS,
+    SCHEDULER_DEFAULT_TOOL_LIMIT,
+    SCHEDULER_TOOL_LIMITS,
+    SCHEDULER_TOOL_PRIORITIES,
+)
+
+# Classes de priorité (plus petit = servi en premier)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class ProcessScheduler:
+    """
+    Ordonnanceur global des outils externes.
+    - slot(tool) : réserve un créneau de process (limite globale + limite par outil),
+      les demandes en attente sont servies par priorité puis par ordre d'arrivée ;
+    - aslot(tool) : même chose pour une coroutine (moteur asyncio, run_cmd_async) ;
+    - submit(func) : lance un job Python et retourne un Future. Les jobs tournent dans un pool de
+      max_jobs threads PAR NIVEAU D'IMBRICATION : un job soumis depuis un job (shards Nmap d'une étape,
+      CIDR ManSpider...) va dans le pool du niveau suivant, un parent qui attend ses enfants ne peut
+      donc pas occuper les threads dont ils ont besoin. Les process lancés via run_cmd consomment
+      en plus des slots.
+    """
+
+    def __init__(self, max_processes, tool_limits=None, tool_priorities=None, default_tool_limit=4, max_jobs=32):
+        self.max_processes = max_processes
+        self.max_jobs = max_jobs
+        self.tool_limits = dict(tool_limits or {})
+        self.tool_priorities = dict(tool_priorities or {})
+        self.default_tool_limit = default_tool_limit
+
+        self._cond = threading.Condition()
+        self._waiting = []            # tickets (priorité, séquence, outil)
+        self._running = {}            # outil -> process en cours
+        self._total_running = 0
+        self._seq = itertools.count()
+        self._stats = {}
+        self._async_waiters = set()   # réveils des coroutines en attente (aslot)
+        self._executors = []          # un pool de jobs par niveau d'imbrication
+        self._executors_lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def tool_name(cmd):
+        """Nom d'outil déduit d'une commande (basename de l'exécutable)."""
+        return Path(cmd[0]).name if cmd else "unknown"
+
+    def _tool_stats(self, tool):
+        return self._stats.setdefault(tool, {
+            "queued": 0, "running": 0, "completed": 0,
+            "wait_total": 0.0, "wait_max": 0.0, "run_total": 0.0,
+        })
+
+    def _has_capacity(self, tool):
+        limit = self.tool_limits.get(tool, self.default_tool_limit)
+        return self._total_running < self.max_processes and self._running.get(tool, 0) < limit
+
+    def _is_next(self, ticket):
+        # Le ticket passe s'il est le plus prioritaire parmi ceux qui PEUVENT démarrer
+        # (un outil saturé ne bloque pas les autres)
+        for candidate in sorted(self._waiting):
+            if self._has_capacity(candidate[2]):
+                return candidate == ticket
+        return False
+
+    def _enqueue(self, tool, priority):
+        if priority is None:
+            priority = self.tool_priorities.get(tool, PRIORITY_NORMAL)
+        ticket = (priority, next(self._seq), tool)
+        self._waiting.append(ticket)
+        self._tool_stats(tool)["queued"] += 1
+        return ticket
+
+    def _start(self, ticket, queued_at):
+        tool = ticket[2]
+        self._waiting.remove(ticket)
+        self._running[tool] = self._running.get(tool, 0) + 1
+        self._total_running += 1
+
+        waited = time.monotonic() - queued_at
+        stats = self._tool_stats(tool)
+        stats["queued"] -= 1
+        stats["running"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        # D'autres tickets peuvent être devenus éligibles
+        self._notify()
+
+    def _release(self, tool, started_at):
+        with self._cond:
+            self._running[tool] -= 1
+            self._total_running -= 1
+            stats = self._tool_stats(tool)
+            stats["running"] -= 1
+            stats["completed"] += 1
+            stats["run_total"] += time.monotonic() - started_at
+            self._notify()
+
+    def _notify(self):
+        # Appelé sous self._cond : réveille les threads ET les coroutines en attente
+        self._cond.notify_all()
+        for wake in list(self._async_waiters):
+            wake()
+
+    @contextmanager
+    def slot(self, tool, priority=None):
+        queued_at = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(tool, priority)
+            while not self._is_next(ticket):
+                self._cond.wait()
+            self._start(ticket, queued_at)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(tool, started_at)
+
+    @asynccontextmanager
+    async def aslot(self, tool, priority=None):
+        """
+        Équivalent asyncio de slot() : la coroutine attend son tour sans bloquer de thread.
+        Les limites sont partagées avec slot() (mêmes compteurs, mêmes priorités).
+        Une annulation pendant l'attente retire simplement la demande de la file.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(event.set)
+
+        queued_at = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(tool, priority)
+        try:
+            while True:
+                with self._cond:
+                    if self._is_next(ticket):
+                        self._async_waiters.discard(wake)
+                        self._start(ticket, queued_at)
+                        break
+                    event.clear()
+                    self._async_waiters.add(wake)
+                await event.wait()
+        except BaseException:
+            with self._cond:
+                self._async_waiters.discard(wake)
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._tool_stats(tool)["queued"] -= 1
+                self._notify()
+            raise
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(tool, started_at)
+
+    def _executor(self, depth):
+        with self._executors_lock:
+            while len(self._executors) <= depth:
+                level = len(self._executors)
+                self._executors.append(ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix=f"job{level}"))
+            return self._executors[depth]
+
+    def submit(self, func, *args, **kwargs):
+        """Exécute func(*args, **kwargs) dans le pool du niveau d'imbrication courant et retourne un Future."""
+        depth = getattr(self._local, "depth", 0)
+
+        def runner():
+            self._local.depth = depth + 1
+            return func(*args, **kwargs)
+
+        return self._executor(depth).submit(runner)
+
+    def snapshot(self):
+        """Copie des statistiques par outil (+ état global)."""
+        with self._cond:
+            return {
+                "total_running": self._total_running,
+                "total_waiting": len(self._waiting),
+                "tools": {tool: dict(stats) for tool, stats in self._stats.items()},
+            }
+
+    def print_stats(self):
+        snap = self.snapshot()
+        if not snap["tools"]:
+            return
+        print(f"\n📊 Ordonnanceur : {snap['total_running']} process en cours, {snap['total_waiting']} en attente")
+        print(f"   {'OUTIL':<20} {'FINIS':>6} {'EN COURS':>9} {'ATTENTE':>8} {'ATT. MOY':>9} {'ATT. MAX':>9} {'EXEC MOY':>9}")
+        for tool, s in sorted(snap["tools"].items()):
+            done = s["completed"] or 1
+            started = (s["completed"] + s["running"]) or 1
+            print(f"   {tool:<20} {s['completed']:>6} {s['running']:>9} {s['queued']:>8} "
+                  f"{s['wait_total'] / started:>8.1f}s {s['wait_max']:>8.1f}s {s['run_total'] / done:>8.1f}s")
+
+
+# Instance partagée par tous les workflows / scanners
+scheduler = ProcessScheduler(
+    SCHEDULER_MAX_PROCESSES,
+    tool_limits=SCHEDULER_TOOL_LIMITS,
+    tool_priorities=SCHEDULER_TOOL_PRIORITIES,
+    default_tool_limit=SCHEDULER_DEFAULT_TOOL_LIMIT,
+    max_jobs=SCHEDULER_MAX_JOBS,
+)
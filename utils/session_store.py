@@ -0,0 +1,143 @@
+import json
+import os
+from datetime import datetime
+from config import SESSIONS_DIR
+
+
+class SessionStore:
+    """
+    Sessions trouvées par session-hunter, par domaine, sous scan/sessions/<domaine>/ :
+    - sessions.jsonl : journal append-only, une ligne {ts, host, sessions: [...]} chaque fois que
+      l'état d'un hôte change (un repolling identique n'écrit rien) ;
+    - index.json : état courant indexé, relu tel quel par le WebServer :
+      "hosts" (hôte -> dernière énumération réussie, "ts" = date de cette énumération),
+      "users" (sAMAccountName en minuscules -> hôtes) et "high_value" (sessions adminCount=1).
+      Toute requête est une lecture de dictionnaire.
+    Un hôte du périmètre d'un balayage qui n'a pas été énuméré (injoignable, erreur, arrêt) est marqué
+    "stale" : ses dernières sessions connues restent dans "hosts" mais sortent de "users" et "high_value".
+    Sans index.json (supprimé, run interrompu), l'état est reconstruit depuis le journal.
+    """
+
+    def __init__(self, domain, root=SESSIONS_DIR):
+        self.domain = domain.strip().lower()
+        self.path = root / self.domain
+        self.journal = self.path / "sessions.jsonl"
+        self.index_path = self.path / "index.json"
+        self.hosts = {}     # hôte -> {"ts": ..., "sessions": [...], "stale": bool}
+        self.users = {}     # utilisateur (minuscules) -> {hôte, ...}
+        self._load()
+
+    # ------ Chargement ------
+    def _load(self):
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.hosts = json.load(f).get("hosts", {})
+        elif self.journal.exists():
+            with open(self.journal, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue   # dernière ligne tronquée
+                    if record.get("stale"):
+                        if record["host"] in self.hosts:
+                            self.hosts[record["host"]]["stale"] = True
+                        continue
+                    self.hosts[record["host"]] = {"ts": record["ts"], "sessions": record["sessions"], "stale": False}
+
+        for host, entry in self.hosts.items():
+            if entry.get("stale"):
+                continue
+            for session in entry["sessions"]:
+                self.users.setdefault(session["user"].lower(), set()).add(host)
+
+    # ------ Mise à jour ------
+    def update(self, host, sessions):
+        """Remplace l'état de `host` par sa dernière énumération (liste de sessions) et journalise un changement."""
+        stamp = datetime.now().isoformat(timespec="seconds")
+        sessions = [
+            {"user": s["user"], "sid": s["sid"], "is_high_value": bool(s["is_high_value"])}
+            for s in sessions
+        ]
+        previous = self.hosts.get(host)
+        changed = previous is None or previous.get("stale") or self._keys(previous["sessions"]) != self._keys(sessions)
+
+        if previous is not None:
+            self._unindex(host, previous)
+        for session in sessions:
+            self.users.setdefault(session["user"].lower(), set()).add(host)
+        self.hosts[host] = {"ts": stamp, "sessions": sessions, "stale": False}
+
+        if changed:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self.journal, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": stamp, "host": host, "sessions": sessions}, ensure_ascii=False) + "\n")
+        return changed
+
+    def mark_stale(self, hosts):
+        """
+        Hôtes du périmètre d'un balayage qui n'ont pas été énumérés : leurs sessions ne sont plus
+        présentées comme courantes (retirées de "users" / "high_value", "ts" garde la dernière confirmation).
+        """
+        stamp = datetime.now().isoformat(timespec="seconds")
+        records = []
+        for host in hosts:
+            entry = self.hosts.get(host)
+            if entry is None or entry.get("stale"):
+                continue
+            self._unindex(host, entry)
+            entry["stale"] = True
+            records.append({"ts": stamp, "host": host, "stale": True})
+        if records:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self.journal, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        return len(records)
+
+    def _unindex(self, host, entry):
+        for session in entry["sessions"]:
+            hosts = self.users.get(session["user"].lower())
+            if hosts is not None:
+                hosts.discard(host)
+                if not hosts:
+                    del self.users[session["user"].lower()]
+
+    @staticmethod
+    def _keys(sessions):
+        return {(s["sid"], s["user"]) for s in sessions}
+
+    def save(self):
+        """Réécrit index.json (fichier temporaire puis remplacement atomique : le WebServer ne lit jamais un index partiel)."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        index = {
+            "domain": self.domain,
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "hosts": self.hosts,
+            "users": {user: sorted(hosts) for user, hosts in self.users.items()},
+            "high_value": self.high_value(),
+        }
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    # ------ Requêtes ------
+    @staticmethod
+    def user_key(user):
+        """Clé de "users" : sAMAccountName en minuscules ("DOMAINE\\user" et "user@domaine" acceptés)."""
+        return user.strip().split("\\")[-1].split("@")[0].lower()
+
+    def where(self, user):
+        """[{host, ts}] des hôtes où `user` a une session confirmée au dernier balayage (ts : date de l'énumération)."""
+        return [{"host": host, "ts": self.hosts[host]["ts"]} for host in sorted(self.users.get(self.user_key(user), ()))]
+
+    def sessions_on(self, host):
+        entry = self.hosts.get(host)
+        return entry["sessions"] if entry and not entry.get("stale") else []
+
+    def high_value(self):
+        return [
+            {"host": host, "ts": entry["ts"], **session}
+            for host, entry in sorted(self.hosts.items()) if not entry.get("stale")
+            for session in entry["sessions"] if session["is_high_value"]
+        ]
@@ -0,0 +1,100 @@
+from utils.ldap_snapshot import LdapSnapshotStore
+from scanners.ldap_collector import LdapCollector
+
+
+class SidResolver:
+    """
+    Cache SID -> principal (nom, type) pour les trustees des ACL.
+    Ordre de remplissage : SID bien connus intégrés, puis instantané disque
+    (LdapSnapshotStore, kind "principals") s'il est récent, sinon une seule recherche
+    LDAP paginée (objectSid=*) sur la racine du domaine, sauvegardée pour les runs suivants.
+    Un SID inconnu (domaine approuvé, objet supprimé) est rendu tel quel.
+    """
+
+    WELL_KNOWN_SIDS = {
+        "S-1-0-0": "Nobody",
+        "S-1-1-0": "Everyone",
+        "S-1-3-0": "Creator Owner",
+        "S-1-3-1": "Creator Group",
+        "S-1-5-7": "Anonymous",
+        "S-1-5-9": "Enterprise Domain Controllers",
+        "S-1-5-10": "Principal Self",
+        "S-1-5-11": "Authenticated Users",
+        "S-1-5-18": "Local System",
+        "S-1-5-19": "NT Authority",
+        "S-1-5-20": "Network Service",
+        "S-1-5-32-544": "Administrators",
+        "S-1-5-32-545": "Users",
+        "S-1-5-32-546": "Guests",
+        "S-1-5-32-548": "Account Operators",
+        "S-1-5-32-549": "Server Operators",
+        "S-1-5-32-550": "Print Operators",
+        "S-1-5-32-551": "Backup Operators",
+        "S-1-5-32-554": "Pre-Windows 2000 Compatible Access",
+        "S-1-5-32-557": "Incoming Forest Trust Builders",
+        "S-1-5-32-560": "Windows Authorization Access Group",
+        "S-1-5-32-561": "Terminal Server License Servers",
+    }
+
+    # objectClass -> type de principal (le premier trouvé dans cet ordre l'emporte)
+    KINDS = ["computer", "user", "group", "foreignSecurityPrincipal"]
+
+    def __init__(self, domain, store=None):
+        self.domain = domain
+        self.store = store or LdapSnapshotStore()
+        self.principals = {sid: (name, "well-known") for sid, name in self.WELL_KNOWN_SIDS.items()}
+
+    def load(self, conn, dc=None, refresh=False):
+        """Remplit le cache (instantané ou LDAP). Retourne une description de la source pour les logs."""
+        if refresh:
+            self.store.invalidate(self.domain, "principals")
+
+        cached = self.store.load_principals(self.domain)
+        if cached is not None:
+            self.principals.update(cached)
+            return f"instantané ({LdapSnapshotStore.describe(self.store.info(self.domain, 'principals'))})"
+
+        fetched = self.fetch(conn)
+        self.store.save_principals(self.domain, fetched, dc=dc, source="sid-resolver")
+        self.principals.update(fetched)
+        return f"LDAP ({len(fetched)} principaux)"
+
+    def fetch(self, conn):
+        """Une recherche paginée sur tout le domaine : {sid: (sAMAccountName ou CN, type)}."""
+        base, _ = LdapCollector.naming_contexts(conn, self.domain)
+        principals = {}
+        entries = LdapCollector.paged_search(
+            conn, base, "(objectSid=*)", ["objectSid", "sAMAccountName", "objectClass"],
+        )
+        for dn, attrs in entries:
+            sid = LdapCollector.format_sid(attrs["objectSid"][0])
+            sam = attrs.get("sAMAccountName")
+            name = sam[0].decode("utf-8", errors="replace") if sam else dn.split(",", 1)[0].split("=", 1)[-1]
+            principals[sid] = (name, self._kind(attrs.get("objectClass") or []))
+        return principals
+
+    @classmethod
+    def _kind(cls, object_classes):
+        classes = {c.decode("utf-8", errors="replace").lower() for c in object_classes}
+        for kind in cls.KINDS:
+            if kind.lower() in classes:
+                return kind
+        return "other"
+
+    def name(self, sid):
+        return self.principals.get(sid, (sid, None))[0]
+
+    def kind(self, sid):
+        return self.principals.get(sid, (sid, "unknown"))[1]
+
+    def match(self, filters):
+        """
+        Filtres -f (logique OR) -> ensemble de SID : principal dont le nom contient le filtre
+        (insensible à la casse) ou SID donné tel quel (S-1-...).
+        """
+        wanted = [f.lower() for f in filters]
+        sids = {f.upper() for f in filters if f.upper().startswith("S-1-")}
+        for sid, (name, _kind) in self.principals.items():
+            if any(f in name.lower() for f in wanted):
+                sids.add(sid)
+        return sids
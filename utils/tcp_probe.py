@@ -0,0 +1,92 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PROBE_RESOLVE_THREADS, PROBE_RESOLVE_TIMEOUT
+
+
+class ProbeResults(dict):
+    """{hôte joignable: latence} ; unresolved : noms sans adresse (distincts des ports fermés / filtrés)."""
+
+    def __init__(self):
+        super().__init__()
+        self.unresolved = []
+
+
+async def resolve_host(target, port, resolver, semaphore, timeout):
+    """
+    Adresse IP de `target` (inchangé si c'est déjà une IP), ou None si le nom ne se résout pas.
+    Le timer ne démarre qu'une fois un thread du résolveur obtenu : l'attente de créneau n'est pas comptée.
+    Un getaddrinfo abandonné sur timeout garde son créneau jusqu'à son retour (le thread reste occupé).
+    """
+    try:
+        ipaddress.ip_address(target)
+        return target
+    except ValueError:
+        pass
+    await semaphore.acquire()
+    lookup = asyncio.get_running_loop().run_in_executor(
+        resolver, socket.getaddrinfo, target, port, 0, socket.SOCK_STREAM
+    )
+    lookup.add_done_callback(lambda f: (semaphore.release(), f.cancelled() or f.exception()))
+    try:
+        infos = await asyncio.wait_for(asyncio.shield(lookup), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    return infos[0][4][0] if infos else None
+
+
+async def probe_host(address, port, semaphore, timeout):
+    """Durée de connexion TCP (s) vers une IP, ou None si elle ne répond pas dans `timeout`."""
+    async with semaphore:
+        started = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        latency = time.monotonic() - started
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return latency
+
+
+async def probe_hosts(targets, port, concurrency, timeout):
+    """
+    Sonde tous les hôtes en parallèle (au plus `concurrency` connexions) ; retourne un ProbeResults.
+    Les noms sont d'abord résolus sur un pool dédié (PROBE_RESOLVE_THREADS, PROBE_RESOLVE_TIMEOUT par nom) ;
+    `timeout` ne couvre que la connexion TCP.
+    """
+    connect_slots = asyncio.Semaphore(concurrency)
+    resolve_slots = asyncio.Semaphore(PROBE_RESOLVE_THREADS)
+
+    resolver = ThreadPoolExecutor(PROBE_RESOLVE_THREADS, thread_name_prefix="probe-resolve")
+
+    async def probe_one(target):
+        address = await resolve_host(target, port, resolver, resolve_slots, PROBE_RESOLVE_TIMEOUT)
+        if address is None:
+            return False, None
+        return True, await probe_host(address, port, connect_slots, timeout)
+
+    try:
+        outcomes = await asyncio.gather(*(probe_one(target) for target in targets))
+    finally:
+        # Pas d'attente des getaddrinfo abandonnés sur timeout : ils finissent seuls
+        resolver.shutdown(wait=False, cancel_futures=True)
+
+    results = ProbeResults()
+    for target, (resolved, latency) in zip(targets, outcomes):
+        if not resolved:
+            results.unresolved.append(target)
+        elif latency is not None:
+            results[target] = latency
+    return results
+
+
+def probe(targets, port, concurrency, timeout):
+    """Version bloquante de probe_hosts (boucle asyncio dédiée)."""
+    return asyncio.run(probe_hosts(list(targets), port, concurrency, timeout))
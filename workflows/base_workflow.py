@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 
 class BaseWorkflow:
@@ -10,3 +11,59 @@ class BaseWorkflow:
     def run(self):
         """Méthode à implémenter par les workflows enfants."""
         raise NotImplementedError
+    
+    async def run_stages_async(self, stages, label=""):
+        """
+        Exécute un DAG d'étapes : {nom: (coroutine_function, [dépendances])}.
+        Chaque étape devient une tâche de la boucle d'événements (aucun thread par étape) et démarre
+        dès que toutes ses dépendances ont réussi ; une étape dont une dépendance a échoué est ignorée.
+        Retourne {nom: None si succès, sinon l'exception}.
+        """
+        results = {}
+        prefix = f"[{label}] " if label else ""
+        
+        # Étapes atteignables (dépendances connues et sans cycle) : les autres ne seront jamais lancées
+        reachable = set()
+        progressed = True
+        while progressed:
+            progressed = False
+            for name, (_, deps) in stages.items():
+                if name not in reachable and all(d in reachable for d in deps):
+                    reachable.add(name)
+                    progressed = True
+        for name in stages:
+            if name not in reachable:
+                print(f"  ⚠️ {prefix}Étape '{name}' jamais lancée (dépendances introuvables)")
+                results[name] = RuntimeError("dépendances introuvables")
+        
+        done_events = {name: asyncio.Event() for name in reachable}
+        
+        async def run_stage(name, func, deps):
+            try:
+                for dep in deps:
+                    await done_events[dep].wait()
+                failed = [d for d in deps if results[d] is not None]
+                if failed:
+                    print(f"  ⏭️ {prefix}Étape '{name}' ignorée (dépendance en échec : {', '.join(failed)})")
+                    results[name] = RuntimeError(f"dépendance en échec : {', '.join(failed)}")
+                    return
+                try:
+                    await func()
+                    results[name] = None
+                except Exception as e:
+                    print(f"  ❌ {prefix}Erreur à l'étape '{name}' : {e}")
+                    results[name] = e
+            finally:
+                done_events[name].set()
+        
+        tasks = [
+            asyncio.ensure_future(run_stage(name, func, deps))
+            for name, (func, deps) in stages.items() if name in reachable
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        return results
@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from workflows.base_workflow import BaseWorkflow
 from scanners.nmap_scanner import NmapScanner
@@ -7,7 +8,7 @@ from utils.state_manager import mark_as_scanned, is_scanned
 from utils.validators import validate_subnets
 from scanners.nxc_scanner import NxcScanner
 from config import OUTPUT_BASE_DIR, RELAY_TARGETS_GLOBAL
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.scheduler import scheduler
 
 class BlackBoxWorkflow(BaseWorkflow):
     """Workflow Black Box : scan sans credentials."""
@@ -60,27 +61,32 @@ class BlackBoxWorkflow(BaseWorkflow):
             return
         print(f"\n✅ {len(new_subnets)} sous-réseau(x) à scanner en parallèle : {', '.join(new_subnets)}")
         
-        # Lancement parallèle des scans
-        with ThreadPoolExecutor(max_workers=min(5, len(new_subnets))) as executor:
-            futures = {}
-            for subnet in new_subnets:
-                future = executor.submit(self._scan_single_subnet, subnet, dc_hosts)
-                futures[future] = subnet
-            
-            for future in as_completed(futures):
-                subnet = futures[future]
-                try:
-                    future.result()
-                    print(f"✅ Scan terminé pour {subnet}")
-                except Exception as e:
-                    print(f"❌ Erreur lors du scan de {subnet} : {e}")
+        # Lancement parallèle des scans dans une seule boucle asyncio
+        # (la concurrence des process est bornée par l'ordonnanceur)
+        asyncio.run(self._scan_subnets(new_subnets, dc_hosts))
 
+        scheduler.print_stats()
         print(f"\n{'='*60}")
         print("✅ Workflow Black Box terminé !")
         print(f"{'='*60}")
 
-    def _scan_single_subnet(self, subnet, dc_hosts):
-        """Lance tous les scans pour un seul sous-réseau."""
+    async def _scan_subnets(self, subnets, dc_hosts):
+        async def scan(subnet):
+            try:
+                await self._scan_single_subnet(subnet, dc_hosts)
+                print(f"✅ Scan terminé pour {subnet}")
+            except Exception as e:
+                print(f"❌ Erreur lors du scan de {subnet} : {e}")
+        
+        await asyncio.gather(*(scan(subnet) for subnet in subnets))
+
+    async def _scan_single_subnet(self, subnet, dc_hosts):
+        """
+        Lance tous les scans pour un seul sous-réseau, sous forme de DAG d'étapes :
+        - nmap et nxc (SMB signing) démarrent en parallèle ;
+        - GoWitness consomme les ports web au fil des résultats Nmap ;
+        - relay.txt est généré dès que nxc a terminé.
+        """
         print(f"\n{'='*60}")
         print(f"🎯 Scan du sous-réseau : {subnet}")
         print(f"{'='*60}")
@@ -88,15 +94,39 @@ class BlackBoxWorkflow(BaseWorkflow):
         nmap_scanner = NmapScanner(self.output_dir)
         gowitness_scanner = GoWitnessScanner(self.output_dir)
         nxc_scanner = NxcScanner(self.output_dir)
+        web_hosts_queue = asyncio.Queue()
+        subnet_dir = nmap_scanner._subnet_folder(subnet)
+        
+        async def nmap_stage():
+            try:
+                await nmap_scanner.scan_subnet_async(subnet, on_hosts=web_hosts_queue.put_nowait)
+            finally:
+                # Fin du flux pour GoWitness, même si Nmap échoue
+                web_hosts_queue.put_nowait(None)
+        
+        async def gowitness_stage():
+            await gowitness_scanner.scan_from_queue_async(web_hosts_queue, subnet_dir)
+        
+        async def nxc_stage():
+            await nxc_scanner.scan_smb_signing_async(subnet)
+        
+        async def relay_stage():
+            smb_signing_file = self.output_dir / "nxc_smb_signing.txt"
+            await asyncio.to_thread(
+                LdapParser.extract_relay_targets,
+                str(smb_signing_file),
+                str(RELAY_TARGETS_GLOBAL),
+                dc_hosts=dc_hosts
+            )
+        
+        results = await self.run_stages_async({
+            "nmap": (nmap_stage, []),
+            "gowitness": (gowitness_stage, []),
+            "nxc": (nxc_stage, []),
+            "relay": (relay_stage, ["nxc"]),
+        }, label=subnet)
         
-        nmap_result = nmap_scanner.scan_subnet(subnet)
-        if nmap_result and nmap_result["xml"] and nmap_result["xml"].exists():
-            gowitness_scanner.scan_from_nmap_xml(str(nmap_result["xml"]))
-        nxc_scanner.scan_smb_signing(subnet)
-        smb_signing_file = self.output_dir / "nxc_smb_signing.txt"
-        LdapParser.extract_relay_targets(
-            str(smb_signing_file),
-            str(RELAY_TARGETS_GLOBAL),
-            dc_hosts=dc_hosts
-        )
+        failed = [name for name, error in results.items() if error is not None]
+        if failed:
+            raise RuntimeError(f"étape(s) en échec : {', '.join(failed)}")
         mark_as_scanned("BlackBox", subnet)
@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from workflows.base_workflow import BaseWorkflow
 from scanners.nmap_scanner import NmapScanner
@@ -9,7 +10,7 @@ from utils.paths import resolve_hostname_to_ip
 from config import OUTPUT_BASE_DIR
 from scanners.manspider_scanner import ManSpiderScanner
 from utils.state_manager import is_graybox_scanned, mark_graybox_scanned
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.scheduler import scheduler
 
 class GrayBoxWorkflow(BaseWorkflow):
     """Workflow Gray Box : scan avec credentials utilisateur standard."""
@@ -46,31 +47,30 @@ class GrayBoxWorkflow(BaseWorkflow):
         
         print(f"\n✅ {len(new_dcs)} DC(s) à scanner en parallèle : {', '.join(new_dcs)}")
 
-        # Lancement parallèle des scans (un DC = un thread)
-        with ThreadPoolExecutor(max_workers=min(3, len(new_dcs))) as executor:
-            futures = {}
-            for dc_host in new_dcs:
-                future = executor.submit(self._scan_single_dc, dc_host, domain, username, password)
-                futures[future] = dc_host
-            
-            for future in as_completed(futures):
-                dc_host = futures[future]
-                try:
-                    future.result()
-                    print(f"✅ Scan terminé pour {dc_host}")
-                except Exception as e:
-                    print(f"❌ Erreur lors du scan de {dc_host} : {e}")
+        # Lancement parallèle des scans : une seule boucle asyncio supervise tous les DC
+        asyncio.run(self._scan_dcs(new_dcs, domain, username, password))
 
+        scheduler.print_stats()
         print(f"\n{'='*60}")
         print("✅ Workflow Gray Box terminé !")
         print(f"{'='*60}")
 
-    def _scan_single_dc(self, dc_host, domain, username, password):
+    async def _scan_dcs(self, dc_hosts, domain, username, password):
+        async def scan(dc_host):
+            try:
+                await self._scan_single_dc(dc_host, domain, username, password)
+                print(f"✅ Scan terminé pour {dc_host}")
+            except Exception as e:
+                print(f"❌ Erreur lors du scan de {dc_host} : {e}")
+        
+        await asyncio.gather(*(scan(dc_host) for dc_host in dc_hosts))
+
+    async def _scan_single_dc(self, dc_host, domain, username, password):
         """Lance tous les scans pour un seul DC EN PARALLÈLE."""
         if dc_host.replace('.', '').replace(':', '').isdigit():
             dc_ip = dc_host
         else:
-            dc_ip = resolve_hostname_to_ip(dc_host)
+            dc_ip = await asyncio.to_thread(resolve_hostname_to_ip, dc_host)
         if not dc_ip:
             print(f"❌ Impossible de résoudre l'adresse du DC : {dc_host}")
             return
@@ -79,35 +79,33 @@ class GrayBoxWorkflow(BaseWorkflow):
         print(f"🎯 Scan du DC : {dc_host}")
         print(f"{'='*60}")
         
-        # Lancement parallèle des 4 scanners
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {
-                executor.submit(self._run_ldeep_scan, dc_host, dc_ip, domain, username, password): "Ldeep",
-                executor.submit(self._run_certipy_scan, dc_host, dc_ip, domain, username, password): "Certipy",
-                executor.submit(self._run_bloodhound_scan, dc_host, dc_ip, domain, username, password): "BloodHound"
-            }
-            
-            for future in as_completed(futures):
-                scanner_name = futures[future]
-                try:
-                    future.result()
-                    print(f"  ✅ {scanner_name} terminé pour {dc_host}")
-                except Exception as e:
-                    print(f"  ❌ Erreur {scanner_name} sur {dc_host} : {e}")
+        # Lancement parallèle des scanners (coroutines, pas de pool de threads imbriqué)
+        scanners = {
+            "Ldeep": self._run_ldeep_scan(dc_host, dc_ip, domain, username, password),
+            "Certipy": self._run_certipy_scan(dc_host, dc_ip, domain, username, password),
+            "BloodHound": self._run_bloodhound_scan(dc_host, dc_ip, domain, username, password),
+        }
+        results = await asyncio.gather(*scanners.values(), return_exceptions=True)
+        
+        for scanner_name, result in zip(scanners, results):
+            if isinstance(result, Exception):
+                print(f"  ❌ Erreur {scanner_name} sur {dc_host} : {result}")
+            else:
+                print(f"  ✅ {scanner_name} terminé pour {dc_host}")
         
         mark_graybox_scanned(dc_host)
 
-    def _run_ldeep_scan(self, dc_host, dc_ip, domain, username, password):
+    async def _run_ldeep_scan(self, dc_host, dc_ip, domain, username, password):
         """Scan Ldeep."""
         ldeep_scanner = LdeepScanner(self.output_dir / "ldeep", dc_host)
-        ldeep_scanner.dump_specific(dc_ip, domain, username, password)
+        await ldeep_scanner.dump_specific_async(dc_ip, domain, username, password)
 
-    def _run_certipy_scan(self, dc_host, dc_ip, domain, username, password):
+    async def _run_certipy_scan(self, dc_host, dc_ip, domain, username, password):
         """Scan Certipy."""
         certipy_scanner = CertipyScanner(self.output_dir / "certipy", dc_host)
-        certipy_scanner.find_vulnerabilities(dc_ip, domain, username, password)
+        await certipy_scanner.find_vulnerabilities_async(dc_ip, domain, username, password)
 
-    def _run_bloodhound_scan(self, dc_host, dc_ip, domain, username, password):
+    async def _run_bloodhound_scan(self, dc_host, dc_ip, domain, username, password):
         """Scan BloodHound."""
         bh_scanner = BloodHoundScanner(self.output_dir / "bloodhound", dc_host)
-        bh_scanner.collect_all(dc_ip, domain, username, password)
+        await bh_scanner.collect_all_async(dc_ip, domain, username, password)
@@ -2,7 +2,8 @@ from simple_term_menu import TerminalMenu
 from pathlib import Path
 from scanners.manspider_scanner import ManSpiderScanner
 from utils.state_manager import is_scanned, mark_as_scanned
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.scheduler import scheduler
+from concurrent.futures import as_completed
 
 class ManSpiderWorkflow:
     """Workflow ManSpider avec choix options et réseaux multiples (parallélisation)."""
@@ -17,7 +18,8 @@ class ManSpiderWorkflow:
         print("="*60)
         options = [
             "🗂 Scan standard (extensions classiques, chemins)",
-            "🔑 Recherche de credentials (filenames et contenu)"
+            "🔑 Recherche de credentials (filenames et contenu)",
+            "🧭 Crawler SMB natif (impacket, règles ShareQL de rules/)"
         ]
         terminal_menu = TerminalMenu(
             options,
@@ -28,7 +30,7 @@ class ManSpiderWorkflow:
             clear_screen=True
         )
         mode_index = terminal_menu.show()
-        mode = "standard" if mode_index == 0 else "creds"
+        mode = {0: "standard", 1: "creds", 2: "crawler"}.get(mode_index, "standard")
         
         cidr_input = input("Subnets / CIDRs (ex: 10.3.10.0/24 10.3.50.0/28): ").strip()
         # ✅ Supporte espaces ET virgules
@@ -42,7 +44,12 @@ class ManSpiderWorkflow:
         password = input("Mot de passe : ").strip()
 
         # Filtrer les sous-réseaux déjà scannés
-        key = "standard_scanned" if mode == "standard" else "creds_scanned"
+        grep = False
+        if mode == "crawler":
+            grep = input("Télécharger et grepper le contenu des fichiers (cache loot) ? [o/N] : ").strip().lower() in ("o", "oui", "y", "yes")
+            key = "crawler_creds_scanned" if grep else "crawler_scanned"
+        else:
+            key = "standard_scanned" if mode == "standard" else "creds_scanned"
         new_cidrs = [cidr for cidr in cidr_list if not is_scanned("ManSpider", cidr, key=key)]
         already_scanned = [cidr for cidr in cidr_list if is_scanned("ManSpider", cidr, key=key)]
         if already_scanned:
@@ -53,26 +60,34 @@ class ManSpiderWorkflow:
 
         print(f"\n✅ {len(new_cidrs)} sous-réseau(x) à scanner en parallèle : {', '.join(new_cidrs)}")
 
-        # Lancement parallèle des scans
-        with ThreadPoolExecutor(max_workers=min(5, len(new_cidrs))) as executor:
-            futures = {}
-            for cidr in new_cidrs:
-                future = executor.submit(self._scan_single_cidr, cidr, domain, username, password, mode, key)
-                futures[future] = cidr
-            
-            for future in as_completed(futures):
-                cidr = futures[future]
-                try:
-                    future.result()
-                    print(f"✅ Scan terminé pour {cidr}")
-                except Exception as e:
-                    print(f"❌ Erreur lors du scan de {cidr} : {e}")
+        # Lancement parallèle des scans (nombre de ManSpider simultanés borné par l'ordonnanceur)
+        futures = {}
+        for cidr in new_cidrs:
+            future = scheduler.submit(self._scan_single_cidr, cidr, domain, username, password, mode, key, grep)
+            futures[future] = cidr
+        
+        for future in as_completed(futures):
+            cidr = futures[future]
+            try:
+                future.result()
+                print(f"✅ Scan terminé pour {cidr}")
+            except Exception as e:
+                print(f"❌ Erreur lors du scan de {cidr} : {e}")
 
+        scheduler.print_stats()
         print("\n✅ Tous les scans ManSpider sont terminés.")
 
-    def _scan_single_cidr(self, cidr, domain, username, password, mode, key):
-        """Lance un scan ManSpider sur un seul sous-réseau."""
+    def _scan_single_cidr(self, cidr, domain, username, password, mode, key, grep=False):
+        """Lance un scan ManSpider (ou le crawler SMB natif) sur un seul sous-réseau."""
         print(f"\n{'-'*60}\n🕷️ Scan SMB sur {cidr} ({mode})")
+        if mode == "crawler":
+            # Import local : impacket n'est nécessaire que pour ce mode
+            from scanners.share_crawler import ShareCrawler
+            output_json = "grepcreds.json" if grep else "enum_file.json"
+            ShareCrawler(self.base_output_dir, cidr).crawl(domain, username, password, output_json=output_json, grep=grep)
+            mark_as_scanned("ManSpider", cidr, key=key)
+            return
+
         manscan = ManSpiderScanner(self.base_output_dir, cidr)
         if mode == "standard":
             manscan.scan_files(domain, username, password, network_cidr=cidr, output_json="enum_file.json")